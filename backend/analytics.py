@@ -0,0 +1,182 @@
+import argparse
+import json
+import os
+from datetime import datetime
+from typing import Dict, Iterable, List, Tuple
+from .fileio import FileLock, atomic_write_json
+from .menuitem import load_menu_items
+from .money import to_cents
+from .order import Order, ensure_data_dir, iter_order_data
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+ROLLUP_FILE = "data/rollups.json"
+
+
+class _Interner:
+    def __init__(self):
+        self.codes: Dict[str, int] = {}
+        self.labels: List[str] = []
+
+    def code(self, label: str) -> int:
+        code = self.codes.get(label)
+        if code is None:
+            code = self.codes[label] = len(self.labels)
+            self.labels.append(label)
+        return code
+
+
+class SalesLines:
+    # One row per order line, stored column-wise. String columns are
+    # interned to integer codes so grouping is a bincount over the codes.
+    def __init__(self, orders: Iterable[dict], categories: Dict[str, str] = None):
+        if categories is None:
+            categories = {item.id: item.category for item in load_menu_items()}
+        self.items = _Interner()
+        self.categories = _Interner()
+        self.tables = _Interner()
+
+        item_codes, category_codes, table_codes = [], [], []
+        hours, quantities, revenue = [], [], []
+        for data in orders:
+            table = self.tables.code(data["customer_id"])
+            hour = datetime.fromisoformat(data["created_at"]).hour
+            for line in data["items"]:
+                item_codes.append(self.items.code(line["name"]))
+                category_codes.append(self.categories.code(categories.get(line["product_id"], "Unknown")))
+                table_codes.append(table)
+                hours.append(hour)
+                quantities.append(line["quantity"])
+                revenue.append(to_cents(line["price"]) * line["quantity"])
+
+        self.size = len(quantities)
+        if np is not None:
+            self.item = np.array(item_codes, dtype=np.int32)
+            self.category = np.array(category_codes, dtype=np.int32)
+            self.table = np.array(table_codes, dtype=np.int32)
+            self.hour = np.array(hours, dtype=np.int8)
+            self.quantity = np.array(quantities, dtype=np.int64)
+            self.revenue_cents = np.array(revenue, dtype=np.int64)
+        else:
+            self.item, self.category, self.table = item_codes, category_codes, table_codes
+            self.hour, self.quantity, self.revenue_cents = hours, quantities, revenue
+
+    def _group(self, codes, values, labels: List[str]) -> List[Tuple[str, int]]:
+        if np is not None:
+            totals = np.bincount(codes, weights=values, minlength=len(labels)).astype(np.int64).tolist()
+        else:
+            totals = [0] * len(labels)
+            for code, value in zip(codes, values):
+                totals[code] += value
+        return sorted(zip(labels, totals), key=lambda pair: pair[1], reverse=True)
+
+    def revenue_by_item(self) -> List[Tuple[str, int]]:
+        return self._group(self.item, self.revenue_cents, self.items.labels)
+
+    def revenue_by_category(self) -> List[Tuple[str, int]]:
+        return self._group(self.category, self.revenue_cents, self.categories.labels)
+
+    def revenue_by_table(self) -> List[Tuple[str, int]]:
+        return self._group(self.table, self.revenue_cents, self.tables.labels)
+
+    def revenue_by_hour(self) -> List[Tuple[int, int]]:
+        by_hour = self._group(self.hour, self.revenue_cents, [str(h) for h in range(24)])
+        return sorted(((int(hour), cents) for hour, cents in by_hour if cents), key=lambda pair: pair[0])
+
+    def total_revenue_cents(self) -> int:
+        if np is not None:
+            return int(self.revenue_cents.sum())
+        return sum(self.revenue_cents)
+
+
+def load_sales_lines(start: datetime = None, end: datetime = None, status: str = Order.COMPLETED) -> SalesLines:
+    return SalesLines(iter_order_data(status, start=start, end=end, history=True))
+
+
+class SalesRollups:
+    # Hourly and daily totals kept up to date as orders complete, so
+    # dashboards read a few buckets instead of rescanning order history.
+    def __init__(self, filename: str = None):
+        self.filename = filename or ROLLUP_FILE
+
+    def load(self) -> dict:
+        try:
+            with open(self.filename, "r") as f:
+                return json.load(f)
+        except (json.JSONDecodeError, FileNotFoundError):
+            return {"hourly": {}, "daily": {}}
+
+    def _add(self, rollups: dict, created: datetime, items: int, revenue_cents: int) -> None:
+        keys = (("hourly", created.strftime("%Y-%m-%dT%H")), ("daily", created.strftime("%Y-%m-%d")))
+        for period, key in keys:
+            bucket = rollups[period].setdefault(key, {"orders": 0, "items": 0, "revenue_cents": 0})
+            bucket["orders"] += 1
+            bucket["items"] += items
+            bucket["revenue_cents"] += revenue_cents
+
+    def _totals(self, orders: Iterable[dict]) -> Tuple[dict, int]:
+        rollups = {"hourly": {}, "daily": {}}
+        count = 0
+        for data in orders:
+            items = sum(line["quantity"] for line in data["items"])
+            revenue = sum(to_cents(line["price"]) * line["quantity"] for line in data["items"])
+            self._add(rollups, datetime.fromisoformat(data["created_at"]), items, revenue)
+            count += 1
+        return rollups, count
+
+    def record(self, order: Order) -> None:
+        with FileLock(self.filename + ".lock"):
+            if os.path.exists(self.filename):
+                rollups = self.load()
+            else:
+                # First completion since the rollups were started (or the
+                # file was deleted): fill them in from the order history.
+                rollups, _ = self._totals(data for data in iter_order_data(Order.COMPLETED, history=True)
+                                          if data["order_id"] != order.order_id)
+            self._add(rollups, order.created_at, sum(item.quantity for item in order.items),
+                      order.get_total_cents())
+            atomic_write_json(self.filename, rollups)
+
+    def rebuild(self, orders: Iterable[dict]) -> int:
+        with FileLock(self.filename + ".lock"):
+            rollups, count = self._totals(orders)
+            atomic_write_json(self.filename, rollups)
+        return count
+
+    def daily(self, start_day: str = None, end_day: str = None) -> List[Tuple[str, dict]]:
+        return self._range("daily", start_day, end_day)
+
+    def hourly(self, start_hour: str = None, end_hour: str = None) -> List[Tuple[str, dict]]:
+        return self._range("hourly", start_hour, end_hour)
+
+    def _range(self, period: str, start: str, end: str) -> List[Tuple[str, dict]]:
+        buckets = self.load()[period]
+        return sorted(
+            (key, bucket) for key, bucket in buckets.items()
+            if (start is None or key >= start) and (end is None or key <= end)
+        )
+
+
+def record_completed_order(order: Order, rollups: SalesRollups = None) -> None:
+    if order.status == Order.COMPLETED:
+        ensure_data_dir()
+        (rollups or SalesRollups()).record(order)
+
+
+def rebuild_rollups(rollups: SalesRollups = None) -> int:
+    ensure_data_dir()
+    return (rollups or SalesRollups()).rebuild(iter_order_data(Order.COMPLETED, history=True))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the sales rollups behind the reports.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("rebuild", help="Recompute data/rollups.json from the full order history")
+    args = parser.parse_args()
+
+    if args.command == "rebuild":
+        count = rebuild_rollups()
+        print(f"Rebuilt {ROLLUP_FILE} from {count} completed orders.")
@@ -0,0 +1,123 @@
+import os
+from typing import Dict, List, Optional
+from .codec import MAGIC, TAG_ORDER, OrderCodec
+from .fileio import atomic_write_bytes
+from .repository import OrderRepository, check_version
+
+
+def _file_id(path: str):
+    st = os.stat(path)
+    return st.st_dev, st.st_ino
+
+
+class BinaryOrderRepository(OrderRepository):
+    # Append-only file of OrderCodec records. The decoded state is cached and
+    # only the bytes appended since the last read are decoded on each call;
+    # compaction rewrites the file once dead records outnumber live orders.
+    mode = "binary"
+
+    def __init__(self, data_file: str, compact_ratio: int = 2):
+        self.data_file = data_file
+        self.compact_ratio = compact_ratio
+        self._reset()
+
+    def _reset(self) -> None:
+        self._codec = OrderCodec()
+        self._orders: Dict[str, dict] = {}
+        self._offset = 0
+        self._file_id = None
+        self._records = 0
+
+    def _sync(self) -> None:
+        try:
+            file_id = _file_id(self.data_file)
+            size = os.path.getsize(self.data_file)
+        except FileNotFoundError:
+            self._reset()
+            return
+        if file_id != self._file_id or size < self._offset:
+            self._reset()
+            self._file_id = file_id
+        if size == self._offset:
+            return
+
+        with open(self.data_file, "rb") as f:
+            if self._offset == 0:
+                if f.read(len(MAGIC)) != MAGIC:
+                    return
+                self._offset = len(MAGIC)
+            f.seek(self._offset)
+            events, consumed = self._codec.decode(f.read())
+        self._offset += consumed
+        for tag, payload in events:
+            self._records += 1
+            if tag == TAG_ORDER:
+                self._orders[payload["order_id"]] = payload
+            else:
+                self._orders.pop(payload, None)
+
+    def _append(self, record: bytearray, mark: int) -> None:
+        # `mark` is the codec's string table before the record was encoded;
+        # strings the record defined are dropped again if it is not written.
+        new_file = self._offset == 0
+        try:
+            with open(self.data_file, "ab") as f:
+                if new_file:
+                    f.write(MAGIC)
+                f.write(record)
+                self._offset = f.tell()
+        except OSError:
+            self._codec.rollback(mark)
+            raise
+        self._file_id = _file_id(self.data_file)
+        self._records += 1
+        if self._records > self.compact_ratio * len(self._orders) + 1000:
+            self.compact()
+
+    def load_all(self) -> List[dict]:
+        self._sync()
+        return list(self._orders.values())
+
+    def get(self, order_id: str) -> Optional[dict]:
+        self._sync()
+        return self._orders.get(order_id)
+
+    def _stored_version(self, order_id: str) -> Optional[int]:
+        self._sync()
+        data = self._orders.get(order_id)
+        return None if data is None else data.get("version", 0)
+
+    def save(self, data: dict) -> None:
+        data["version"] = check_version(data, self._stored_version(data["order_id"]))
+        mark = self._codec.mark()
+        self._append(self._codec.encode_order(data), mark)
+        self._orders[data["order_id"]] = data
+
+    def delete(self, order_id: str) -> None:
+        if self._stored_version(order_id) is None:
+            return
+        mark = self._codec.mark()
+        self._append(self._codec.encode_delete(order_id), mark)
+        self._orders.pop(order_id, None)
+
+    def compact(self) -> int:
+        self._sync()
+        codec = OrderCodec()
+        out = bytearray(MAGIC)
+        for data in self._orders.values():
+            codec.encode_order(data, out)
+        atomic_write_bytes(self.data_file, bytes(out))
+
+        orders = self._orders
+        self._reset()
+        self._codec = codec
+        self._orders = orders
+        self._records = len(orders)
+        self._offset = len(out)
+        self._file_id = _file_id(self.data_file)
+        return len(orders)
+
+    def clear(self) -> None:
+        if os.path.exists(self.data_file):
+            os.remove(self.data_file)
+        self._reset()
@@ -0,0 +1,152 @@
+import struct
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+MAGIC = b"SRSO\x01"
+
+TAG_STRING = 1
+TAG_ORDER = 2
+TAG_DELETE = 3
+
+STRING = struct.Struct("<BI")
+ORDER = struct.Struct("<BIIIqII")
+ITEM = struct.Struct("<IIdI")
+DELETE = struct.Struct("<BI")
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+
+class OrderCodec:
+    # A record stream of string definitions, orders and deletes. Every string
+    # (ids, names, statuses) is written once and then referred to by its
+    # position in the stream, so repeated product names cost four bytes.
+    # Prices stay IEEE doubles so from_dict sees exactly the same floats.
+    def __init__(self):
+        self.strings: List[str] = []
+        self.string_ids: Dict[str, int] = {}
+
+    def _ref(self, value: str, out: bytearray) -> int:
+        if len(self.string_ids) < len(self.strings):
+            # decode() only appends to the table; index the new entries.
+            for i in range(len(self.string_ids), len(self.strings)):
+                self.string_ids[self.strings[i]] = i
+        ref = self.string_ids.get(value)
+        if ref is None:
+            raw = value.encode("utf-8")
+            out += STRING.pack(TAG_STRING, len(raw))
+            out += raw
+            ref = self.string_ids[value] = len(self.strings)
+            self.strings.append(value)
+        return ref
+
+    def mark(self) -> int:
+        return len(self.strings)
+
+    def rollback(self, mark: int) -> None:
+        # Forgets the strings defined since mark() when their records never
+        # made it to the file; otherwise later records would refer to
+        # positions a reader of the file never sees.
+        for value in self.strings[mark:]:
+            self.string_ids.pop(value, None)
+        del self.strings[mark:]
+
+    def encode_order(self, data: dict, out: bytearray = None) -> bytearray:
+        out = bytearray() if out is None else out
+        start, mark = len(out), self.mark()
+        try:
+            created_us = (datetime.fromisoformat(data["created_at"]) - EPOCH) // MICROSECOND
+            refs = [
+                self._ref(data["order_id"], out),
+                self._ref(data["customer_id"], out),
+                self._ref(data["status"], out),
+            ]
+            item_refs = [
+                (self._ref(item["product_id"], out), self._ref(item["name"], out), item)
+                for item in data["items"]
+            ]
+            out += ORDER.pack(TAG_ORDER, refs[0], refs[1], refs[2], created_us,
+                              data.get("version", 0), len(item_refs))
+            for product_ref, name_ref, item in item_refs:
+                out += ITEM.pack(product_ref, name_ref, float(item["price"]), item["quantity"])
+        except Exception:
+            del out[start:]
+            self.rollback(mark)
+            raise
+        return out
+
+    def encode_delete(self, order_id: str, out: bytearray = None) -> bytearray:
+        out = bytearray() if out is None else out
+        ref = self._ref(order_id, out)
+        out += DELETE.pack(TAG_DELETE, ref)
+        return out
+
+    def decode(self, buffer: bytes, offset: int = 0) -> Tuple[List[Tuple[int, object]], int]:
+        # Returns (tag, payload) events and the offset after the last complete
+        # record; a torn record at the end is left for the next call.
+        events = []
+        strings = self.strings
+        end = len(buffer)
+        unpack_string, unpack_order, unpack_delete = STRING.unpack_from, ORDER.unpack_from, DELETE.unpack_from
+        iter_items = ITEM.iter_unpack
+        string_size, order_size, item_size, delete_size = STRING.size, ORDER.size, ITEM.size, DELETE.size
+        while offset < end:
+            tag = buffer[offset]
+            if tag == TAG_STRING:
+                start = offset + string_size
+                if start > end:
+                    break
+                length = unpack_string(buffer, offset)[1]
+                if start + length > end:
+                    break
+                strings.append(buffer[start:start + length].decode("utf-8"))
+                offset = start + length
+            elif tag == TAG_ORDER:
+                start = offset + order_size
+                if start > end:
+                    break
+                _, order_ref, customer_ref, status_ref, created_us, version, count = unpack_order(buffer, offset)
+                stop = start + count * item_size
+                if stop > end:
+                    break
+                events.append((TAG_ORDER, {
+                    "order_id": strings[order_ref],
+                    "customer_id": strings[customer_ref],
+                    "status": strings[status_ref],
+                    "created_at": (EPOCH + timedelta(microseconds=created_us)).isoformat(),
+                    "items": [
+                        {"product_id": strings[p], "name": strings[n], "price": price, "quantity": quantity}
+                        for p, n, price, quantity in iter_items(buffer[start:stop])
+                    ],
+                    "version": version,
+                }))
+                offset = stop
+            elif tag == TAG_DELETE:
+                if offset + delete_size > end:
+                    break
+                events.append((TAG_DELETE, strings[unpack_delete(buffer, offset)[1]]))
+                offset += delete_size
+            else:
+                raise ValueError(f"Corrupt order data: unknown record tag {tag} at offset {offset}")
+        return events, offset
+
+
+def encode_orders(orders: List[dict]) -> bytes:
+    codec = OrderCodec()
+    out = bytearray(MAGIC)
+    for data in orders:
+        codec.encode_order(data, out)
+    return bytes(out)
+
+
+def decode_orders(buffer: bytes) -> List[dict]:
+    if not buffer.startswith(MAGIC):
+        raise ValueError("Not an encoded order file")
+    events, _ = OrderCodec().decode(buffer, len(MAGIC))
+    orders = {}
+    for tag, payload in events:
+        if tag == TAG_ORDER:
+            orders[payload["order_id"]] = payload
+        else:
+            orders.pop(payload, None)
+    return list(orders.values())
@@ -0,0 +1,105 @@
+import json
+import os
+import time
+from typing import List, Tuple
+from .fileio import atomic_write_text
+
+HEADER_PREFIX = b"#generation "
+GENERATION_SHIFT = 48
+OFFSET_MASK = (1 << GENERATION_SHIFT) - 1
+
+
+class OrderFeed:
+    # Sequence numbers are (generation << 48) | byte offset into the feed
+    # file, so within a generation "changes since N" is a single seek. The
+    # file starts with a "#generation N" line; reset() and compact() replace
+    # it with an empty feed of the next generation, so a reader holding a
+    # sequence number from an older generation can tell it must reload
+    # instead of silently skipping whatever was dropped. Files written before
+    # generations existed have no header and count as generation 0.
+    def __init__(self, feed_file: str):
+        self.feed_file = feed_file
+
+    def publish(self, order_data: dict) -> int:
+        # Returns the size of the feed file after the append.
+        line = json.dumps(order_data, separators=(",", ":")) + "\n"
+        with open(self.feed_file, "a", encoding="utf-8") as f:
+            f.write(line)
+            f.flush()
+            return f.tell()
+
+    def _header(self, f) -> Tuple[int, int]:
+        # (generation, offset of the first record)
+        first = f.readline()
+        if first.startswith(HEADER_PREFIX) and first.endswith(b"\n"):
+            try:
+                return int(first[len(HEADER_PREFIX):]), len(first)
+            except ValueError:
+                pass
+        return 0, 0
+
+    def _state(self) -> Tuple[int, int, int]:
+        # (generation, first record offset, size)
+        try:
+            with open(self.feed_file, "rb") as f:
+                generation, start = self._header(f)
+                return generation, start, os.fstat(f.fileno()).st_size
+        except FileNotFoundError:
+            return 0, 0, 0
+
+    def generation(self) -> int:
+        return self._state()[0]
+
+    def latest_seq(self) -> int:
+        generation, _, size = self._state()
+        return (generation << GENERATION_SHIFT) | size
+
+    def is_current(self, seq: int) -> bool:
+        # False once the feed was reset or compacted after `seq` was taken;
+        # the reader has missed changes and must reload from the store.
+        generation, _, size = self._state()
+        return seq >> GENERATION_SHIFT == generation and seq & OFFSET_MASK <= size
+
+    def changes_since(self, seq: int) -> Tuple[List[dict], int]:
+        try:
+            with open(self.feed_file, "rb") as f:
+                generation, start = self._header(f)
+                offset = seq & OFFSET_MASK
+                size = os.fstat(f.fileno()).st_size
+                if seq >> GENERATION_SHIFT != generation or offset > size or offset < start:
+                    # The feed was reset underneath the reader; start over.
+                    offset = start
+                f.seek(offset)
+                chunk = f.read()
+        except FileNotFoundError:
+            return [], 0
+
+        # Only whole lines are consumed; a half-written record is picked up
+        # on the next call.
+        end = chunk.rfind(b"\n") + 1
+        changes = []
+        for line in chunk[:end].splitlines():
+            try:
+                changes.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+        return changes, (generation << GENERATION_SHIFT) | (offset + end)
+
+    def wait_for_changes(self, seq: int, timeout: float = 30.0, poll_interval: float = 0.25) -> bool:
+        deadline = time.monotonic() + timeout
+        while True:
+            if self.latest_seq() != seq:
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(poll_interval)
+
+    def compact(self) -> int:
+        # Drops every record and starts the next generation. Callers hold the
+        # orders lock so no publish lands in the file being replaced.
+        generation = self.generation() + 1
+        atomic_write_text(self.feed_file, f"{HEADER_PREFIX.decode()}{generation}\n")
+        return generation
+
+    def reset(self) -> None:
+        self.compact()
@@ -0,0 +1,128 @@
+import json
+import os
+import tempfile
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    # Inter-process exclusive lock held on a side file, so the data file
+    # itself can be replaced atomically while the lock is held.
+    def __init__(self, lock_file: str, timeout: float = 30.0):
+        self.lock_file = lock_file
+        self.timeout = timeout
+        self._fd = None
+
+    def acquire(self) -> None:
+        self._fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            return
+
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_NBLCK, 1)
+                return
+            except OSError:
+                if time.monotonic() >= deadline:
+                    os.close(self._fd)
+                    self._fd = None
+                    raise TimeoutError(f"Timed out waiting for lock {self.lock_file}")
+                time.sleep(0.01)
+
+    def release(self) -> None:
+        if self._fd is None:
+            return
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        else:
+            os.lseek(self._fd, 0, os.SEEK_SET)
+            msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        os.close(self._fd)
+        self._fd = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+
+def atomic_write_text(filename: str, content: str) -> None:
+    atomic_write_bytes(filename, content.encode("utf-8"))
+
+
+def atomic_write_bytes(filename: str, content: bytes) -> None:
+    directory = os.path.dirname(filename) or "."
+    fd, tmp_file = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=os.path.basename(filename))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, filename)
+    except BaseException:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise
+
+
+def atomic_write_json(filename: str, data, indent: int = 4) -> None:
+    atomic_write_text(filename, json.dumps(data, indent=indent))
+
+
+def iter_json_array(filename: str, chunk_size: int = 1 << 16):
+    # Yields the elements of a JSON array file one at a time. The file is
+    # read in chunks and each element decoded as soon as it is complete, so
+    # memory follows the largest element rather than the whole file. A
+    # missing or empty file yields nothing. The files are written
+    # atomically, so anything else that fails to parse is damage: it is
+    # reported once and the iteration ends with the elements read so far.
+    decoder = json.JSONDecoder()
+    try:
+        f = open(filename, "r", encoding="utf-8")
+    except FileNotFoundError:
+        return
+    with f:
+        buffer, pos, started, offset = "", 0, False, 0
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos == len(buffer):
+                offset += len(buffer)
+                buffer, pos = f.read(chunk_size), 0
+                if not buffer:
+                    if started:
+                        print(f"Error: {filename} is truncated; read it up to character {offset}")
+                    return
+                continue
+            if not started:
+                if buffer[pos] != "[":
+                    print(f"Error: {filename} does not hold a JSON array")
+                    return
+                started = True
+                pos += 1
+                continue
+            if buffer[pos] == "]":
+                return
+            try:
+                value, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError as e:
+                # Element cut off at the chunk boundary: read more of it.
+                # At the end of the file more input cannot help.
+                more = f.read(max(chunk_size, len(buffer) - pos))
+                if not more:
+                    print(f"Error: {filename} is damaged at character {offset + e.pos}: {e.msg}")
+                    return
+                offset += pos
+                buffer, pos = buffer[pos:] + more, 0
+                continue
+            yield value
@@ -0,0 +1,89 @@
+import os
+import random
+import threading
+import time
+
+# Crockford base32: no I, L, O or U, so IDs read back unambiguously.
+ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+ID_LENGTH = 16
+NODE_BITS = 16
+SEQUENCE_BITS = 16
+
+
+def _encode(value: int) -> str:
+    chars = []
+    for _ in range(ID_LENGTH):
+        chars.append(ALPHABET[value & 31])
+        value >>= 5
+    return "".join(reversed(chars))
+
+
+def _default_node() -> int:
+    configured = os.environ.get("SRS_NODE_ID", "").strip()
+    if configured:
+        try:
+            node = int(configured)
+        except ValueError:
+            node = -1
+        if 0 <= node < 1 << NODE_BITS:
+            return node
+        print(f"WARNING: SRS_NODE_ID={configured!r} is not a number from 0 to {(1 << NODE_BITS) - 1}; "
+              "using a random node")
+    return random.SystemRandom().getrandbits(NODE_BITS)
+
+
+class IdGenerator:
+    # 80-bit IDs: milliseconds since the epoch, a node number and a sequence
+    # within the millisecond, written as 16 base32 characters so that string
+    # order is creation order. Every process generating IDs at the same time
+    # needs its own node; set SRS_NODE_ID per terminal, or each process picks
+    # a random one. Time never goes backwards for a generator, and once a
+    # millisecond's sequence is used up the next millisecond is borrowed.
+    def __init__(self, node: int = None):
+        self.node = _default_node() if node is None else node & ((1 << NODE_BITS) - 1)
+        self._lock = threading.Lock()
+        self._last_ms = 0
+        self._sequence = 0
+
+    def next_value(self) -> int:
+        with self._lock:
+            now = time.time_ns() // 1_000_000
+            if now > self._last_ms:
+                self._last_ms = now
+                self._sequence = 0
+            else:
+                self._sequence += 1
+                if self._sequence >> SEQUENCE_BITS:
+                    self._last_ms += 1
+                    self._sequence = 0
+            return (((self._last_ms << NODE_BITS) | self.node) << SEQUENCE_BITS) | self._sequence
+
+    def new_id(self, prefix: str) -> str:
+        return f"{prefix}-{_encode(self.next_value())}"
+
+
+_generator = IdGenerator()
+
+
+def _reseed_after_fork() -> None:
+    # A forked child would otherwise share its parent's node and sequence.
+    # SRS_NODE_ID names the parent's node, so the child ignores it and
+    # picks a random node other than the parent's.
+    global _generator
+    node = parent = _generator.node
+    while node == parent:
+        node = random.SystemRandom().getrandbits(NODE_BITS)
+    _generator = IdGenerator(node)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reseed_after_fork)
+
+
+def new_order_id() -> str:
+    return _generator.new_id("ORD")
+
+
+def new_receipt_id() -> str:
+    return _generator.new_id("RCP")
+
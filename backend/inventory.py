@@ -0,0 +1,204 @@
+import json
+import os
+from typing import Dict, FrozenSet, List, Optional
+from . import metrics
+from .fileio import FileLock, atomic_write_json
+from .order import Order
+
+INVENTORY_FILE = "data/inventory.json"
+
+
+def _empty_state() -> dict:
+    return {"stock": {}, "recipes": {}, "reservations": {}}
+
+
+class Inventory:
+    # Stock counters and recipes, shared by every terminal through
+    # inventory.json:
+    #   stock         ingredient -> amount on hand, reservations already taken off
+    #   recipes       menu item ID -> {ingredient: amount per portion}
+    #   reservations  order ID -> {ingredient: amount} held for a submitted order
+    # An item without a recipe is its own ingredient, so bottled drinks can be
+    # counted by the portion. Items with neither a recipe nor a stock entry
+    # are not tracked and never sell out.
+    #
+    # Reads come from a cached copy that is reloaded only when the file's
+    # stamp changes, and the sold-out set is worked out once per reload, so an
+    # availability check is a stat() and a few dict lookups. reserve() and
+    # release() re-read and write under the file lock; that, not the cached
+    # check, is what stops two terminals selling the last portion twice.
+    def __init__(self, filename: str = None):
+        self.filename = filename or INVENTORY_FILE
+        self.state = _empty_state()
+        self._stamp = None
+        self._sold_out: FrozenSet[str] = frozenset()
+
+    def _file_stamp(self):
+        try:
+            st = os.stat(self.filename)
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def _load(self) -> dict:
+        try:
+            with open(self.filename, "r") as f:
+                state = json.load(f)
+        except (json.JSONDecodeError, FileNotFoundError):
+            return _empty_state()
+        for key, value in _empty_state().items():
+            state.setdefault(key, value)
+        return state
+
+    def _use(self, state: dict, stamp) -> None:
+        self.state = state
+        self._stamp = stamp
+        ingredients = {ingredient for recipe in state["recipes"].values() for ingredient in recipe}
+        items = set(state["recipes"]) | (set(state["stock"]) - ingredients)
+        sold_out = frozenset(item_id for item_id in items if not self._covers(self.needs(item_id, 1)))
+        # Keep the same object when nothing changed so callers can skip work.
+        if sold_out != self._sold_out:
+            self._sold_out = sold_out
+
+    def refresh(self) -> None:
+        stamp = self._file_stamp()
+        if stamp != self._stamp:
+            self._use(self._load(), stamp)
+
+    def _save(self, state: dict) -> None:
+        directory = os.path.dirname(self.filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        atomic_write_json(self.filename, state)
+        self._use(state, self._file_stamp())
+
+    def _locked(self) -> FileLock:
+        directory = os.path.dirname(self.filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        return FileLock(self.filename + ".lock")
+
+    def needs(self, item_id: str, quantity: int) -> Dict[str, float]:
+        recipe = self.state["recipes"].get(item_id)
+        if recipe is None:
+            if item_id not in self.state["stock"]:
+                return {}
+            recipe = {item_id: 1}
+        return {ingredient: amount * quantity for ingredient, amount in recipe.items()}
+
+    def _order_needs(self, order: Order) -> Dict[str, float]:
+        total: Dict[str, float] = {}
+        for item in order.items:
+            for ingredient, amount in self.needs(item.product_id, item.quantity).items():
+                total[ingredient] = total.get(ingredient, 0) + amount
+        return total
+
+    def _covers(self, needs: Dict[str, float]) -> bool:
+        stock = self.state["stock"]
+        return all(stock.get(ingredient, 0) >= amount for ingredient, amount in needs.items())
+
+    def tracked(self, item_id: str) -> bool:
+        self.refresh()
+        return item_id in self.state["recipes"] or item_id in self.state["stock"]
+
+    def available(self, item_id: str, quantity: int = 1) -> bool:
+        self.refresh()
+        if quantity == 1:
+            return item_id not in self._sold_out
+        return self._covers(self.needs(item_id, quantity))
+
+    def portions(self, item_id: str) -> Optional[int]:
+        # How many more of an item can be sold; None when it is not tracked.
+        self.refresh()
+        needs = self.needs(item_id, 1)
+        if not needs:
+            return None
+        stock = self.state["stock"]
+        counts = [int(stock.get(ingredient, 0) // amount) for ingredient, amount in needs.items() if amount > 0]
+        return max(0, min(counts)) if counts else None
+
+    def sold_out(self) -> FrozenSet[str]:
+        self.refresh()
+        return self._sold_out
+
+    def reserve(self, order: Order) -> bool:
+        short = self.try_reserve(order)
+        if short:
+            print(f"Error: Not enough stock for {', '.join(short)}")
+            return False
+        return True
+
+    @metrics.timed("inventory.reserve")
+    def try_reserve(self, order: Order) -> List[str]:
+        # All or nothing: either every line of the order is taken off stock or
+        # nothing is, and the names of the items that ran short come back.
+        # Reserving an order again replaces its old reservation.
+        with self._locked():
+            state = self._load()
+            self.state = state
+            stock = state["stock"]
+            previous = state["reservations"].pop(order.order_id, None)
+            for ingredient, amount in (previous or {}).items():
+                stock[ingredient] = stock.get(ingredient, 0) + amount
+            needs = self._order_needs(order)
+            missing = {ingredient for ingredient, amount in needs.items() if stock.get(ingredient, 0) < amount}
+            if missing:
+                # The cached copy now holds unsaved changes; reload it next time.
+                self._stamp = None
+                metrics.count("inventory.short")
+                return [item.name for item in order.items if missing & set(self.needs(item.product_id, 1))]
+            for ingredient, amount in needs.items():
+                stock[ingredient] = stock.get(ingredient, 0) - amount
+            if needs:
+                state["reservations"][order.order_id] = needs
+            if needs or previous:
+                self._save(state)
+        return []
+
+    @metrics.timed("inventory.release")
+    def release(self, order_id: str) -> bool:
+        # Puts a cancelled order's reservation back on the shelf.
+        with self._locked():
+            state = self._load()
+            held = state["reservations"].pop(order_id, None)
+            if held is None:
+                return False
+            for ingredient, amount in held.items():
+                state["stock"][ingredient] = state["stock"].get(ingredient, 0) + amount
+            self._save(state)
+        return True
+
+    def consume(self, order_id: str) -> bool:
+        # A completed order used what it reserved; only the record goes.
+        with self._locked():
+            state = self._load()
+            if state["reservations"].pop(order_id, None) is None:
+                return False
+            self._save(state)
+        return True
+
+    def restock(self, ingredient: str, amount: float) -> float:
+        with self._locked():
+            state = self._load()
+            state["stock"][ingredient] = state["stock"].get(ingredient, 0) + amount
+            self._save(state)
+        return state["stock"][ingredient]
+
+    def set_recipe(self, item_id: str, recipe: Dict[str, float]) -> None:
+        # An empty recipe goes back to counting the item itself.
+        with self._locked():
+            state = self._load()
+            if recipe:
+                state["recipes"][item_id] = dict(recipe)
+            else:
+                state["recipes"].pop(item_id, None)
+            self._save(state)
+
+    def levels(self) -> List[dict]:
+        self.refresh()
+        reserved: Dict[str, float] = {}
+        for held in self.state["reservations"].values():
+            for ingredient, amount in held.items():
+                reserved[ingredient] = reserved.get(ingredient, 0) + amount
+        return [{"ingredient": ingredient, "on_hand": amount, "reserved": reserved.get(ingredient, 0)}
+                for ingredient, amount in sorted(self.state["stock"].items())]
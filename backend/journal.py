@@ -0,0 +1,129 @@
+import json
+import os
+from typing import Dict, Iterator, List, Tuple
+from .fileio import atomic_write_json, iter_json_array
+
+
+class OrderJournal:
+    UPSERT = "upsert"
+    STATUS = "status"
+    DELETE = "delete"
+
+    def __init__(self, snapshot_file: str, journal_file: str):
+        self.snapshot_file = snapshot_file
+        self.journal_file = journal_file
+
+    def append_upsert(self, order_data: dict) -> None:
+        self._append({"op": self.UPSERT, "order": order_data})
+
+    def append_status(self, order_id: str, status: str, version: int) -> None:
+        self._append({"op": self.STATUS, "order_id": order_id, "status": status, "version": version})
+
+    def append_delete(self, order_id: str) -> None:
+        self._append({"op": self.DELETE, "order_id": order_id})
+
+    def _append(self, record: dict) -> None:
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        with open(self.journal_file, "a", encoding="utf-8") as f:
+            f.write(line)
+            f.flush()
+
+    def journal_size(self) -> int:
+        try:
+            return os.path.getsize(self.journal_file)
+        except OSError:
+            return 0
+
+    def snapshot_generation(self) -> Tuple[int, int]:
+        # Compaction replaces the snapshot file, which changes its stat.
+        try:
+            st = os.stat(self.snapshot_file)
+            return st.st_mtime_ns, st.st_size
+        except OSError:
+            return 0, 0
+
+    def load_snapshot(self) -> Dict[str, dict]:
+        orders = {}
+        try:
+            with open(self.snapshot_file, "r", encoding="utf-8") as f:
+                for data in json.load(f):
+                    orders[data["order_id"]] = data
+        except (json.JSONDecodeError, FileNotFoundError):
+            pass
+        return orders
+
+    def replay(self) -> List[dict]:
+        orders = self.load_snapshot()
+        records, _ = self.read_from(0)
+        for record in records:
+            self.apply(orders, record)
+        return list(orders.values())
+
+    def iter_replay(self) -> Iterator[dict]:
+        # Same orders as replay(), but the snapshot is streamed instead of
+        # loaded. The journal is bounded by compaction, so its records are
+        # read up front and grouped by order to patch snapshot entries as
+        # they go past.
+        records, _ = self.read_from(0)
+        by_order: Dict[str, List[dict]] = {}
+        for record in records:
+            order_id = record["order"]["order_id"] if record.get("op") == self.UPSERT else record["order_id"]
+            by_order.setdefault(order_id, []).append(record)
+
+        for data in iter_json_array(self.snapshot_file):
+            changes = by_order.pop(data["order_id"], None)
+            if changes:
+                orders = {data["order_id"]: data}
+                for record in changes:
+                    self.apply(orders, record)
+                data = orders.get(data["order_id"])
+            if data is not None:
+                yield data
+        for order_id, changes in by_order.items():
+            orders = {}
+            for record in changes:
+                self.apply(orders, record)
+            if order_id in orders:
+                yield orders[order_id]
+
+    def read_from(self, offset: int) -> Tuple[List[dict], int]:
+        try:
+            with open(self.journal_file, "rb") as f:
+                f.seek(offset)
+                chunk = f.read()
+        except FileNotFoundError:
+            return [], 0
+
+        # A torn last line from an interrupted write is left for later.
+        end = chunk.rfind(b"\n") + 1
+        records = []
+        for line in chunk[:end].splitlines():
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+        return records, offset + end
+
+    def apply(self, orders: Dict[str, dict], record: dict) -> None:
+        op = record.get("op")
+        if op == self.UPSERT:
+            data = record["order"]
+            orders[data["order_id"]] = data
+        elif op == self.STATUS:
+            data = orders.get(record["order_id"])
+            if data is not None:
+                data["status"] = record["status"]
+                data["version"] = record.get("version", data.get("version", 0))
+        elif op == self.DELETE:
+            orders.pop(record["order_id"], None)
+
+    def compact(self) -> int:
+        orders = self.replay()
+        atomic_write_json(self.snapshot_file, orders)
+        with open(self.journal_file, "w", encoding="utf-8"):
+            pass
+        return len(orders)
+
+    def clear(self) -> None:
+        if os.path.exists(self.journal_file):
+            os.remove(self.journal_file)
@@ -0,0 +1,42 @@
+from typing import Dict, List
+from .order import Order, get_order_changes, get_order_feed, get_pending_orders
+
+
+class PendingOrderQueue:
+    def __init__(self):
+        self.feed = get_order_feed()
+        self.seq = 0
+        self.pending: Dict[str, Order] = {}
+        self.bootstrap()
+
+    def bootstrap(self) -> None:
+        # Take the cursor first: anything saved while the full load runs is
+        # replayed again from the feed, which is harmless because it upserts.
+        self.seq = self.feed.latest_seq()
+        self.pending = {o.order_id: o for o in get_pending_orders()}
+
+    def refresh(self) -> int:
+        if not self.feed.is_current(self.seq):
+            # The feed was compacted or reset; changes may have been dropped.
+            self.bootstrap()
+            return len(self.pending)
+
+        changes, self.seq = get_order_changes(self.seq)
+        for order in changes:
+            if order.status == Order.PENDING:
+                self.pending[order.order_id] = order
+            else:
+                self.pending.pop(order.order_id, None)
+        return len(changes)
+
+    def wait(self, timeout: float = 30.0) -> bool:
+        if not self.feed.wait_for_changes(self.seq, timeout):
+            return False
+        self.refresh()
+        return True
+
+    def orders(self) -> List[Order]:
+        return list(self.pending.values())
+
+    def mark_done(self, order: Order) -> None:
+        self.pending.pop(order.order_id, None)
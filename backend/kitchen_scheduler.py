@@ -0,0 +1,217 @@
+import heapq
+import json
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from .fileio import FileLock, atomic_write_json
+from .order import Order, OrderItem
+
+SCHEDULER_FILE = "data/kitchen.json"
+STATION_BY_CATEGORY = {
+    "Food": "Grill",
+    "Extra": "Grill",
+    "Drinks": "Bar",
+    "Drink": "Bar",
+    "Dessert": "Pastry",
+    "Desserts": "Pastry",
+}
+THROUGHPUT_WINDOW = 3600
+STALE_PROGRESS = 24 * 3600
+
+
+def station_for(category: str) -> str:
+    return STATION_BY_CATEGORY.get(category, category or "Kitchen")
+
+
+class Ticket:
+    __slots__ = ("order", "station", "items", "rush")
+
+    def __init__(self, order: Order, station: str, items: List[OrderItem], rush: bool = False):
+        self.order = order
+        self.station = station
+        self.items = items
+        self.rush = rush
+
+    def key(self) -> tuple:
+        # Rush tickets first, then oldest first.
+        return (0 if self.rush else 1, self.order.created_at, self.order.order_id)
+
+    def age(self, now: float = None) -> float:
+        return (now or time.time()) - self.order.created_at.timestamp()
+
+
+class KitchenScheduler:
+    # Splits pending orders into one ticket per station and keeps a heap of
+    # tickets per station. Heaps are updated from the order queue's changes;
+    # tickets for orders that left the queue, were finished at another
+    # terminal or changed rush flag are dropped lazily when they reach the
+    # top. Ticket progress, rush flags and station stats live in a small
+    # shared file so every kitchen terminal sees the same state.
+    def __init__(self, source, category_of: Callable[[str], str], state_file: str = None):
+        self.source = source
+        self.category_of = category_of
+        self.state_file = state_file or SCHEDULER_FILE
+        self.orders: Dict[str, Order] = {}
+        self.order_stations: Dict[str, List[str]] = {}
+        self.tickets: Dict[Tuple[str, str], Ticket] = {}
+        self.heaps: Dict[str, list] = {}
+        self._pushes = 0
+        self.state = self._empty_state()
+
+    @staticmethod
+    def _empty_state() -> dict:
+        return {"progress": {}, "rush": [], "stats": {}}
+
+    def _load_state(self) -> dict:
+        try:
+            with open(self.state_file, "r") as f:
+                return json.load(f)
+        except (json.JSONDecodeError, FileNotFoundError):
+            return self._empty_state()
+
+    def split(self, order: Order) -> Dict[str, List[OrderItem]]:
+        by_station: Dict[str, List[OrderItem]] = {}
+        for item in order.items:
+            by_station.setdefault(station_for(self.category_of(item.product_id)), []).append(item)
+        return by_station
+
+    def _push(self, ticket: Ticket) -> None:
+        self.tickets[(ticket.order.order_id, ticket.station)] = ticket
+        self._pushes += 1
+        heapq.heappush(self.heaps.setdefault(ticket.station, []), (ticket.key(), self._pushes, ticket))
+
+    def _done(self, order_id: str, station: str) -> bool:
+        progress = self.state["progress"].get(order_id)
+        return progress is not None and station in progress["stations"]
+
+    def _live(self, entry) -> bool:
+        key, _, ticket = entry
+        current = self.tickets.get((ticket.order.order_id, ticket.station))
+        return current is ticket and key == ticket.key() and not self._done(ticket.order.order_id, ticket.station)
+
+    def refresh(self) -> None:
+        self.source.refresh()
+        self.state = self._load_state()
+        rush = set(self.state["rush"])
+        pending = {order.order_id: order for order in self.source.orders()}
+
+        for order_id in list(self.orders):
+            if order_id not in pending:
+                del self.orders[order_id]
+                for station in self.order_stations.pop(order_id):
+                    self.tickets.pop((order_id, station), None)
+        for order_id, order in pending.items():
+            if order_id not in self.orders:
+                self.orders[order_id] = order
+                by_station = self.split(order)
+                self.order_stations[order_id] = list(by_station)
+                for station, items in by_station.items():
+                    self._push(Ticket(order, station, items, order_id in rush))
+        for ticket in list(self.tickets.values()):
+            if ticket.rush != (ticket.order.order_id in rush):
+                self._push(Ticket(ticket.order, ticket.station, ticket.items, not ticket.rush))
+        for station, heap in self.heaps.items():
+            if len(heap) > 2 * len(self.tickets) + 64:
+                heap[:] = [entry for entry in heap if self._live(entry)]
+                heapq.heapify(heap)
+
+    def stations(self) -> List[str]:
+        return sorted(self.heaps)
+
+    def next_ticket(self, station: str) -> Optional[Ticket]:
+        heap = self.heaps.get(station, [])
+        while heap and not self._live(heap[0]):
+            heapq.heappop(heap)
+        return heap[0][2] if heap else None
+
+    def queue(self, station: str) -> List[Ticket]:
+        if self.next_ticket(station) is None:
+            return []
+        return [entry[2] for entry in sorted(entry for entry in self.heaps[station] if self._live(entry))]
+
+    def remaining(self, order_id: str) -> List[str]:
+        return [station for station in self.order_stations.get(order_id, []) if not self._done(order_id, station)]
+
+    def set_rush(self, order_id: str, rush: bool = True) -> None:
+        with FileLock(self.state_file + ".lock"):
+            state = self._load_state()
+            flagged = set(state["rush"])
+            if rush:
+                flagged.add(order_id)
+            else:
+                flagged.discard(order_id)
+            state["rush"] = sorted(flagged)
+            atomic_write_json(self.state_file, state)
+        self.refresh()
+
+    def complete_ticket(self, ticket: Ticket) -> bool:
+        # Marks the ticket done and returns True when it was the order's last
+        # open ticket, in which case the caller completes the order.
+        order = ticket.order
+        stations = set(self.split(order))
+        now = time.time()
+        with FileLock(self.state_file + ".lock"):
+            state = self._load_state()
+            for order_id, progress in list(state["progress"].items()):
+                if now - progress["at"] > STALE_PROGRESS:
+                    del state["progress"][order_id]
+            progress = state["progress"].setdefault(order.order_id, {"stations": [], "at": now})
+            if ticket.station in progress["stations"]:
+                self.state = state
+                return False
+            progress["stations"].append(ticket.station)
+            progress["at"] = now
+
+            stats = state["stats"].setdefault(ticket.station, {"completed": 0, "wait_total": 0.0,
+                                                               "wait_max": 0.0, "recent": []})
+            wait = ticket.age(now)
+            stats["completed"] += 1
+            stats["wait_total"] += wait
+            stats["wait_max"] = max(stats["wait_max"], wait)
+            stats["recent"] = [t for t in stats["recent"] if now - t <= THROUGHPUT_WINDOW] + [now]
+
+            finished = stations.issubset(progress["stations"])
+            atomic_write_json(self.state_file, state)
+        self.state = state
+        return finished
+
+    def reopen_ticket(self, ticket: Ticket) -> None:
+        # Undoes complete_ticket when the order could not be saved as
+        # COMPLETED, so the ticket shows up again until the next refresh
+        # drops it for an order that left the queue. The station's stats
+        # keep the work it did.
+        with FileLock(self.state_file + ".lock"):
+            state = self._load_state()
+            progress = state["progress"].get(ticket.order.order_id)
+            if progress is not None and ticket.station in progress["stations"]:
+                progress["stations"].remove(ticket.station)
+                atomic_write_json(self.state_file, state)
+        self.state = state
+        if self.tickets.get((ticket.order.order_id, ticket.station)) is ticket:
+            # Its heap entry may have been dropped while it counted as done.
+            self._push(Ticket(ticket.order, ticket.station, ticket.items, ticket.rush))
+
+    def finish_order(self, order_id: str) -> None:
+        # Called once the order itself is saved as COMPLETED.
+        with FileLock(self.state_file + ".lock"):
+            state = self._load_state()
+            state["progress"].pop(order_id, None)
+            state["rush"] = [oid for oid in state["rush"] if oid != order_id]
+            atomic_write_json(self.state_file, state)
+        self.state = state
+
+    def stats(self) -> List[dict]:
+        now = time.time()
+        rows = []
+        for station in sorted(set(self.heaps) | set(self.state["stats"])):
+            stats = self.state["stats"].get(station, {"completed": 0, "wait_total": 0.0, "wait_max": 0.0, "recent": []})
+            waiting = self.queue(station)
+            rows.append({
+                "station": station,
+                "queued": len(waiting),
+                "oldest_wait": max((ticket.age(now) for ticket in waiting), default=0.0),
+                "completed": stats["completed"],
+                "avg_wait": stats["wait_total"] / stats["completed"] if stats["completed"] else 0.0,
+                "max_wait": stats["wait_max"],
+                "per_hour": sum(1 for t in stats["recent"] if now - t <= THROUGHPUT_WINDOW),
+            })
+        return rows
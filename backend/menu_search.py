@@ -0,0 +1,337 @@
+import bisect
+import re
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+WORD = re.compile(r"[0-9a-z]+")
+# Positions given to an item's ID and to its category words, so that for
+# the same word an ID match ranks first and a category match last.
+ID_POSITION = -1
+CATEGORY_POSITION = 1000
+# Typos: terms shorter than MIN_FUZZY_LENGTH are never treated as one, and
+# the FUZZY_CANDIDATES words sharing the most trigrams with a term are
+# checked by edit distance. Trigrams miss swapped letters in short words
+# ("brugr" shares none with "burger"), so terms of up to SHORT_TERM letters
+# that find nothing that way are also checked against every word starting
+# with one of their first two letters.
+MIN_FUZZY_LENGTH = 3
+FUZZY_CANDIDATES = 64
+SHORT_TERM = 6
+# Up to BATCH_SORT new entries are inserted one at a time; a bigger batch is
+# appended and the list re-sorted once.
+BATCH_SORT = 32
+# The scan below reads a term's entries CHUNK at a time. When the narrowest
+# term of a query still covers more than DENSE_RANGE entries, the items of
+# all its terms are intersected up front instead.
+CHUNK = 256
+DENSE_RANGE = 2048
+# Checking the other terms of a query: a term matching more than
+# WORD_SET_LIMIT words is checked by prefix, one word at a time. Otherwise
+# its items are gathered into a set when that takes at most UNION_FACTOR
+# set insertions per item it will be asked about, and its matching words
+# are compared with each item's words when it would take more.
+WORD_SET_LIMIT = 256
+UNION_FACTOR = 4
+
+# (word, position in the name, name length, item ID); sorting these puts
+# exact words before longer ones, then earlier words and shorter names.
+Entry = Tuple[str, int, int, str]
+Matcher = Tuple[str, Sequence[str]]
+ItemFilter = Callable[[List[str]], List[str]]
+
+
+def words(text: str) -> List[str]:
+    return WORD.findall(text.lower())
+
+
+def _entries(item_id: str, name: str, category: str) -> List[Entry]:
+    size = len(name)
+    entries = [(item_id.lower(), ID_POSITION, size, item_id)]
+    for position, word in enumerate(words(name)):
+        entries.append((word, position, size, item_id))
+    for position, word in enumerate(words(category), CATEGORY_POSITION):
+        entries.append((word, position, size, item_id))
+    return entries
+
+
+def _grams(word: str) -> Set[str]:
+    padded = f" {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _distance(a: str, b: str) -> int:
+    # Edit distance counting a swap of neighbouring letters as one edit,
+    # the most common typo at a till.
+    previous, current = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        before, previous, current = previous, current, [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], before[j - 2] + 1)
+    return current[len(b)]
+
+
+class MenuSearchIndex:
+    # Word index over menu item IDs, names and categories for search-as-you-
+    # type at the POS. Every word is kept in one sorted list, which works as
+    # a flattened trie: the items for a prefix are one bisect away and come
+    # out already ranked, so a query stops after `limit` hits instead of
+    # scoring every match. A word with no prefix matches at all is treated
+    # as a typo and widened to the close words of the (much smaller)
+    # vocabulary of name and category words, found through a trigram index
+    # and, for short words, a scan by first letter (see SHORT_TERM).
+    #
+    # Items are added to a pending batch and merged into the sorted lists on
+    # the next search, so building the index for a large menu is one sort.
+    # Per item only the indexed name and category and a tuple of its words
+    # are kept; a menu of 50k items means hundreds of thousands of entries,
+    # and fewer container objects keeps the garbage collector off the build.
+    # Name and category words also map to the set of items using them, so
+    # the other terms of a multi-word query filter candidates by set lookup.
+    def __init__(self, items: Iterable = ()):
+        self._entries: List[Entry] = []
+        self._pending: List[Entry] = []
+        self._items: Dict[str, Tuple[object, str, str]] = {}
+        self._item_words: Dict[str, Tuple[str, ...]] = {}
+        self._counts: Dict[str, int] = {}
+        self._postings: Dict[str, Set[str]] = {}
+        self._ids: Dict[str, str] = {}
+        self._words: List[str] = []
+        self._grams: Dict[str, Set[str]] = {}
+        for item in items:
+            self.add(item)
+
+    def __len__(self):
+        return len(self._items)
+
+    def add(self, item) -> None:
+        item_id = item.id
+        if item_id in self._items:
+            self.remove(item_id)
+        entries = _entries(item_id, item.name, item.category)
+        self._items[item_id] = (item, item.name, item.category)
+        self._item_words[item_id] = tuple(entry[0] for entry in entries)
+        self._pending.extend(entries)
+
+    def remove(self, item_id: str) -> bool:
+        found = self._items.pop(item_id, None)
+        if found is None:
+            return False
+        del self._item_words[item_id]
+        self._flush()
+        for entry in _entries(item_id, found[1], found[2]):
+            i = bisect.bisect_left(self._entries, entry)
+            if i < len(self._entries) and self._entries[i] == entry:
+                del self._entries[i]
+            if entry[1] == ID_POSITION:
+                self._ids.pop(entry[0], None)
+            else:
+                holders = self._postings.get(entry[0])
+                if holders is not None:
+                    holders.discard(item_id)
+                    if not holders:
+                        del self._postings[entry[0]]
+            self._forget(entry[0])
+        return True
+
+    def update(self, item) -> None:
+        self.remove(item.id)
+        self.add(item)
+
+    def _forget(self, word: str) -> None:
+        count = self._counts[word] - 1
+        if count:
+            self._counts[word] = count
+            return
+        del self._counts[word]
+        del self._words[bisect.bisect_left(self._words, word)]
+        for gram in _grams(word):
+            holders = self._grams.get(gram)
+            if holders is not None:
+                holders.discard(word)
+                if not holders:
+                    del self._grams[gram]
+
+    def _flush(self) -> None:
+        if not self._pending:
+            return
+        counts, postings = self._counts, self._postings
+        new_words = []
+        for entry in self._pending:
+            word = entry[0]
+            if entry[1] == ID_POSITION:
+                self._ids[word] = entry[3]
+            else:
+                holders = postings.get(word)
+                if holders is None:
+                    holders = postings[word] = set()
+                holders.add(entry[3])
+            count = counts.get(word, 0)
+            counts[word] = count + 1
+            if not count:
+                new_words.append(word)
+                if entry[1] != ID_POSITION and not word.isdigit():
+                    for gram in _grams(word):
+                        self._grams.setdefault(gram, set()).add(word)
+        for target, added in ((self._entries, self._pending), (self._words, new_words)):
+            if len(added) > BATCH_SORT:
+                target.extend(added)
+                target.sort()
+            else:
+                for value in added:
+                    bisect.insort(target, value)
+        self._pending = []
+
+    def _prefix(self, values: list, term: str) -> Tuple[int, int]:
+        return bisect.bisect_left(values, term), bisect.bisect_left(values, term + "\uffff")
+
+    def _ranges(self, term: str, similar: Sequence[str]) -> List[Tuple[int, int]]:
+        entries = self._entries
+        ranges = [(bisect.bisect_left(entries, (term,)), bisect.bisect_left(entries, (term + "\uffff",)))]
+        for word in similar:
+            ranges.append((bisect.bisect_left(entries, (word,)), bisect.bisect_left(entries, (word + "\x00",))))
+        return ranges
+
+    def _matching_items(self, term: str, similar: Sequence[str], budget: int) -> Optional[Set[str]]:
+        # The set of items with a word matching the term, if it can be had
+        # for about `budget` set insertions; None otherwise.
+        lo, hi = self._prefix(self._words, term)
+        if hi - lo > WORD_SET_LIMIT:
+            return None
+        matched = self._words[lo:hi] + list(similar)
+        holders = [self._postings[word] for word in matched if word in self._postings]
+        owners = [self._ids[word] for word in matched if word in self._ids]
+        if len(holders) == 1 and not owners:
+            return holders[0]
+        if sum(len(items) for items in holders) + len(owners) <= budget:
+            return set(owners).union(*holders)
+        return None
+
+    def _filter(self, term: str, similar: Sequence[str], budget: int) -> ItemFilter:
+        # Keeps the item IDs with a word matching the term, by whichever of
+        # the checks described at WORD_SET_LIMIT is cheapest for a term and
+        # the `budget` candidates it will be asked about.
+        allowed = self._matching_items(term, similar, budget * UNION_FACTOR)
+        if allowed is not None:
+            return _keep_members(allowed)
+
+        item_words = self._item_words
+        lo, hi = self._prefix(self._words, term)
+        if hi - lo > WORD_SET_LIMIT:
+            def has_word_with_prefix(ids: List[str]) -> List[str]:
+                return [item_id for item_id in ids
+                        if any(word.startswith(term) for word in item_words[item_id])]
+            return has_word_with_prefix
+
+        matching = set(self._words[lo:hi]).union(similar)
+
+        def has_matching_word(ids: List[str]) -> List[str]:
+            return [item_id for item_id in ids if not matching.isdisjoint(item_words[item_id])]
+        return has_matching_word
+
+    def _rank(self, item_id: str, term: str, similar: Sequence[str]) -> tuple:
+        # Where the item would come up in a scan of the term's ranges.
+        _, name, category = self._items[item_id]
+        keys = [(0, entry) if entry[0].startswith(term) else (1 + similar.index(entry[0]), entry)
+                for entry in _entries(item_id, name, category)
+                if entry[0].startswith(term) or entry[0] in similar]
+        return min(keys)
+
+    def _collect(self, matchers: List[Matcher], limit: int, found: List[str], seen: Set[str]) -> None:
+        # Walks the narrowest term's ranges in rank order, a chunk at a time,
+        # and keeps the items every other term also matches.
+        ranges = [self._ranges(term, similar) for term, similar in matchers]
+        sizes = [sum(hi - lo for lo, hi in term_ranges) for term_ranges in ranges]
+        narrowest = sizes.index(min(sizes))
+        filters = None
+        if len(matchers) > 1 and sizes[narrowest] > DENSE_RANGE:
+            # Every term is common, but together they may match next to
+            # nothing (two category names, say). Intersect the terms' items
+            # first rather than scan a long range for a handful of hits.
+            matching = [self._matching_items(term, similar, DENSE_RANGE) for term, similar in matchers]
+            if all(items is not None for items in matching):
+                common = set.intersection(*sorted(matching, key=len))
+                if len(common) <= DENSE_RANGE // CHUNK * limit:
+                    term, similar = matchers[narrowest]
+                    ranked = sorted(common, key=lambda item_id: self._rank(item_id, term, similar))
+                    found.extend(item_id for item_id in ranked if item_id not in seen)
+                    del found[limit:]
+                    seen.update(found)
+                    return
+                filters = [_keep_members(common)]
+        if filters is None:
+            filters = [self._filter(term, similar, sizes[narrowest])
+                       for k, (term, similar) in enumerate(matchers) if k != narrowest]
+        entries = self._entries
+        for lo, hi in ranges[narrowest]:
+            for start in range(lo, hi, CHUNK):
+                ids = [entry[3] for entry in entries[start:min(hi, start + CHUNK)]]
+                for keep in filters:
+                    ids = keep(ids)
+                for item_id in ids:
+                    if item_id in seen:
+                        continue
+                    seen.add(item_id)
+                    found.append(item_id)
+                    if len(found) >= limit:
+                        return
+
+    def similar(self, term: str) -> List[str]:
+        # Vocabulary words within one typo (two for longer terms) of `term`,
+        # or of the start of the word, closest first.
+        self._flush()
+        if len(term) < MIN_FUZZY_LENGTH:
+            return []
+        shared = Counter()
+        for gram in _grams(term):
+            shared.update(self._grams.get(gram, ()))
+        close = self._closest(term, [word for word, _ in shared.most_common(FUZZY_CANDIDATES)])
+        if not close and len(term) <= SHORT_TERM:
+            close = self._closest(term, self._words_starting_with(term[:2]))
+        return close
+
+    def _words_starting_with(self, letters: str) -> List[str]:
+        # Name and category words (not IDs or numbers) starting with any of
+        # the letters.
+        found = []
+        for letter in sorted(set(letters)):
+            lo, hi = self._prefix(self._words, letter)
+            found.extend(word for word in self._words[lo:hi] if word in self._postings and not word.isdigit())
+        return found
+
+    def _closest(self, term: str, candidates: Iterable[str]) -> List[str]:
+        allowed = 1 if len(term) <= 4 else 2
+        close = []
+        for word in candidates:
+            distance = min(_distance(term, word), _distance(term, word[:len(term)]))
+            if distance <= allowed:
+                close.append((distance, word))
+        return [word for _, word in sorted(close)]
+
+    def search(self, query: str, limit: int = 10) -> List[object]:
+        terms = words(query)
+        if not terms or limit <= 0:
+            return []
+        self._flush()
+        found: List[str] = []
+        seen: Set[str] = set()
+        misses = []
+        for term in terms:
+            lo, hi = self._prefix(self._words, term)
+            if lo == hi:
+                misses.append(term)
+        if not misses:
+            self._collect([(term, ()) for term in terms], limit, found, seen)
+        else:
+            fuzzy = [(term, self.similar(term) if term in misses else ()) for term in terms]
+            if all(similar for term, similar in fuzzy if term in misses):
+                self._collect(fuzzy, limit, found, seen)
+        return [self._items[item_id][0] for item_id in found]
+
+
+def _keep_members(allowed: Set[str]) -> ItemFilter:
+    def keep(ids: List[str]) -> List[str]:
+        return [item_id for item_id in ids if item_id in allowed]
+    return keep
@@ -1,27 +1,41 @@
 import json
 import os
+from typing import Dict, FrozenSet, Iterable, List, Optional
+from . import metrics
+from .menu_search import MenuSearchIndex
 
 class MenuItem:
+    __slots__ = ("id", "name", "category", "price", "catalog")
+    
     def __init__(self, id: str, name: str, category: str, price: float):
         self.id = id
         self.name = name
         self.category = category
         self.price = price
+        self.catalog = None
     
     def set_price(self, price: float):
         if price < 0:
             return "Error: Price cannot be negative"
         self.price = price
+        self._notify_catalog()
     
     def set_name(self, name: str):
         if not name or not isinstance(name, str):
             return "Error: Name must be a non-empty string"
         self.name = name
+        self._notify_catalog()
     
     def set_category(self, category: str):
         if not category or not isinstance(category, str):
            return "Error: Category must be a non-empty string"
+        old_category = self.category
         self.category = category
+        self._notify_catalog(old_category)
+    
+    def _notify_catalog(self, old_category: str = None):
+        if self.catalog is not None:
+            self.catalog.item_changed(self, old_category)
     
     def to_dict(self):
         return {
@@ -38,6 +52,108 @@ class MenuItem:
     def __str__(self):
         return f"{self.name} ({self.category}) - ${self.price:.2f}"
 
+class MenuCatalog:
+    def __init__(self, items: List[MenuItem] = None):
+        self._by_id: Dict[str, MenuItem] = {}
+        self._by_category: Dict[str, Dict[str, MenuItem]] = {}
+        self._rendered: Optional[str] = None
+        self._sold_out: FrozenSet[str] = frozenset()
+        self._search: Optional[MenuSearchIndex] = None  # built on first search()
+        for item in items or []:
+            self.add(item)
+
+    def add(self, item: MenuItem) -> bool:
+        if item.id in self._by_id:
+            return False
+        self._by_id[item.id] = item
+        self._by_category.setdefault(item.category, {})[item.id] = item
+        item.catalog = self
+        self._rendered = None
+        if self._search is not None:
+            self._search.add(item)
+        return True
+
+    def remove(self, item_id: str) -> Optional[MenuItem]:
+        item = self._by_id.pop(item_id, None)
+        if item is None:
+            return None
+        self._unlink_category(item.id, item.category)
+        item.catalog = None
+        self._rendered = None
+        if self._search is not None:
+            self._search.remove(item_id)
+        return item
+
+    def get(self, item_id: str) -> Optional[MenuItem]:
+        return self._by_id.get(item_id)
+
+    def items(self) -> List[MenuItem]:
+        return list(self._by_id.values())
+
+    def categories(self) -> List[str]:
+        return sorted(self._by_category)
+
+    def items_in_category(self, category: str) -> List[MenuItem]:
+        return list(self._by_category.get(category, {}).values())
+
+    def item_changed(self, item: MenuItem, old_category: str = None) -> None:
+        if old_category is not None and old_category != item.category:
+            self._unlink_category(item.id, old_category)
+            self._by_category.setdefault(item.category, {})[item.id] = item
+        self._rendered = None
+        if self._search is not None:
+            self._search.update(item)
+
+    @metrics.timed("menu.search")
+    def search(self, query: str, limit: int = 10) -> List[MenuItem]:
+        if self._search is None:
+            self._search = MenuSearchIndex(self._by_id.values())
+        return self._search.search(query, limit)
+
+    def set_sold_out(self, item_ids: Iterable[str]) -> None:
+        # Sold-out items stay in the catalog but are left out of render().
+        sold_out = frozenset(item_ids)
+        if sold_out != self._sold_out:
+            self._sold_out = sold_out
+            self._rendered = None
+
+    def is_sold_out(self, item_id: str) -> bool:
+        return item_id in self._sold_out
+
+    def _unlink_category(self, item_id: str, category: str) -> None:
+        members = self._by_category.get(category)
+        if members is None:
+            return
+        members.pop(item_id, None)
+        if not members:
+            del self._by_category[category]
+
+    def render(self) -> str:
+        if self._rendered is None:
+            lines = ["", "=" * 60, "AVAILABLE MENU ITEMS", "=" * 60]
+            for category in self.categories():
+                available = [item for item in self._by_category[category].values()
+                             if item.id not in self._sold_out]
+                if not available:
+                    continue
+                lines.append(f"\n{category.upper()}:")
+                lines.append("-" * 60)
+                for item in available:
+                    lines.append(f"  {item.id:5} | {item.name:20} | ${item.price:6.2f}")
+            lines.append("=" * 60)
+            self._rendered = "\n".join(lines)
+        return self._rendered
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def __contains__(self, item_id):
+        return item_id in self._by_id
+
+    def __iter__(self):
+        return iter(self.items())
+
+@metrics.timed("menu.save")
 def save_menu_items(items, filename="data/menu.json"):
     if not os.path.exists("data"):
         os.makedirs("data")
@@ -50,6 +166,7 @@ def save_menu_items(items, filename="data/menu.json"):
         print(f"Error saving menu: {e}")
         return False
 
+@metrics.timed("menu.load")
 def load_menu_items(filename="data/menu.json"):
     if not os.path.exists(filename):
         return []
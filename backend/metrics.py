@@ -0,0 +1,249 @@
+import atexit
+import bisect
+import cProfile
+import os
+import threading
+import time
+from functools import wraps
+from typing import Dict, List, Tuple
+from .fileio import atomic_write_text
+
+METRICS_FILE = "data/metrics.prom"
+PROFILE_FILE = "data/metrics.prof"
+DUMP_INTERVAL = 30.0
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Off by default. Every hook checks this one flag first, so disabled metrics
+# cost a global lookup per call. Set SRS_METRICS=1 to collect from startup.
+_enabled = False
+_lock = threading.Lock()
+_counters: Dict[str, int] = {}
+_histograms: Dict[str, "Histogram"] = {}
+_dumper = None
+_dump_file = METRICS_FILE
+_profiler = None
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q: float) -> float:
+        # Upper bound of the bucket holding the q-th observation.
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def count(name: str, amount: int = 1) -> None:
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def observe(name: str, seconds: float) -> None:
+    if not _enabled:
+        return
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = Histogram()
+        histogram.observe(seconds)
+
+
+def timed(name: str):
+    # Decorator recording the latency of every call under `name`, and a
+    # `<name>.errors` count for calls that raise.
+    def decorate(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except BaseException:
+                count(name + ".errors")
+                raise
+            finally:
+                observe(name, time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+class _Timer:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            count(self.name + ".errors")
+        observe(self.name, time.perf_counter() - self.start)
+
+
+class _NoTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+
+_NO_TIMER = _NoTimer()
+
+
+def timer(name: str):
+    # Context-manager form of timed(), for blocks inside a larger function.
+    return _Timer(name) if _enabled else _NO_TIMER
+
+
+def summary() -> Tuple[List[tuple], List[tuple]]:
+    # (operation, calls, mean, p95, max) rows in seconds, and (event, count).
+    with _lock:
+        operations = [
+            (name, h.count, h.total / h.count, h.quantile(0.95), h.max)
+            for name, h in sorted(_histograms.items()) if h.count
+        ]
+        counters = sorted(_counters.items())
+    return operations, counters
+
+
+def render_prometheus() -> str:
+    lines = [
+        "# HELP srs_operation_seconds Latency of instrumented operations.",
+        "# TYPE srs_operation_seconds histogram",
+    ]
+    with _lock:
+        for name, h in sorted(_histograms.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(BUCKETS, h.counts):
+                cumulative += bucket_count
+                lines.append(f'srs_operation_seconds_bucket{{operation="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'srs_operation_seconds_bucket{{operation="{name}",le="+Inf"}} {h.count}')
+            lines.append(f'srs_operation_seconds_sum{{operation="{name}"}} {h.total:.6f}')
+            lines.append(f'srs_operation_seconds_count{{operation="{name}"}} {h.count}')
+        lines.append("# HELP srs_events_total Counted events.")
+        lines.append("# TYPE srs_events_total counter")
+        for name, value in sorted(_counters.items()):
+            lines.append(f'srs_events_total{{event="{name}"}} {value}')
+    return "\n".join(lines) + "\n"
+
+
+def dump_file() -> str:
+    return _dump_file
+
+
+def dump(filename: str = None) -> None:
+    filename = filename or _dump_file
+    directory = os.path.dirname(filename)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    atomic_write_text(filename, render_prometheus())
+
+
+class _Dumper(threading.Thread):
+    def __init__(self, interval: float):
+        super().__init__(name="metrics-dumper", daemon=True)
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                dump()
+            except OSError:
+                pass
+
+
+def enable(interval: float = None, filename: str = None) -> None:
+    # Starts collecting, and dumps to `filename` every `interval` seconds
+    # (never if interval is 0).
+    global _enabled, _dumper, _dump_file
+    _enabled = True
+    _dump_file = filename or _dump_file
+    interval = DUMP_INTERVAL if interval is None else interval
+    if _dumper is None and interval > 0:
+        _dumper = _Dumper(interval)
+        _dumper.start()
+
+
+def disable() -> None:
+    global _enabled, _dumper
+    _enabled = False
+    if _dumper is not None:
+        _dumper.stopped.set()
+        _dumper = None
+
+
+def reset() -> None:
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+def start_profiling() -> None:
+    # cProfile is far from free, so it only runs when asked for explicitly.
+    global _profiler
+    if _profiler is None:
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+
+
+def stop_profiling(filename: str = None) -> None:
+    global _profiler
+    if _profiler is None:
+        return
+    _profiler.disable()
+    filename = filename or PROFILE_FILE
+    directory = os.path.dirname(filename)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    _profiler.dump_stats(filename)
+    _profiler = None
+
+
+def _shutdown() -> None:
+    if _enabled:
+        try:
+            dump()
+        except OSError:
+            pass
+    profile = os.environ.get("SRS_PROFILE", "")
+    stop_profiling(profile if profile not in ("", "1") else None)
+
+
+atexit.register(_shutdown)
+
+if os.environ.get("SRS_METRICS", "") not in ("", "0"):
+    enable(float(os.environ.get("SRS_METRICS_INTERVAL", DUMP_INTERVAL)), os.environ.get("SRS_METRICS_FILE"))
+if os.environ.get("SRS_PROFILE"):
+    start_profiling()
@@ -0,0 +1,37 @@
+from decimal import Decimal, ROUND_HALF_EVEN, ROUND_HALF_UP
+from typing import Union
+
+Number = Union[int, float, str, Decimal]
+
+CENT = Decimal("0.01")
+
+
+def to_decimal(value: Number) -> Decimal:
+    if isinstance(value, Decimal):
+        return value
+    if isinstance(value, float):
+        # repr() is the shortest string that round-trips, so 0.08 becomes
+        # Decimal("0.08") rather than its binary approximation.
+        return Decimal(repr(value))
+    return Decimal(value)
+
+
+def to_cents(amount: Number) -> int:
+    if isinstance(amount, float):
+        # Menu prices already sit on whole cents; only values between cents
+        # need the decimal rounding below.
+        cents = round(amount * 100)
+        if abs(amount * 100 - cents) < 1e-6:
+            return cents
+    return int(to_decimal(amount).quantize(CENT, rounding=ROUND_HALF_UP) * 100)
+
+
+def from_cents(cents: int) -> float:
+    return cents / 100
+
+
+def shown_cents(amount: float) -> int:
+    # The cents "{:.2f}" prints for this float: its exact binary value
+    # rounded half-even, so 25.395 (really 25.39499...) gives 2539.
+    return int(Decimal(amount).quantize(CENT, rounding=ROUND_HALF_EVEN) * 100)
+
@@ -1,21 +1,70 @@
 from datetime import datetime
-from typing import List, Dict
-import uuid
+from typing import Iterable, Iterator, List, Dict, Optional, Tuple
 import json
 import os
+from .repository import OrderRepository, OrderConflictError, JsonOrderRepository, JournalOrderRepository, order_filter
+from .sqlite_repository import SqliteOrderRepository
+from .binary_repository import BinaryOrderRepository
+from .feed import OrderFeed
+from .order_archive import OrderArchive
+from .fileio import FileLock
+from .money import to_cents, from_cents
+from . import metrics
+from .ids import new_order_id
 
 DATA_FILE = "data/orders.json"
+JOURNAL_FILE = "data/orders.journal"
+SQLITE_FILE = "data/orders.db"
+BINARY_FILE = "data/orders.bin"
+FEED_FILE = "data/orders.feed"
+LOCK_FILE = "data/orders.lock"
+ARCHIVE_DIR = "data/archive"
+
+# "json" rewrites DATA_FILE on every save, "journal" appends to JOURNAL_FILE
+# and folds it back into DATA_FILE once it grows past JOURNAL_COMPACT_BYTES,
+# "sqlite" keeps indexed tables in SQLITE_FILE and "binary" appends compact
+# OrderCodec records to BINARY_FILE.
+STORAGE_MODES = ("json", "journal", "sqlite", "binary")
+STORAGE_MODE = "json"
+JOURNAL_COMPACT_BYTES = 1024 * 1024
+
+# Every save appends the whole order to FEED_FILE; once it passes this size
+# the next save starts a new feed generation and readers reload.
+FEED_COMPACT_BYTES = 4 * 1024 * 1024
+
+# Orders that reach COMPLETED or CANCELLED are moved out of the live store
+# into day partitions under ARCHIVE_DIR as soon as they are saved.
+ARCHIVE_FINISHED_ORDERS = True
+
+_repository = None
+_repository_key = None
+_archive = None
 
 class OrderItem:
+    __slots__ = ("product_id", "name", "_price", "price_cents", "quantity")
+    
     def __init__(self, product_id: str, name: str, price: float, quantity: int = 1):
         self.product_id = product_id
         self.name = name
         self.price = price
         self.quantity = quantity
     
+    @property
+    def price(self) -> float:
+        return self._price
+    
+    @price.setter
+    def price(self, price: float) -> None:
+        self._price = price
+        self.price_cents = to_cents(price)
+    
+    @property
+    def subtotal_cents(self) -> int:
+        return self.price_cents * self.quantity
+    
     @property
     def subtotal(self) -> float:
-        return self.price * self.quantity
+        return from_cents(self.subtotal_cents)
 
     def to_dict(self):
         return {
@@ -37,51 +86,97 @@ class Order:
     COMPLETED = "COMPLETED"
     CANCELLED = "CANCELLED"
     
+    __slots__ = (
+        "order_id", "customer_id", "_lines", "_items", "_total_cents", "revision",
+        "status", "created_at", "updated_at", "version",
+    )
+    
     def __init__(self, customer_id: str, order_id: str = None):
-        self.order_id = order_id or f"ORD-{uuid.uuid4().hex[:8].upper()}"
+        self.order_id = order_id or new_order_id()
         self.customer_id = customer_id
-        self.items: List[OrderItem] = []
+        # Lines are indexed by product_id; `items` is a read-only tuple of them
+        # in insertion order, built on first use after the lines change. Lines
+        # are only added or dropped through add_item/remove_item, which keep
+        # the index and the running total in step.
+        # `revision` changes whenever the lines do, for callers that cache
+        # figures derived from them.
+        self._lines: Dict[str, OrderItem] = {}
+        self._items: Optional[Tuple[OrderItem, ...]] = ()
+        self._total_cents = 0
+        self.revision = 0
         self.status = self.DRAFT
         self.created_at = datetime.now()
         self.updated_at = self.created_at
+        self.version = 0
+    
+    @property
+    def items(self) -> Tuple[OrderItem, ...]:
+        if self._items is None:
+            self._items = tuple(self._lines.values())
+        return self._items
+    
+    @items.setter
+    def items(self, items: Iterable[OrderItem]) -> None:
+        self._lines = {}
+        self._items = None
+        self._total_cents = 0
+        self.revision += 1
+        for item in items:
+            self._add_line(item.product_id, item.name, item.price, item.quantity)
     
     def add_item(self, product_id: str, name: str, price: float, quantity: int = 1) -> bool:
         if quantity <= 0:
             return False
         
-        for item in self.items:
-            if item.product_id == product_id:
-                item.quantity += quantity
-                self.updated_at = datetime.now()
-                return True
-        
-        new_item = OrderItem(product_id, name, price, quantity)
-        self.items.append(new_item)
+        self._add_line(product_id, name, price, quantity)
         self.updated_at = datetime.now()
         return True
     
+    def _add_line(self, product_id: str, name: str, price: float, quantity: int) -> None:
+        item = self._lines.get(product_id)
+        if item is not None:
+            item.quantity += quantity
+        else:
+            item = OrderItem(product_id, name, price, quantity)
+            self._lines[product_id] = item
+            self._items = None
+        self._total_cents += item.price_cents * quantity
+        self.revision += 1
+    
+    def quantity_of(self, product_id: str) -> int:
+        item = self._lines.get(product_id)
+        return item.quantity if item is not None else 0
+    
     def remove_item(self, product_id: str, quantity: int = None) -> bool:
-        for i, item in enumerate(self.items):
-            if item.product_id == product_id:
-                if quantity is None or quantity >= item.quantity:
-                    self.items.pop(i)
-                    self.updated_at = datetime.now()
-                    return True
-                else:
-                    item.quantity -= quantity
-                    self.updated_at = datetime.now()
-                    return True
-        return False
+        item = self._lines.get(product_id)
+        if item is None:
+            return False
+        
+        if quantity is None or quantity >= item.quantity:
+            del self._lines[product_id]
+            self._items = None
+            removed = item.quantity
+        else:
+            item.quantity -= quantity
+            removed = quantity
+        
+        self._total_cents -= item.price_cents * removed
+        self.revision += 1
+        self.updated_at = datetime.now()
+        return True
+    
+    def get_total_cents(self) -> int:
+        return self._total_cents
     
     def get_total(self) -> float:
-        return sum(item.subtotal for item in self.items)
+        return from_cents(self._total_cents)
     
     def update_status(self, new_status: str) -> bool:
         valid_statuses = [
             self.DRAFT, self.PENDING, self.PROCESSING,
             self.COMPLETED, self.CANCELLED
         ]
-        if self.status in [self.COMPLETED, self.CANCELLED]:
+        if self.is_finished():
             return False
         if new_status not in valid_statuses:
             return False
@@ -96,8 +191,14 @@ class Order:
         self.updated_at = datetime.now()
         return True
     
+    def is_finished(self) -> bool:
+        return self.status in (self.COMPLETED, self.CANCELLED)
+    
     def clear_order(self) -> None:
-        self.items.clear()
+        self._lines.clear()
+        self._items = ()
+        self._total_cents = 0
+        self.revision += 1
         self.updated_at = datetime.now()
 
     def to_dict(self):
@@ -106,7 +207,8 @@ class Order:
             "customer_id": self.customer_id,
             "status": self.status,
             "created_at": self.created_at.isoformat(),
-            "items": [item.to_dict() for item in self.items]
+            "items": [item.to_dict() for item in self.items],
+            "version": self.version
         }
 
     @classmethod
@@ -114,49 +216,176 @@ class Order:
         order = cls(data["customer_id"], data["order_id"])
         order.status = data["status"]
         order.created_at = datetime.fromisoformat(data["created_at"])
+        order.updated_at = order.created_at
         order.items = [OrderItem.from_dict(item) for item in data["items"]]
+        order.version = data.get("version", 0)
         return order
 
 def ensure_data_dir():
     if not os.path.exists("data"):
         os.makedirs("data")
     if not os.path.exists(DATA_FILE):
-        with open(DATA_FILE, "w") as f:
-            json.dump([], f)
+        try:
+            with open(DATA_FILE, "x") as f:
+                json.dump([], f)
+        except FileExistsError:
+            pass
+
+def get_order_repository() -> OrderRepository:
+    global _repository, _repository_key
+    key = (STORAGE_MODE, DATA_FILE, JOURNAL_FILE, SQLITE_FILE, BINARY_FILE)
+    if _repository is not None and _repository_key == key:
+        return _repository
+    if _repository is not None:
+        _repository.close()
+
+    if STORAGE_MODE == "json":
+        repo = JsonOrderRepository(DATA_FILE)
+    elif STORAGE_MODE == "journal":
+        repo = JournalOrderRepository(DATA_FILE, JOURNAL_FILE, JOURNAL_COMPACT_BYTES)
+    elif STORAGE_MODE == "sqlite":
+        repo = SqliteOrderRepository(SQLITE_FILE)
+    elif STORAGE_MODE == "binary":
+        repo = BinaryOrderRepository(BINARY_FILE)
+    else:
+        raise ValueError(f"Unknown order storage mode: {STORAGE_MODE}")
+    _repository = repo
+    _repository_key = key
+    return repo
 
+def close_order_repository() -> None:
+    global _repository, _repository_key
+    if _repository is not None:
+        _repository.close()
+    _repository = _repository_key = None
+
+def set_storage_mode(mode: str) -> None:
+    global STORAGE_MODE
+    if mode not in STORAGE_MODES:
+        raise ValueError(f"Unknown order storage mode: {mode} (choose from {', '.join(STORAGE_MODES)})")
+    STORAGE_MODE = mode
+
+@metrics.timed("order.load")
 def load_orders() -> List[Order]:
     ensure_data_dir()
+    return [Order.from_dict(o) for o in get_order_repository().load_all()]
+
+def get_order_feed() -> OrderFeed:
+    return OrderFeed(FEED_FILE)
+
+def orders_lock() -> FileLock:
+    return FileLock(LOCK_FILE)
+
+@metrics.timed("order.save")
+def save_order(order: Order) -> bool:
+    return _write_order(order, status_only=False)
+
+@metrics.timed("order.save_status")
+def save_order_status(order: Order) -> bool:
+    return _write_order(order, status_only=True)
+
+def _write_order(order: Order, status_only: bool) -> bool:
+    ensure_data_dir()
+    data = order.to_dict()
+    repo = get_order_repository()
     try:
-        with open(DATA_FILE, "r") as f:
-            data = json.load(f)
-            return [Order.from_dict(o) for o in data]
-    except (json.JSONDecodeError, FileNotFoundError):
-        return []
-
-def save_order(order: Order):
-    orders = load_orders()
-    existing_found = False
-    for i, o in enumerate(orders):
-        if o.order_id == order.order_id:
-            orders[i] = order
-            existing_found = True
-            break
-    
-    if not existing_found:
-        orders.append(order)
-    
-    with open(DATA_FILE, "w") as f:
-        json.dump([o.to_dict() for o in orders], f, indent=4)
+        with orders_lock():
+            if ARCHIVE_FINISHED_ORDERS and order.is_finished():
+                repo.retire(data, get_order_archive().append, status_only)
+            elif status_only:
+                repo.save_status(data)
+            else:
+                repo.save(data)
+            feed = get_order_feed()
+            if feed.publish(data) > FEED_COMPACT_BYTES:
+                feed.compact()
+    except OrderConflictError as e:
+        metrics.count("order.conflict")
+        print(f"Error: {e}")
+        return False
+    order.version = data["version"]
+    return True
+
+def get_order_changes(since: int) -> Tuple[List[Order], int]:
+    changes, seq = get_order_feed().changes_since(since)
+    return [Order.from_dict(o) for o in changes], seq
+
+def get_order_archive() -> OrderArchive:
+    global _archive
+    if _archive is None or _archive.directory != ARCHIVE_DIR:
+        _archive = OrderArchive(ARCHIVE_DIR)
+    return _archive
+
+@metrics.timed("order.get")
+def get_order(order_id: str) -> Optional[Order]:
+    # The live store first, then the archive's order index, so the cost does
+    # not grow with history.
+    ensure_data_dir()
+    data = get_order_repository().get(order_id)
+    if data is None:
+        data = get_order_archive().find(order_id)
+    return None if data is None else Order.from_dict(data)
+
+@metrics.timed("order.archive")
+def archive_finished_orders() -> int:
+    ensure_data_dir()
+    repo = get_order_repository()
+    archive = get_order_archive()
+    with orders_lock():
+        finished = [o for o in repo.load_all() if o["status"] in (Order.COMPLETED, Order.CANCELLED)]
+        for data in finished:
+            archive.append(data)
+        repo.delete_many([o["order_id"] for o in finished])
+        archive.seal()
+        # Everything the feed held is now either live or archived, so it can
+        # start over; readers see the new generation and reload.
+        get_order_feed().compact()
+    return len(finished)
+
+@metrics.timed("order.compact")
+def compact_orders() -> int:
+    ensure_data_dir()
+    if ARCHIVE_FINISHED_ORDERS:
+        archive_finished_orders()
+    with orders_lock():
+        return get_order_repository().compact()
+
+def iter_order_data(status: str = None, customer_id: str = None, start: datetime = None, end: datetime = None,
+                    history: bool = False) -> Iterator[dict]:
+    # Streams matching orders from the live store, and from the archive too
+    # with history=True, one at a time. Filters are passed down to the store
+    # (sqlite answers them from its indexes) and to the archive, which only
+    # opens the days in range.
+    ensure_data_dir()
+    repo = get_order_repository()
+    if history:
+        # The live copy wins if an order is in both, e.g. after a crash
+        # between archiving it and removing it from the live store. Only the
+        # IDs of the live orders are held; status is left out since it is
+        # the one field the two copies can disagree on.
+        live_ids = {o["order_id"] for o in repo.iter(customer_id=customer_id, start=start, end=end)}
+        matches = order_filter(status, customer_id)
+        for data in get_order_archive().iter_range(start, end):
+            if data["order_id"] not in live_ids and matches(data):
+                yield data
+    yield from repo.iter(status, customer_id, start, end)
+
+def iter_orders(status: str = None, customer_id: str = None, start: datetime = None, end: datetime = None,
+                history: bool = False) -> Iterator[Order]:
+    for data in iter_order_data(status, customer_id, start, end, history):
+        yield Order.from_dict(data)
 
+@metrics.timed("order.pending")
 def get_pending_orders() -> List[Order]:
-    orders = load_orders()
-    return [o for o in orders if o.status == Order.PENDING]
+    return list(iter_orders(status=Order.PENDING))
 
 def clear_all_orders():
     ensure_data_dir()
     try:
-        with open(DATA_FILE, "w") as f:
-            f.write("")
+        with orders_lock():
+            get_order_repository().clear()
+            get_order_feed().reset()
+            get_order_archive().clear()
         print(f"All orders in {DATA_FILE} cleared successfully.")
     except Exception as e:
         print(f"Error clearing orders file: {e}")
\ No newline at end of file
@@ -0,0 +1,232 @@
+import gzip
+import json
+import os
+import zlib
+from datetime import date, datetime
+from typing import Iterator, List, Optional, Tuple
+from .fileio import FileLock
+from .order_index import OrderIndex, day_segment, segment_day
+
+INDEX_FILE = "orders.index"
+BLOCK_SIZE = 64 * 1024
+SEALED_BIT = 0x80000000
+
+
+class OrderArchive:
+    # Finished orders are partitioned by the day they were created. The
+    # current day's partition is plain JSON lines; older ones are sealed into
+    # gzip. A late append to a sealed day adds another gzip member, which
+    # gzip readers treat as one continuous stream.
+    #
+    # An OrderIndex maps each order_id to where its line is: a byte offset in
+    # a plain day, or in a sealed day the offset of the gzip member holding
+    # it and its offset inside that member. Sealing writes members of about
+    # BLOCK_SIZE, so find() never inflates more than one block. The index is
+    # rebuilt from the partitions when it is missing or points at the wrong
+    # record.
+    PLAIN = ".jsonl"
+    SEALED = ".jsonl.gz"
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.index = OrderIndex(os.path.join(directory, INDEX_FILE))
+
+    def _lock(self) -> FileLock:
+        return FileLock(os.path.join(self.directory, ".lock"))
+
+    def _path(self, day: str, suffix: str) -> str:
+        return os.path.join(self.directory, f"orders-{day}{suffix}")
+
+    def append(self, order_data: dict) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        day = order_data["created_at"][:10]
+        line = (json.dumps(order_data, separators=(",", ":")) + "\n").encode("utf-8")
+
+        with self._lock():
+            if not self.index.exists():
+                self._rebuild_index()
+            sealed = self._path(day, self.SEALED)
+            if os.path.exists(sealed):
+                with open(sealed, "ab") as f:
+                    member = f.tell()
+                    f.write(gzip.compress(line))
+                location = (day_segment(day) | SEALED_BIT, member << 32, len(line))
+            else:
+                plain = self._path(day, self.PLAIN)
+                if not os.path.exists(plain):
+                    # First write of a new day: seal the days before it.
+                    self._seal(before=day)
+                with open(plain, "ab") as f:
+                    offset = f.tell()
+                    f.write(line)
+                location = (day_segment(day), offset, len(line))
+            self.index.put(order_data["order_id"], *location)
+
+    def seal(self, before: str = None) -> int:
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock():
+            return self._seal(before)
+
+    def _seal(self, before: str = None) -> int:
+        before = before or date.today().isoformat()
+        sealed = 0
+        for day in self.days():
+            plain = self._path(day, self.PLAIN)
+            if day >= before or not os.path.exists(plain):
+                continue
+            with open(plain, "rb") as src:
+                content = src.read()
+            entries = []
+            with open(self._path(day, self.SEALED), "ab") as dst:
+                for block in self._blocks(content):
+                    member = dst.tell()
+                    dst.write(gzip.compress(block))
+                    entries.extend(self._locate(block, day_segment(day) | SEALED_BIT, member << 32))
+            for entry in entries:
+                self.index.put(*entry)
+            os.remove(plain)
+            sealed += 1
+        return sealed
+
+    @staticmethod
+    def _blocks(content: bytes) -> Iterator[bytes]:
+        start = 0
+        while start < len(content):
+            end = content.find(b"\n", start + BLOCK_SIZE)
+            end = len(content) if end == -1 else end + 1
+            yield content[start:end]
+            start = end
+
+    @staticmethod
+    def _locate(content: bytes, segment: int, base: int) -> Iterator[Tuple[str, int, int, int]]:
+        offset = 0
+        for line in content.splitlines(keepends=True):
+            try:
+                yield json.loads(line)["order_id"], segment, base + offset, len(line)
+            except (ValueError, KeyError):
+                pass
+            offset += len(line)
+
+    @staticmethod
+    def _members(content: bytes) -> Iterator[Tuple[int, bytes]]:
+        # (offset, inflated data) of each gzip member in a sealed day.
+        view = memoryview(content)
+        start = 0
+        while start < len(content):
+            inflater = zlib.decompressobj(zlib.MAX_WBITS | 16)
+            parts, pos = [], start
+            try:
+                while not inflater.eof and pos < len(content):
+                    chunk = view[pos:pos + BLOCK_SIZE]
+                    parts.append(inflater.decompress(chunk))
+                    pos += len(chunk)
+            except zlib.error:
+                return
+            if not inflater.eof:
+                return
+            yield start, b"".join(parts)
+            start = pos - len(inflater.unused_data)
+
+    def days(self) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        days = set()
+        for name in os.listdir(self.directory):
+            if name.startswith("orders-") and (name.endswith(self.PLAIN) or name.endswith(self.SEALED)):
+                days.add(name[len("orders-"):len("orders-") + 10])
+        return sorted(days)
+
+    def read_day(self, day: str) -> Iterator[dict]:
+        for suffix, opener in ((self.SEALED, gzip.open), (self.PLAIN, open)):
+            path = self._path(day, suffix)
+            if not os.path.exists(path):
+                continue
+            with opener(path, "rb") as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+
+    def _read_at(self, segment: int, offset: int, length: int) -> Optional[dict]:
+        try:
+            if segment & SEALED_BIT:
+                member, inner = offset >> 32, offset & 0xFFFFFFFF
+                inflater = zlib.decompressobj(zlib.MAX_WBITS | 16)
+                data = b""
+                with open(self._path(segment_day(segment & ~SEALED_BIT), self.SEALED), "rb") as f:
+                    f.seek(member)
+                    while len(data) < inner + length and not inflater.eof:
+                        chunk = f.read(BLOCK_SIZE)
+                        if not chunk:
+                            break
+                        data += inflater.decompress(chunk)
+                return json.loads(data[inner:inner + length])
+            with open(self._path(segment_day(segment), self.PLAIN), "rb") as f:
+                f.seek(offset)
+                return json.loads(f.read(length))
+        except (OSError, ValueError, zlib.error):
+            return None
+
+    def find(self, order_id: str) -> Optional[dict]:
+        if not self.index.exists():
+            if not self.days():
+                return None
+            self.rebuild_index()
+        location = self.index.get(order_id)
+        if location is None:
+            return None
+        data = self._read_at(*location)
+        if data is None or data.get("order_id") != order_id:
+            self.rebuild_index()
+            location = self.index.get(order_id)
+            data = self._read_at(*location) if location else None
+        return data if data is not None and data.get("order_id") == order_id else None
+
+    def rebuild_index(self) -> int:
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock():
+            return self._rebuild_index()
+
+    def _rebuild_index(self) -> int:
+        entries = []
+        for day in self.days():
+            # A plain file next to a sealed one is left over from a crash
+            # while sealing and holds the same records.
+            sealed = self._path(day, self.SEALED)
+            if os.path.exists(sealed):
+                with open(sealed, "rb") as f:
+                    content = f.read()
+                for member, data in self._members(content):
+                    entries.extend(self._locate(data, day_segment(day) | SEALED_BIT, member << 32))
+                continue
+            with open(self._path(day, self.PLAIN), "rb") as f:
+                entries.extend(self._locate(f.read(), day_segment(day), 0))
+        return self.index.rebuild(entries)
+
+    def load_range(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[dict]:
+        return list(self.iter_range(start, end))
+
+    def iter_range(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> Iterator[dict]:
+        # Only partitions whose day overlaps [start, end) are opened.
+        start_day = start.date().isoformat() if start else None
+        end_day = end.date().isoformat() if end else None
+        start_key = start.isoformat() if start else None
+        end_key = end.isoformat() if end else None
+
+        for day in self.days():
+            if (start_day and day < start_day) or (end_day and day > end_day):
+                continue
+            for data in self.read_day(day):
+                created = data["created_at"]
+                if (start_key and created < start_key) or (end_key and created >= end_key):
+                    continue
+                yield data
+
+    def clear(self) -> None:
+        self.index.remove()
+        for day in self.days():
+            for suffix in (self.PLAIN, self.SEALED):
+                path = self._path(day, suffix)
+                if os.path.exists(path):
+                    os.remove(path)
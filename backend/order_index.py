@@ -0,0 +1,213 @@
+import hashlib
+import mmap
+import os
+import struct
+from typing import Iterable, Iterator, Optional, Tuple
+from .fileio import atomic_write_bytes
+
+MAGIC = b"SRSIDX\x00\x01"
+HEADER = struct.Struct("<8sQQQB")
+SLOT = struct.Struct("<32sIQI")
+HEADER_SIZE = 64
+KEY_SIZE = 32
+EMPTY = bytes(KEY_SIZE)
+TOMBSTONE = 0xFFFFFFFF
+MIN_CAPACITY = 1024
+MAX_LOAD = 0.7
+
+Location = Tuple[int, int, int]
+
+
+def _key(key: str) -> bytes:
+    raw = key.encode("utf-8")
+    if not raw:
+        raise ValueError("Index keys cannot be empty")
+    if len(raw) > KEY_SIZE:
+        raw = hashlib.blake2b(raw, digest_size=KEY_SIZE).digest()
+    return raw.ljust(KEY_SIZE, b"\x00")
+
+
+def _hash(key: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little")
+
+
+def _capacity_for(count: int) -> int:
+    capacity = MIN_CAPACITY
+    while count >= capacity * MAX_LOAD / 2:
+        capacity *= 2
+    return capacity
+
+
+class OrderIndex:
+    # On-disk hash table from an ID (order or receipt) to a (segment, offset,
+    # length) location, read through mmap so a lookup touches one or two
+    # pages however many entries there are. Keys are fixed 32-byte slots;
+    # longer IDs are stored as their digest. Slots are updated in place, so
+    # other processes mapping the file see puts immediately. When the table
+    # fills up it is rewritten at twice the size and swapped in, and the old
+    # file is flagged so readers reopen it.
+    #
+    # Writers serialise on a lock of their own choosing; the index is a
+    # derived file and can always be rebuilt from the data it points into.
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+        self._map = None
+        self._capacity = 0
+
+    def _open(self) -> bool:
+        if self._map is not None:
+            if not self._map[HEADER.size - 1]:
+                return True
+            self.close()
+        try:
+            self._file = open(self.path, "r+b")
+        except FileNotFoundError:
+            return False
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        magic, self._capacity, _, _, _ = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{self.path} is not an order index")
+        return True
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._file.close()
+        self._file = self._map = None
+        self._capacity = 0
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def __len__(self) -> int:
+        if not self._open():
+            return 0
+        return HEADER.unpack_from(self._map, 0)[3]
+
+    def _probe(self, key: bytes) -> Tuple[int, Optional[int]]:
+        # Offset of the slot holding `key`, or of the empty slot that ends
+        # its probe run, plus the first tombstone seen on the way.
+        mask = self._capacity - 1
+        i = _hash(key) & mask
+        reuse = None
+        while True:
+            base = HEADER_SIZE + i * SLOT.size
+            slot_key = self._map[base:base + KEY_SIZE]
+            if slot_key == key or slot_key == EMPTY:
+                return base, reuse
+            if reuse is None and SLOT.unpack_from(self._map, base)[1] == TOMBSTONE:
+                reuse = base
+            i = (i + 1) & mask
+
+    def get(self, key: str) -> Optional[Location]:
+        if not self._open():
+            return None
+        raw = _key(key)
+        base, _ = self._probe(raw)
+        slot_key, segment, offset, length = SLOT.unpack_from(self._map, base)
+        if slot_key != raw or segment == TOMBSTONE:
+            return None
+        return segment, offset, length
+
+    def put(self, key: str, segment: int, offset: int, length: int) -> None:
+        if not self._open():
+            self.rebuild(())
+            self._open()
+        raw = _key(key)
+        base, reuse = self._probe(raw)
+        slot_key, stored_segment, _, _ = SLOT.unpack_from(self._map, base)
+        _, capacity, used, count, _ = HEADER.unpack_from(self._map, 0)
+        if slot_key == raw:
+            if stored_segment == TOMBSTONE:
+                count += 1
+        elif reuse is not None:
+            base = reuse
+            count += 1
+        else:
+            if used + 1 > capacity * MAX_LOAD:
+                self.rebuild(list(self.items()) + [(key, segment, offset, length)])
+                return
+            used += 1
+            count += 1
+        SLOT.pack_into(self._map, base, raw, segment, offset, length)
+        HEADER.pack_into(self._map, 0, MAGIC, capacity, used, count, 0)
+
+    def delete(self, key: str) -> bool:
+        if not self._open():
+            return False
+        raw = _key(key)
+        base, _ = self._probe(raw)
+        slot_key, segment, offset, length = SLOT.unpack_from(self._map, base)
+        if slot_key != raw or segment == TOMBSTONE:
+            return False
+        SLOT.pack_into(self._map, base, raw, TOMBSTONE, offset, length)
+        _, capacity, used, count, _ = HEADER.unpack_from(self._map, 0)
+        HEADER.pack_into(self._map, 0, MAGIC, capacity, used, count - 1, 0)
+        return True
+
+    def items(self) -> Iterator[Tuple[bytes, int, int, int]]:
+        # Raw slot keys: padded IDs, or digests for long ones. put() accepts
+        # them back, which is all rebuild() needs.
+        if not self._open():
+            return
+        for i in range(self._capacity):
+            slot_key, segment, offset, length = SLOT.unpack_from(self._map, HEADER_SIZE + i * SLOT.size)
+            if slot_key != EMPTY and segment != TOMBSTONE:
+                yield slot_key, segment, offset, length
+
+    def rebuild(self, entries: Iterable[Tuple[object, int, int, int]]) -> int:
+        # Writes a fresh table holding `entries` and swaps it in. Keys may be
+        # IDs or raw slot keys from items().
+        entries = [(key if isinstance(key, bytes) else _key(key), segment, offset, length)
+                   for key, segment, offset, length in entries]
+        capacity = _capacity_for(len(entries))
+        table = bytearray(HEADER_SIZE + capacity * SLOT.size)
+        mask = capacity - 1
+        used = 0
+        for raw, segment, offset, length in entries:
+            i = _hash(raw) & mask
+            while True:
+                base = HEADER_SIZE + i * SLOT.size
+                slot_key = table[base:base + KEY_SIZE]
+                if slot_key == raw:
+                    break
+                if slot_key == EMPTY:
+                    used += 1
+                    break
+                i = (i + 1) & mask
+            SLOT.pack_into(table, base, raw, segment, offset, length)
+        HEADER.pack_into(table, 0, MAGIC, capacity, used, used, 0)
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        # Windows will not replace a file that is mapped or open, so the old
+        # table is unmapped first and flagged through a short-lived handle
+        # of its own, telling readers still mapping it to reopen.
+        self.close()
+        try:
+            with open(self.path, "r+b") as old:
+                if old.read(len(MAGIC)) == MAGIC:
+                    old.seek(HEADER.size - 1)
+                    old.write(b"\x01")
+        except FileNotFoundError:
+            pass
+        atomic_write_bytes(self.path, bytes(table))
+        return used
+
+    def remove(self) -> None:
+        if self._open():
+            self._map[HEADER.size - 1] = 1
+            self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def day_segment(day: str) -> int:
+    # "2024-05-01" -> 20240501, for indexes over day-partitioned files.
+    return int(day.replace("-", ""))
+
+
+def segment_day(segment: int) -> str:
+    digits = f"{segment:08d}"
+    return f"{digits[:4]}-{digits[4:6]}-{digits[6:]}"
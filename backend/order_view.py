@@ -0,0 +1,170 @@
+from array import array
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional
+from .money import from_cents, to_cents
+from .order import Order, OrderItem
+
+EPOCH = datetime(1970, 1, 1)
+
+
+class StringPool:
+    def __init__(self):
+        self.codes: Dict[str, int] = {}
+        self.strings: List[str] = []
+
+    def code(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.strings)
+            self.strings.append(value)
+        return code
+
+
+class OrderTable:
+    # Read-only orders packed into typed arrays: one row per order and one per
+    # order line, with every string pooled. A million orders cost a few tens
+    # of bytes each instead of several Python objects per order and per line.
+    def __init__(self, orders: Iterable[dict] = ()):
+        self.pool = StringPool()
+        self.order_id = array("I")
+        self.customer_id = array("I")
+        self.status = array("I")
+        self.created_us = array("q")
+        self.version = array("I")
+        self.item_start = array("I")
+        self.item_count = array("I")
+
+        self.product_id = array("I")
+        self.name = array("I")
+        self.price = array("d")
+        self.price_cents = array("q")
+        self.quantity = array("I")
+
+        self._index: Optional[Dict[int, int]] = None
+        self.extend(orders)
+
+    def append(self, data: dict) -> None:
+        code = self.pool.code
+        self.order_id.append(code(data["order_id"]))
+        self.customer_id.append(code(data["customer_id"]))
+        self.status.append(code(data["status"]))
+        self.created_us.append((datetime.fromisoformat(data["created_at"]) - EPOCH) // timedelta(microseconds=1))
+        self.version.append(data.get("version", 0))
+        self.item_start.append(len(self.quantity))
+        self.item_count.append(len(data["items"]))
+        for item in data["items"]:
+            self.product_id.append(code(item["product_id"]))
+            self.name.append(code(item["name"]))
+            self.price.append(item["price"])
+            self.price_cents.append(to_cents(item["price"]))
+            self.quantity.append(item["quantity"])
+        self._index = None
+
+    def extend(self, orders: Iterable[dict]) -> None:
+        for data in orders:
+            self.append(data)
+
+    def __len__(self) -> int:
+        return len(self.order_id)
+
+    def __getitem__(self, row: int) -> "OrderView":
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError("order row out of range")
+        return OrderView(self, row)
+
+    def __iter__(self) -> Iterator["OrderView"]:
+        for row in range(len(self)):
+            yield OrderView(self, row)
+
+    def find(self, order_id: str) -> Optional["OrderView"]:
+        code = self.pool.codes.get(order_id)
+        if code is None:
+            return None
+        if self._index is None:
+            self._index = {order_code: row for row, order_code in enumerate(self.order_id)}
+        row = self._index.get(code)
+        return None if row is None else OrderView(self, row)
+
+    def with_status(self, status: str) -> Iterator["OrderView"]:
+        code = self.pool.codes.get(status)
+        if code is None:
+            return
+        for row, status_code in enumerate(self.status):
+            if status_code == code:
+                yield OrderView(self, row)
+
+
+class OrderView:
+    # A row of an OrderTable that reads like an Order. Call to_order() for a
+    # real, editable Order.
+    __slots__ = ("table", "row")
+
+    def __init__(self, table: OrderTable, row: int):
+        self.table = table
+        self.row = row
+
+    @property
+    def order_id(self) -> str:
+        return self.table.pool.strings[self.table.order_id[self.row]]
+
+    @property
+    def customer_id(self) -> str:
+        return self.table.pool.strings[self.table.customer_id[self.row]]
+
+    @property
+    def status(self) -> str:
+        return self.table.pool.strings[self.table.status[self.row]]
+
+    @property
+    def created_at(self) -> datetime:
+        return EPOCH + timedelta(microseconds=self.table.created_us[self.row])
+
+    @property
+    def version(self) -> int:
+        return self.table.version[self.row]
+
+    def _item_rows(self) -> range:
+        start = self.table.item_start[self.row]
+        return range(start, start + self.table.item_count[self.row])
+
+    @property
+    def items(self) -> List[OrderItem]:
+        table, strings = self.table, self.table.pool.strings
+        return [
+            OrderItem(strings[table.product_id[i]], strings[table.name[i]], table.price[i], table.quantity[i])
+            for i in self._item_rows()
+        ]
+
+    def get_total_cents(self) -> int:
+        table = self.table
+        return sum(table.price_cents[i] * table.quantity[i] for i in self._item_rows())
+
+    def get_total(self) -> float:
+        return float(from_cents(self.get_total_cents()))
+
+    def is_finished(self) -> bool:
+        return self.status in (Order.COMPLETED, Order.CANCELLED)
+
+    def to_dict(self) -> dict:
+        table, strings = self.table, self.table.pool.strings
+        return {
+            "order_id": self.order_id,
+            "customer_id": self.customer_id,
+            "items": [
+                {
+                    "product_id": strings[table.product_id[i]],
+                    "name": strings[table.name[i]],
+                    "price": table.price[i],
+                    "quantity": table.quantity[i],
+                }
+                for i in self._item_rows()
+            ],
+            "status": self.status,
+            "created_at": self.created_at.isoformat(),
+            "version": self.version,
+        }
+
+    def to_order(self) -> Order:
+        return Order.from_dict(self.to_dict())
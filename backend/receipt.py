@@ -1,38 +1,68 @@
 from datetime import datetime
-from typing import List, Dict
-import uuid
+from typing import Dict
 import os
 from .order import Order 
+from .money import from_cents, shown_cents
+from . import metrics
+from .ids import new_receipt_id
+
+RECEIPTS_DIR = "receipts"
+_ready_dirs = set()
+
+
+def ensure_receipts_dir(directory: str = None) -> None:
+    directory = directory or RECEIPTS_DIR
+    if directory not in _ready_dirs:
+        os.makedirs(directory, exist_ok=True)
+        _ready_dirs.add(directory)
 
 
 class Receipt:
     SIMPLE = "SIMPLE"
     DETAILED = "DETAILED"
     
-    def __init__(self, order: Order, receipt_id: str = None, tax_rate: float = 0.08, tip_percent: float = 0.0):
+    def __init__(self, order: Order, receipt_id: str = None, tax_rate: float = 0.08, tip_percent: float = 0.0,
+                 issued_at: datetime = None):
         if not order.items:
             raise ValueError("Cannot create receipt for empty order")
         
-        self.receipt_id = receipt_id or f"RCP-{uuid.uuid4().hex[:8].upper()}"
+        self.receipt_id = receipt_id or new_receipt_id()
         self.order = order
         self.tax_rate = tax_rate
         self.tip_percent = tip_percent
-        self.issued_at = datetime.now()
+        self.issued_at = issued_at or datetime.now()
+        self._amounts_key = None
+        self._amounts = None
+    
+    def calculate_amounts_cents(self) -> Dict[str, int]:
+        # Worked out once per order revision and rate pair. Tax, tip and total
+        # come from the same float arithmetic the receipts always printed, so
+        # every amount matches the old output to the cent.
+        key = (self.order.revision, self.tax_rate, self.tip_percent)
+        if self._amounts_key != key:
+            subtotal = sum(item.price * item.quantity for item in self.order.items)
+            tax = subtotal * self.tax_rate
+            tip = subtotal * self.tip_percent
+            self._amounts = {
+                "subtotal": self.order.get_total_cents(),
+                "tax": shown_cents(tax),
+                "tip": shown_cents(tip),
+                "total": shown_cents(subtotal + tax + tip),
+            }
+            self._amounts_key = key
+        return self._amounts
     
     def calculate_subtotal(self) -> float:
-        return self.order.get_total()
+        return from_cents(self.calculate_amounts_cents()["subtotal"])
     
     def calculate_tax(self) -> float:
-        return self.calculate_subtotal() * self.tax_rate
+        return from_cents(self.calculate_amounts_cents()["tax"])
     
     def calculate_tip(self) -> float:
-        return self.calculate_subtotal() * self.tip_percent
+        return from_cents(self.calculate_amounts_cents()["tip"])
     
     def calculate_total(self) -> float:
-        subtotal = self.calculate_subtotal()
-        tax = self.calculate_tax()
-        tip = self.calculate_tip()
-        return subtotal + tax + tip
+        return from_cents(self.calculate_amounts_cents()["total"])
     
     def generate_simple_receipt(self) -> str:
         receipt_lines = []
@@ -93,6 +123,7 @@ class Receipt:
         
         return "\n".join(receipt_lines)
     
+    @metrics.timed("receipt.render")
     def get_receipt(self, receipt_type: str = SIMPLE) -> str:
         if receipt_type == self.SIMPLE:
             return self.generate_simple_receipt()
@@ -101,11 +132,15 @@ class Receipt:
         else:
             raise ValueError(f"Invalid receipt type: {receipt_type}")
 
+    @property
+    def file_path(self) -> str:
+        return f"{RECEIPTS_DIR}/{self.receipt_id}.txt"
+
+    @metrics.timed("receipt.save")
     def save_to_file(self):
-        if not os.path.exists("receipts"):
-            os.makedirs("receipts")
+        ensure_receipts_dir()
         
-        filename = f"receipts/{self.receipt_id}.txt"
+        filename = self.file_path
         content = self.generate_detailed_receipt()
         
         with open(filename, "w", encoding="utf-8") as f:
@@ -0,0 +1,239 @@
+import argparse
+import json
+import os
+import re
+import struct
+import sys
+from datetime import datetime
+from typing import Iterator, Optional, Tuple
+from .fileio import FileLock
+from .order_index import OrderIndex, day_segment, segment_day
+from .receipt import Receipt, RECEIPTS_DIR
+from . import metrics
+
+ARCHIVE_DIR = f"{RECEIPTS_DIR}/archive"
+LENGTH = struct.Struct(">I")
+
+
+class ReceiptArchive:
+    # One append-only segment per day holding length-prefixed receipt texts,
+    # plus a JSON-lines index per segment with the offset of each record.
+    # Lookups by receipt or order ID go through two OrderIndex files, which
+    # are rebuilt from the per-segment indexes if they go missing.
+    def __init__(self, directory: str = ARCHIVE_DIR):
+        self.directory = directory
+        self.by_receipt = OrderIndex(os.path.join(directory, "receipt_ids.index"))
+        self.by_order = OrderIndex(os.path.join(directory, "order_ids.index"))
+        self._days = {}
+
+    def _lock(self) -> FileLock:
+        return FileLock(os.path.join(self.directory, ".lock"))
+
+    def _segment_path(self, day: str) -> str:
+        return os.path.join(self.directory, f"{day}.seg")
+
+    def _index_path(self, day: str) -> str:
+        return os.path.join(self.directory, f"{day}.idx")
+
+    def append(self, receipt_id: str, order_id: str, issued_at: datetime, content: str) -> dict:
+        os.makedirs(self.directory, exist_ok=True)
+        day = issued_at.strftime("%Y-%m-%d")
+        payload = content.encode("utf-8")
+
+        with self._lock():
+            if not (self.by_receipt.exists() and self.by_order.exists()):
+                self._rebuild_index()
+            with open(self._segment_path(day), "ab") as f:
+                offset = f.tell()
+                f.write(LENGTH.pack(len(payload)))
+                f.write(payload)
+            entry = {
+                "receipt_id": receipt_id,
+                "order_id": order_id,
+                "issued_at": issued_at.isoformat(),
+                "segment": day,
+                "offset": offset,
+                "length": len(payload),
+            }
+            with open(self._index_path(day), "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+            self.by_receipt.put(receipt_id, day_segment(day), offset, len(payload))
+            if order_id:
+                self.by_order.put(order_id, day_segment(day), offset, len(payload))
+        return entry
+
+    def add_receipt(self, receipt: Receipt) -> dict:
+        return self.append(
+            receipt.receipt_id,
+            receipt.order.order_id,
+            receipt.issued_at,
+            receipt.generate_detailed_receipt(),
+        )
+
+    def rebuild_index(self) -> int:
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock():
+            return self._rebuild_index()
+
+    def _rebuild_index(self) -> int:
+        by_receipt, by_order = [], []
+        for entry in self._entries():
+            location = (day_segment(entry["segment"]), entry["offset"], entry["length"])
+            by_receipt.append((entry["receipt_id"],) + location)
+            if entry["order_id"]:
+                by_order.append((entry["order_id"],) + location)
+        self.by_order.rebuild(by_order)
+        return self.by_receipt.rebuild(by_receipt)
+
+    def find(self, receipt_id: str = None, order_id: str = None) -> Optional[dict]:
+        index, key = (self.by_receipt, receipt_id) if receipt_id else (self.by_order, order_id)
+        if not index.exists():
+            if next(self.segments(), None) is None:
+                return None
+            self.rebuild_index()
+        location = index.get(key)
+        if location is None:
+            return None
+        segment, offset, length = location
+        return {"receipt_id" if receipt_id else "order_id": key,
+                "segment": segment_day(segment), "offset": offset, "length": length}
+
+    def receipt_for(self, order_id: str) -> Optional[dict]:
+        # The full index entry (receipt ID, issue time, ...) of the receipt
+        # last archived for an order, or None if it never got one.
+        found = self.find(order_id=order_id)
+        if found is None:
+            return None
+        return self._day_entries(found["segment"]).get(found["offset"])
+
+    def _day_entries(self, day: str) -> dict:
+        # Entries of one day's index keyed by offset, re-read only when the
+        # index has grown since the last lookup.
+        try:
+            size = os.path.getsize(self._index_path(day))
+        except FileNotFoundError:
+            return {}
+        cached = self._days.get(day)
+        if cached is None or cached[0] != size:
+            cached = (size, {entry["offset"]: entry for entry in self._entries(day, day)})
+            self._days[day] = cached
+        return cached[1]
+
+    def read(self, entry: dict) -> str:
+        with open(self._segment_path(entry["segment"]), "rb") as f:
+            f.seek(entry["offset"] + LENGTH.size)
+            return f.read(entry["length"]).decode("utf-8")
+
+    def reprint(self, receipt_id: str = None, order_id: str = None) -> Optional[str]:
+        entry = self.find(receipt_id=receipt_id, order_id=order_id)
+        return self.read(entry) if entry else None
+
+    def segments(self, start_day: str = None, end_day: str = None) -> Iterator[str]:
+        if not os.path.isdir(self.directory):
+            return
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith(".seg"):
+                continue
+            day = name[:-4]
+            if (start_day and day < start_day) or (end_day and day > end_day):
+                continue
+            yield day
+
+    def _entries(self, start_day: str = None, end_day: str = None) -> Iterator[dict]:
+        for day in self.segments(start_day, end_day):
+            try:
+                index = open(self._index_path(day), "r", encoding="utf-8")
+            except FileNotFoundError:
+                continue
+            with index:
+                for line in index:
+                    if not line.endswith("\n"):
+                        break
+                    yield json.loads(line)
+
+    def export(self, start_day: str = None, end_day: str = None) -> Iterator[Tuple[dict, str]]:
+        for day in self.segments(start_day, end_day):
+            with open(self._segment_path(day), "rb") as segment:
+                for entry in self._entries(day, day):
+                    segment.seek(entry["offset"] + LENGTH.size)
+                    yield entry, segment.read(entry["length"]).decode("utf-8")
+
+
+_default_archive = None
+
+
+@metrics.timed("receipt.archive")
+def archive_receipt(receipt: Receipt) -> str:
+    global _default_archive
+    if _default_archive is None or _default_archive.directory != ARCHIVE_DIR:
+        _default_archive = ReceiptArchive(ARCHIVE_DIR)
+    entry = _default_archive.add_receipt(receipt)
+    return f"{ARCHIVE_DIR}/{entry['segment']}.seg@{entry['offset']}"
+
+
+ORDER_LINE = re.compile(r"Order: #(\S+)")
+DATE_LINE = re.compile(r"Date: (.+)")
+
+
+def pack_receipts_dir(receipts_dir: str = RECEIPTS_DIR, archive: ReceiptArchive = None,
+                      remove: bool = False) -> int:
+    archive = archive or ReceiptArchive(os.path.join(receipts_dir, "archive"))
+    names = sorted(n for n in os.listdir(receipts_dir) if n.endswith(".txt"))
+    count = 0
+    for name in names:
+        path = os.path.join(receipts_dir, name)
+        if archive.find(receipt_id=name[:-4]) is not None:
+            # Packed by an earlier run; only the --remove cleanup is left.
+            if remove:
+                os.remove(path)
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            content = f.read()
+
+        order_match = ORDER_LINE.search(content)
+        order_id = order_match.group(1) if order_match else ""
+        issued_at = None
+        date_match = DATE_LINE.search(content)
+        if date_match:
+            for fmt in ("%Y-%m-%d %I:%M %p", "%Y-%m-%d %H:%M"):
+                try:
+                    issued_at = datetime.strptime(date_match.group(1).strip(), fmt)
+                    break
+                except ValueError:
+                    continue
+        if issued_at is None:
+            issued_at = datetime.fromtimestamp(os.path.getmtime(path))
+
+        archive.append(name[:-4], order_id, issued_at, content)
+        if remove:
+            os.remove(path)
+        count += 1
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the segmented receipt archive.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    pack = sub.add_parser("pack", help="Pack receipts/*.txt into the archive")
+    pack.add_argument("--dir", default=RECEIPTS_DIR)
+    pack.add_argument("--remove", action="store_true", help="Delete the .txt files once packed")
+    reprint = sub.add_parser("reprint", help="Print one archived receipt")
+    reprint.add_argument("id", help="Receipt ID (RCP-...) or order ID (ORD-...)")
+    export = sub.add_parser("export", help="Stream archived receipts to stdout")
+    export.add_argument("--from", dest="start_day")
+    export.add_argument("--to", dest="end_day")
+    args = parser.parse_args()
+
+    if args.command == "pack":
+        count = pack_receipts_dir(args.dir, remove=args.remove)
+        print(f"Packed {count} receipts into {os.path.join(args.dir, 'archive')}.")
+    elif args.command == "reprint":
+        archive = ReceiptArchive()
+        text = archive.reprint(order_id=args.id) if args.id.startswith("ORD-") else archive.reprint(receipt_id=args.id)
+        if text is None:
+            print(f"Receipt {args.id} not found.")
+            sys.exit(1)
+        print(text)
+    elif args.command == "export":
+        for entry, text in ReceiptArchive().export(args.start_day, args.end_day):
+            sys.stdout.write(text + "\n\n")
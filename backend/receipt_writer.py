@@ -0,0 +1,127 @@
+import queue
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+from .receipt import Receipt
+
+_STOP = object()
+
+
+class ReceiptWriter:
+    def __init__(self, max_queue: int = 256, batch_size: int = 32, put_timeout: float = 5.0,
+                 write: Callable[[Receipt], str] = None):
+        self.batch_size = batch_size
+        self.put_timeout = put_timeout
+        self.write = write or Receipt.save_to_file
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._errors: List[Tuple[str, Exception]] = []
+        self._latencies = deque(maxlen=1000)
+        self.written = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def start(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="receipt-writer", daemon=True)
+            self._thread.start()
+
+    def submit(self, receipt: Receipt) -> bool:
+        # Back-pressure: a full queue blocks the caller for up to put_timeout
+        # and then reports failure rather than dropping the receipt silently.
+        self.start()
+        try:
+            self._queue.put(receipt, timeout=self.put_timeout)
+            return True
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            return False
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = False
+            for receipt in batch:
+                if receipt is _STOP:
+                    stop = True
+                else:
+                    self._write_one(receipt)
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _write_one(self, receipt: Receipt) -> None:
+        try:
+            self.write(receipt)
+        except Exception as e:
+            with self._lock:
+                self._errors.append((receipt.receipt_id, e))
+                self.failed += 1
+            return
+        with self._lock:
+            self.written += 1
+
+    def flush(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.join()
+
+    def shutdown(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+
+    def pop_errors(self) -> List[Tuple[str, Exception]]:
+        with self._lock:
+            errors, self._errors = self._errors, []
+        return errors
+
+    def record_completion(self, seconds: float) -> None:
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            stats = {
+                "queued": self._queue.qsize(),
+                "written": self.written,
+                "rejected": self.rejected,
+                "failed": self.failed,
+                "completions": len(latencies),
+            }
+        if latencies:
+            stats["completion_avg_ms"] = sum(latencies) / len(latencies) * 1000
+            stats["completion_p95_ms"] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000
+            stats["completion_max_ms"] = latencies[-1] * 1000
+        return stats
+
+
+class CompletionTimer:
+    def __init__(self, writer: ReceiptWriter):
+        self.writer = writer
+        self.elapsed = 0.0
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        # The completion did not happen (e.g. a conflict); don't sample it.
+        self.cancelled = True
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.elapsed = time.perf_counter() - self._start
+        if exc_type is None and not self.cancelled:
+            self.writer.record_completion(self.elapsed)
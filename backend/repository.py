@@ -0,0 +1,301 @@
+import json
+import mmap
+import os
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from .fileio import atomic_write_text, iter_json_array
+from .journal import OrderJournal
+from .order_index import OrderIndex
+
+
+class OrderConflictError(Exception):
+    def __init__(self, order_id: str, expected_version: int, stored_version: Optional[int]):
+        if stored_version is None:
+            message = f"Order {order_id} was closed by another terminal (expected version {expected_version})"
+        else:
+            message = (f"Order {order_id} was changed by another terminal "
+                       f"(expected version {expected_version}, found {stored_version})")
+        super().__init__(message)
+        self.order_id = order_id
+        self.expected_version = expected_version
+        self.stored_version = stored_version
+
+
+def check_version(data: dict, stored_version: Optional[int]) -> int:
+    # A versioned order with nothing stored was saved before and has since
+    # been archived or deleted; writing it again would bring it back.
+    expected = data.get("version", 0)
+    if stored_version != expected and (stored_version is not None or expected > 0):
+        raise OrderConflictError(data["order_id"], expected, stored_version)
+    return expected + 1
+
+
+def order_filter(status: str = None, customer_id: str = None, start: datetime = None,
+                 end: datetime = None) -> Callable[[dict], bool]:
+    # Predicate for the filters every repository's iter() takes; created_at
+    # must fall in [start, end).
+    start_key = start.isoformat() if start else None
+    end_key = end.isoformat() if end else None
+
+    def matches(data: dict) -> bool:
+        return ((status is None or data["status"] == status)
+                and (customer_id is None or data["customer_id"] == customer_id)
+                and (start_key is None or data["created_at"] >= start_key)
+                and (end_key is None or data["created_at"] < end_key))
+    return matches
+
+
+class OrderRepository(ABC):
+    # Callers hold the orders lock around save/save_status. Both check the
+    # caller's "version" against the stored one, raise OrderConflictError on
+    # a mismatch and otherwise store and write back the bumped version.
+    mode = None
+
+    @abstractmethod
+    def load_all(self) -> List[dict]:
+        ...
+
+    def iter(self, status: str = None, customer_id: str = None, start: datetime = None,
+             end: datetime = None) -> Iterator[dict]:
+        # Yields matching orders one at a time. Stores that can read
+        # incrementally override this so memory stays flat as they grow.
+        matches = order_filter(status, customer_id, start, end)
+        return (o for o in self.load_all() if matches(o))
+
+    def get(self, order_id: str) -> Optional[dict]:
+        return next((o for o in self.iter() if o["order_id"] == order_id), None)
+
+    @abstractmethod
+    def save(self, data: dict) -> None:
+        ...
+
+    def save_status(self, data: dict) -> None:
+        self.save(data)
+
+    @abstractmethod
+    def delete(self, order_id: str) -> None:
+        ...
+
+    def delete_many(self, order_ids: List[str]) -> None:
+        for order_id in order_ids:
+            self.delete(order_id)
+
+    def retire(self, data: dict, keep: Callable[[dict], None], status_only: bool = False) -> None:
+        # Saves a finished order, hands the versioned copy to `keep` (the
+        # archive) and drops it from the live store.
+        if status_only:
+            self.save_status(data)
+        else:
+            self.save(data)
+        keep(data)
+        self.delete(data["order_id"])
+
+    def compact(self) -> int:
+        return len(self.load_all())
+
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+
+    def close(self) -> None:
+        pass
+
+
+class JsonOrderRepository(OrderRepository):
+    # Every write rewrites the whole file, laid out exactly as
+    # json.dump(orders, indent=4) would, and records where each order's
+    # text landed in an OrderIndex beside it. The index also holds the
+    # file's inode, mtime and size as of that write, so a lookup can tell
+    # whether it still describes the file on disk.
+    mode = "json"
+    STAMP_KEYS = ("#inode", "#mtime", "#size")
+
+    def __init__(self, data_file: str):
+        self.data_file = data_file
+        self.index = OrderIndex(data_file + ".index")
+
+    def load_all(self) -> List[dict]:
+        try:
+            with open(self.data_file, "r") as f:
+                return json.load(f)
+        except (json.JSONDecodeError, FileNotFoundError):
+            return []
+
+    def iter(self, status: str = None, customer_id: str = None, start: datetime = None,
+             end: datetime = None) -> Iterator[dict]:
+        matches = order_filter(status, customer_id, start, end)
+        return (o for o in iter_json_array(self.data_file) if matches(o))
+
+    def _stamp(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = os.stat(self.data_file)
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def _index_is_current(self) -> bool:
+        stamp = tuple(self.index.get(key) for key in self.STAMP_KEYS)
+        if None in stamp:
+            return False
+        return tuple(offset for _, offset, _ in stamp) == self._stamp()
+
+    def _write(self, orders: List[dict]) -> None:
+        # Same bytes as atomic_write_json(self.data_file, orders); the
+        # output is ASCII, so character offsets are byte offsets.
+        entries, parts, offset = [], [], 2
+        for data in orders:
+            text = "    " + json.dumps(data, indent=4).replace("\n", "\n    ")
+            entries.append((data["order_id"], 0, offset, len(text)))
+            parts.append(text)
+            offset += len(text) + 2
+        atomic_write_text(self.data_file, "[\n" + ",\n".join(parts) + "\n]" if parts else "[]")
+        stamp = [(key, 0, value, 0) for key, value in zip(self.STAMP_KEYS, self._stamp())]
+        self.index.rebuild(entries + stamp)
+
+    def _get_indexed(self, order_id: str) -> Tuple[bool, Optional[dict]]:
+        # (answered, order). Not answered when the index is missing or out
+        # of date, or points at something other than the order.
+        if not self._index_is_current():
+            return False, None
+        location = self.index.get(order_id)
+        if location is None:
+            return True, None
+        _, offset, length = location
+        try:
+            with open(self.data_file, "rb") as f:
+                f.seek(offset)
+                data = json.loads(f.read(length))
+        except (FileNotFoundError, ValueError):
+            return False, None
+        if not isinstance(data, dict) or data.get("order_id") != order_id:
+            return False, None
+        return True, data
+
+    def get(self, order_id: str) -> Optional[dict]:
+        answered, data = self._get_indexed(order_id)
+        if answered:
+            return data
+        # No usable index: search the file for the quoted ID through mmap
+        # and only parse it on a hit.
+        try:
+            with open(self.data_file, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                if view.find(json.dumps(order_id).encode("utf-8")) == -1:
+                    return None
+        except (FileNotFoundError, ValueError):
+            return None
+        return super().get(order_id)
+
+    def save(self, data: dict) -> None:
+        orders = self.load_all()
+        for i, o in enumerate(orders):
+            if o["order_id"] == data["order_id"]:
+                data["version"] = check_version(data, o.get("version", 0))
+                orders[i] = data
+                break
+        else:
+            data["version"] = check_version(data, None)
+            orders.append(data)
+
+        self._write(orders)
+
+    def retire(self, data: dict, keep: Callable[[dict], None], status_only: bool = False) -> None:
+        # The order is leaving the file anyway, so after the version check
+        # only the delete is written instead of a save and then a delete.
+        orders = self.load_all()
+        remaining = [o for o in orders if o["order_id"] != data["order_id"]]
+        stored = next((o.get("version", 0) for o in orders if o["order_id"] == data["order_id"]), None)
+        data["version"] = check_version(data, stored)
+        keep(data)
+        if len(remaining) != len(orders):
+            self._write(remaining)
+
+    def delete(self, order_id: str) -> None:
+        self.delete_many([order_id])
+
+    def delete_many(self, order_ids: List[str]) -> None:
+        doomed = set(order_ids)
+        orders = self.load_all()
+        remaining = [o for o in orders if o["order_id"] not in doomed]
+        if len(remaining) != len(orders):
+            self._write(remaining)
+
+    def clear(self) -> None:
+        with open(self.data_file, "w") as f:
+            f.write("")
+        self.index.remove()
+
+    def close(self) -> None:
+        self.index.close()
+
+
+class JournalOrderRepository(OrderRepository):
+    mode = "journal"
+
+    def __init__(self, data_file: str, journal_file: str, compact_bytes: int):
+        self.journal = OrderJournal(data_file, journal_file)
+        self.compact_bytes = compact_bytes
+        self._versions: Dict[str, int] = {}
+        self._offset = 0
+        self._generation = None
+
+    def load_all(self) -> List[dict]:
+        return self.journal.replay()
+
+    def iter(self, status: str = None, customer_id: str = None, start: datetime = None,
+             end: datetime = None) -> Iterator[dict]:
+        matches = order_filter(status, customer_id, start, end)
+        return (o for o in self.journal.iter_replay() if matches(o))
+
+    def _stored_version(self, order_id: str) -> Optional[int]:
+        # Version checks tail the journal from where the last one stopped
+        # instead of replaying it, unless a compaction replaced the snapshot.
+        generation = self.journal.snapshot_generation()
+        if generation != self._generation or self.journal.journal_size() < self._offset:
+            self._versions = {
+                o["order_id"]: o.get("version", 0) for o in self.journal.load_snapshot().values()
+            }
+            self._offset = 0
+            self._generation = generation
+
+        records, self._offset = self.journal.read_from(self._offset)
+        for record in records:
+            if record.get("op") == OrderJournal.UPSERT:
+                self._versions[record["order"]["order_id"]] = record["order"].get("version", 0)
+            elif record.get("op") == OrderJournal.DELETE:
+                self._versions.pop(record["order_id"], None)
+            elif record["order_id"] in self._versions:
+                self._versions[record["order_id"]] = record.get("version", 0)
+        return self._versions.get(order_id)
+
+    def save(self, data: dict) -> None:
+        data["version"] = check_version(data, self._stored_version(data["order_id"]))
+        self.journal.append_upsert(data)
+        self._maybe_compact()
+
+    def save_status(self, data: dict) -> None:
+        stored = self._stored_version(data["order_id"])
+        if stored is None:
+            self.save(data)
+            return
+        data["version"] = check_version(data, stored)
+        self.journal.append_status(data["order_id"], data["status"], data["version"])
+        self._maybe_compact()
+
+    def delete(self, order_id: str) -> None:
+        if self._stored_version(order_id) is not None:
+            self.journal.append_delete(order_id)
+            self._maybe_compact()
+
+    def _maybe_compact(self) -> None:
+        if self.journal.journal_size() > self.compact_bytes:
+            self.journal.compact()
+
+    def compact(self) -> int:
+        return self.journal.compact()
+
+    def clear(self) -> None:
+        with open(self.journal.snapshot_file, "w") as f:
+            f.write("")
+        self.journal.clear()
+        self._generation = None
@@ -0,0 +1,415 @@
+import argparse
+import asyncio
+import json
+import signal
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from . import metrics
+from . import order as order_store
+from .analytics import SalesRollups, record_completed_order
+from .inventory import Inventory
+from .menuitem import MenuCatalog, MenuItem, load_menu_items, save_menu_items
+from .order import Order, close_order_repository, ensure_data_dir, get_order_repository, save_order, save_order_status
+from .repository import OrderConflictError, check_version
+from .user import UserDirectory, user_from_dict
+
+SERVICE_HOST = "127.0.0.1"
+SERVICE_PORT = 8765
+FLUSH_INTERVAL = 0.5
+CHANGE_LOG_SIZE = 10000
+MAX_REQUEST_BYTES = 1024 * 1024
+REPLY_CACHE_SIZE = 1000
+
+
+class ServiceError(Exception):
+    pass
+
+
+class OrderService:
+    # Owns the live orders, the menu, the user directory and the stock
+    # counters and sales rollups for every terminal. Requests are answered from memory; changed orders are
+    # written behind through save_order/save_order_status every
+    # `flush_interval` seconds, so the files, the order feed and the
+    # archive stay what a terminal without the service expects. A crash
+    # can lose at most the last interval of changes.
+    #
+    # Versions handed to clients are the service's own. The store lags by
+    # up to one flush, so `persisted` tracks the version on disk for the
+    # next save. The service expects to be the only writer while it runs;
+    # if another writer changes an order anyway, its copy is reloaded.
+    def __init__(self, flush_interval: float = FLUSH_INTERVAL):
+        self.flush_interval = flush_interval
+        self.orders: Dict[str, dict] = {}
+        self.persisted: Dict[str, int] = {}
+        self.dirty: Dict[str, bool] = {}
+        self.menu = MenuCatalog()
+        self.menu_dirty = False
+        self.users = UserDirectory()
+        self.inventory = Inventory()
+        self.rollups = SalesRollups()
+        # Everything that touches the order store runs on this one thread:
+        # a sqlite connection may only be used by the thread that opened it.
+        self.storage = ThreadPoolExecutor(max_workers=1, thread_name_prefix="storage")
+        self.seq = 0
+        self.changes: deque = deque(maxlen=CHANGE_LOG_SIZE)
+        self.changed: Optional[asyncio.Condition] = None
+        self.replies: OrderedDict = OrderedDict()
+        self.flushes = 0
+        self.flush_failures = 0
+
+    def load(self) -> None:
+        ensure_data_dir()
+        for data in get_order_repository().load_all():
+            self.orders[data["order_id"]] = data
+            self.persisted[data["order_id"]] = data.get("version", 0)
+        self.menu = MenuCatalog(load_menu_items())
+
+    # -- write-behind ---------------------------------------------------
+
+    def _mark(self, order_id: str, full: bool) -> None:
+        self.dirty[order_id] = self.dirty.get(order_id, False) or full
+        self._changed(order_id)
+
+    def _changed(self, order_id: str) -> None:
+        self.seq += 1
+        self.changes.append((self.seq, order_id))
+
+    async def _notify(self) -> None:
+        async with self.changed:
+            self.changed.notify_all()
+
+    def _persist(self, batch: List[Tuple[dict, bool]], menu_items: Optional[List[MenuItem]]) -> Tuple[Dict[str, int], Dict[str, Optional[dict]], bool]:
+        # Runs on a worker thread; touches only the snapshot it was given.
+        # Returns the store versions written, the stored copy (None once
+        # closed) of each order another writer changed first, and whether
+        # the menu was written. Orders in neither dict failed to write and
+        # are retried on the next flush.
+        saved, conflicts = {}, {}
+        for data, full in batch:
+            order = Order.from_dict(data)
+            try:
+                ok = save_order(order) if full else save_order_status(order)
+                if ok:
+                    saved[order.order_id] = order.version
+                else:
+                    conflicts[order.order_id] = get_order_repository().get(order.order_id)
+            except Exception as e:
+                print(f"Error: could not write order {order.order_id}: {e}")
+        menu_saved = True
+        if menu_items is not None:
+            try:
+                save_menu_items(menu_items)
+            except Exception as e:
+                print(f"Error: could not write the menu: {e}")
+                menu_saved = False
+        return saved, conflicts, menu_saved
+
+    def _reload(self, order_id: str, stored: Optional[dict]) -> None:
+        # Another writer got to the store first. Its copy wins: the order is
+        # replaced (or dropped once closed) under a new service version, so
+        # clients holding the old one get a conflict on their next write.
+        print(f"Error: order {order_id} was changed outside the service; reloaded it from storage")
+        self.dirty.pop(order_id, None)
+        current = self.orders.get(order_id)
+        if stored is None or current is None:
+            self.orders.pop(order_id, None)
+            self.persisted.pop(order_id, None)
+        else:
+            self.orders[order_id] = dict(stored, version=current.get("version", 0) + 1)
+            self.persisted[order_id] = stored.get("version", 0)
+        self._changed(order_id)
+
+    async def flush(self) -> None:
+        if not self.dirty and not self.menu_dirty:
+            return
+        batch = []
+        for order_id, full in self.dirty.items():
+            data = dict(self.orders[order_id])
+            if order_id not in self.persisted:
+                full = True
+            data["version"] = self.persisted.get(order_id, 0)
+            batch.append((data, full))
+        # Changes made while the batch is being written start a new set;
+        # whatever was not written is merged back into it afterwards.
+        self.dirty = {}
+        menu_items = self.menu.items() if self.menu_dirty else None
+        self.menu_dirty = False
+
+        loop = asyncio.get_running_loop()
+        saved, conflicts, menu_saved = {}, {}, menu_items is None
+        try:
+            with metrics.timer("service.flush"):
+                saved, conflicts, menu_saved = await loop.run_in_executor(self.storage, self._persist, batch, menu_items)
+        finally:
+            for data, full in batch:
+                order_id = data["order_id"]
+                if order_id not in saved and order_id not in conflicts:
+                    self.flush_failures += 1
+                    self.dirty[order_id] = self.dirty.get(order_id, False) or full
+            if not menu_saved:
+                self.menu_dirty = True
+        self.flushes += 1
+        for order_id, stored in conflicts.items():
+            self.flush_failures += 1
+            self._reload(order_id, stored)
+        if conflicts:
+            await self._notify()
+        for order_id, version in saved.items():
+            self.persisted[order_id] = version
+            data = self.orders.get(order_id)
+            # Finished orders have moved to the archive; forget them once
+            # nothing newer is waiting to be written.
+            if data and data["status"] in (Order.COMPLETED, Order.CANCELLED) and order_id not in self.dirty:
+                del self.orders[order_id]
+                del self.persisted[order_id]
+
+    async def flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Error: flush failed: {e}")
+
+    # -- operations -----------------------------------------------------
+
+    def op_ping(self) -> dict:
+        return {"orders": len(self.orders), "seq": self.seq, "dirty": len(self.dirty),
+                "flushes": self.flushes, "flush_failures": self.flush_failures}
+
+    async def op_save_order(self, order: dict) -> int:
+        current = self.orders.get(order["order_id"])
+        try:
+            version = check_version(order, None if current is None else current.get("version", 0))
+        except OrderConflictError as e:
+            raise ServiceError(str(e))
+        order["version"] = version
+        self.orders[order["order_id"]] = order
+        self._mark(order["order_id"], full=True)
+        await self._notify()
+        return version
+
+    async def op_save_order_status(self, order_id: str, status: str, version: int) -> int:
+        current = self.orders.get(order_id)
+        if current is None:
+            raise ServiceError(f"Order {order_id} is not open")
+        try:
+            new_version = check_version({"order_id": order_id, "version": version}, current.get("version", 0))
+        except OrderConflictError as e:
+            raise ServiceError(str(e))
+        self.orders[order_id] = dict(current, status=status, version=new_version)
+        self._mark(order_id, full=False)
+        await self._notify()
+        return new_version
+
+    def op_get_order(self, order_id: str) -> Optional[dict]:
+        return self.orders.get(order_id)
+
+    def op_pending_orders(self) -> dict:
+        pending = [data for data in self.orders.values() if data["status"] == Order.PENDING]
+        pending.sort(key=lambda data: data["created_at"])
+        return {"orders": pending, "seq": self.seq}
+
+    def op_changes(self, since: int) -> dict:
+        # Orders changed after `since`; "reset" when the log no longer
+        # reaches back that far and the caller must reload.
+        if since > self.seq or (self.changes and since < self.changes[0][0] - 1):
+            return dict(self.op_pending_orders(), reset=True)
+        changed = {}
+        for seq, order_id in reversed(self.changes):
+            if seq <= since:
+                break
+            changed.setdefault(order_id, True)
+        orders = []
+        for order_id in changed:
+            data = self.orders.get(order_id)
+            orders.append(data if data is not None else {"order_id": order_id, "status": None})
+        return {"orders": orders, "seq": self.seq, "reset": False}
+
+    async def op_wait_changes(self, since: int, timeout: float = 30.0) -> dict:
+        if self.seq == since:
+            async with self.changed:
+                try:
+                    await asyncio.wait_for(self.changed.wait_for(lambda: self.seq != since), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        return self.op_changes(since)
+
+    def op_menu(self) -> List[dict]:
+        return [item.to_dict() for item in self.menu.items()]
+
+    def op_add_menu_item(self, item: dict) -> bool:
+        if item["id"] in self.menu:
+            return False
+        self.menu.add(MenuItem.from_dict(item))
+        self.menu_dirty = True
+        return True
+
+    def op_remove_menu_item(self, item_id: str) -> bool:
+        if item_id not in self.menu:
+            return False
+        self.menu.remove(item_id)
+        self.menu_dirty = True
+        return True
+
+    async def op_login(self, username: str, password: str) -> Optional[dict]:
+        loop = asyncio.get_running_loop()
+        user = await loop.run_in_executor(None, self.users.authenticate, username, password)
+        return None if user is None else {"username": user.get_username(), "role": user.get_role()}
+
+    def op_users(self) -> List[dict]:
+        return [{"username": user.get_username(), "role": user.get_role()} for user in self.users.users()]
+
+    def op_user_exists(self, username: str) -> bool:
+        return self.users.exists(username)
+
+    async def op_add_user(self, user: dict) -> bool:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.users.add, user_from_dict(user))
+
+    async def op_inventory_reserve(self, order: dict) -> bool:
+        loop = asyncio.get_running_loop()
+        short = await loop.run_in_executor(None, self.inventory.try_reserve, Order.from_dict(order))
+        if short:
+            raise ServiceError(f"Not enough stock for {', '.join(short)}")
+        return True
+
+    async def op_inventory_release(self, order_id: str) -> bool:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.inventory.release, order_id)
+
+    async def op_inventory_consume(self, order_id: str) -> bool:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.inventory.consume, order_id)
+
+    def op_inventory_sold_out(self) -> List[str]:
+        return sorted(self.inventory.sold_out())
+
+    def op_inventory_available(self, item_id: str, quantity: int = 1) -> bool:
+        return self.inventory.available(item_id, quantity)
+
+    def op_inventory_portions(self, item_id: str) -> Optional[int]:
+        return self.inventory.portions(item_id)
+
+    def op_inventory_levels(self) -> List[dict]:
+        return self.inventory.levels()
+
+    async def op_inventory_restock(self, ingredient: str, amount: float) -> float:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.inventory.restock, ingredient, amount)
+
+    async def op_inventory_set_recipe(self, item_id: str, recipe: Dict[str, float]) -> None:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.inventory.set_recipe, item_id, recipe)
+
+    async def op_rollups_record(self, order: dict) -> None:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.storage, record_completed_order, Order.from_dict(order), self.rollups)
+
+    def op_rollups_daily(self, start_day: str = None, end_day: str = None) -> List[Tuple[str, dict]]:
+        return self.rollups.daily(start_day, end_day)
+
+    def op_rollups_hourly(self, start_hour: str = None, end_hour: str = None) -> List[Tuple[str, dict]]:
+        return self.rollups.hourly(start_hour, end_hour)
+
+    # -- transport ------------------------------------------------------
+
+    async def dispatch(self, request: dict) -> dict:
+        handler = getattr(self, "op_" + str(request.get("op")), None)
+        if handler is None:
+            return {"id": request.get("id"), "ok": False, "error": f"Unknown operation: {request.get('op')}"}
+        try:
+            with metrics.timer("service." + request["op"]):
+                result = handler(**request.get("args", {}))
+                if asyncio.iscoroutine(result):
+                    result = await result
+        except ServiceError as e:
+            return {"id": request.get("id"), "ok": False, "error": str(e)}
+        except (TypeError, KeyError) as e:
+            return {"id": request.get("id"), "ok": False, "error": f"Bad request: {e}"}
+        return {"id": request.get("id"), "ok": True, "result": result}
+
+    async def respond(self, request: dict) -> dict:
+        # Clients resend a request if the connection drops before the reply
+        # arrives. Replies are kept per (client, id), so a resent request
+        # gets the first answer instead of running the operation again.
+        key = (request.get("client"), request.get("id"))
+        if key[0] is None:
+            return await self.dispatch(request)
+        reply = self.replies.get(key)
+        if reply is None:
+            reply = self.replies[key] = asyncio.ensure_future(self.dispatch(request))
+            if len(self.replies) > REPLY_CACHE_SIZE:
+                self.replies.popitem(last=False)
+        return await asyncio.shield(reply)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        # One JSON object per line in each direction.
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                except json.JSONDecodeError:
+                    response = {"ok": False, "error": "Bad request: not JSON"}
+                else:
+                    response = await self.respond(request)
+                writer.write(json.dumps(response).encode("utf-8") + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.storage, self.load)
+        self.changed = asyncio.Condition()
+
+    async def stop(self) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            await self.flush()
+        finally:
+            await loop.run_in_executor(self.storage, close_order_repository)
+            self.storage.shutdown()
+
+    async def serve(self, host: str = SERVICE_HOST, port: int = SERVICE_PORT) -> None:
+        await self.start()
+        server = await asyncio.start_server(self.handle, host, port, limit=MAX_REQUEST_BYTES)
+        flusher = asyncio.create_task(self.flush_loop())
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except (NotImplementedError, RuntimeError):
+                pass
+
+        print(f"Order service listening on {host}:{port} ({len(self.orders)} open orders)")
+        try:
+            async with server:
+                await stop.wait()
+        finally:
+            flusher.cancel()
+            await self.stop()
+            if self.dirty or self.menu_dirty:
+                print(f"Error: order service stopped with {len(self.dirty)} order changes not written.")
+            else:
+                print("Order service stopped; all changes written.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve orders, menu and users to all terminals from memory.")
+    parser.add_argument("--host", default=SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=SERVICE_PORT)
+    parser.add_argument("--flush-interval", type=float, default=FLUSH_INTERVAL)
+    parser.add_argument("--storage-mode", default=order_store.STORAGE_MODE,
+                        choices=order_store.STORAGE_MODES)
+    args = parser.parse_args()
+    order_store.set_storage_mode(args.storage_mode)
+    asyncio.run(OrderService(args.flush_interval).serve(args.host, args.port))
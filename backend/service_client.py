@@ -0,0 +1,223 @@
+import json
+import socket
+import threading
+import uuid
+from concurrent.futures import Future
+from typing import Dict, FrozenSet, List, Optional, Tuple
+from .menuitem import MenuItem
+from .order import Order
+from .service import SERVICE_HOST, SERVICE_PORT, ServiceError
+from .user import User, submit_login, user_from_dict
+
+
+def parse_address(address: str = None):
+    if not address:
+        return SERVICE_HOST, SERVICE_PORT
+    host, _, port = address.rpartition(":")
+    return host or SERVICE_HOST, int(port)
+
+
+class ServiceClient:
+    # Blocking client for the order service, used by main.py when it runs
+    # with --service. One connection per terminal, one request at a time.
+    def __init__(self, address: str = None, connect_timeout: float = 5.0):
+        self.address = parse_address(address)
+        self.connect_timeout = connect_timeout
+        self._sock = None
+        self._file = None
+        self._client_id = uuid.uuid4().hex
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.users = RemoteUserDirectory(self)
+        self.inventory = RemoteInventory(self)
+        self.rollups = RemoteSalesRollups(self)
+
+    def _connect(self) -> None:
+        self._sock = socket.create_connection(self.address, timeout=self.connect_timeout)
+        # Replies to wait_changes may take as long as the caller asked to wait.
+        self._sock.settimeout(None)
+        self._file = self._sock.makefile("rwb")
+
+    def close(self) -> None:
+        if self._sock is not None:
+            self._file.close()
+            self._sock.close()
+            self._sock = self._file = None
+
+    def call(self, op: str, **args):
+        with self._lock:
+            self._next_id += 1
+            request = json.dumps({"client": self._client_id, "id": self._next_id, "op": op,
+                                  "args": args}).encode("utf-8") + b"\n"
+            # Reconnect once if the connection dropped since the last call.
+            # The resent request keeps its ID, so if the service already ran
+            # it, it answers from its reply cache rather than running it twice.
+            for attempt in (1, 2):
+                try:
+                    if self._sock is None:
+                        self._connect()
+                    self._file.write(request)
+                    self._file.flush()
+                    line = self._file.readline()
+                    if line:
+                        break
+                    raise ConnectionError("Order service closed the connection")
+                except OSError:
+                    self.close()
+                    if attempt == 2:
+                        raise
+        response = json.loads(line)
+        if not response["ok"]:
+            raise ServiceError(response["error"])
+        return response["result"]
+
+    def ping(self) -> dict:
+        return self.call("ping")
+
+    def save_order(self, order: Order) -> bool:
+        try:
+            order.version = self.call("save_order", order=order.to_dict())
+        except ServiceError as e:
+            print(f"Error: {e}")
+            return False
+        return True
+
+    def save_order_status(self, order: Order) -> bool:
+        try:
+            order.version = self.call("save_order_status", order_id=order.order_id,
+                                      status=order.status, version=order.version)
+        except ServiceError as e:
+            print(f"Error: {e}")
+            return False
+        return True
+
+    def get_order(self, order_id: str) -> Optional[Order]:
+        data = self.call("get_order", order_id=order_id)
+        return None if data is None else Order.from_dict(data)
+
+    def menu_items(self) -> List[MenuItem]:
+        return [MenuItem.from_dict(item) for item in self.call("menu")]
+
+    def add_menu_item(self, item: MenuItem) -> bool:
+        return self.call("add_menu_item", item=item.to_dict())
+
+    def remove_menu_item(self, item_id: str) -> bool:
+        return self.call("remove_menu_item", item_id=item_id)
+
+    def pending_queue(self) -> "RemotePendingQueue":
+        return RemotePendingQueue(self)
+
+
+class RemoteUserDirectory:
+    # Same calls as UserDirectory; the service does the hashing.
+    def __init__(self, client: ServiceClient):
+        self.client = client
+
+    def _user(self, data: Optional[dict]) -> Optional[User]:
+        if data is None:
+            return None
+        return user_from_dict(dict(data, password=""))
+
+    def authenticate(self, username: str, password: str) -> Optional[User]:
+        return self._user(self.client.call("login", username=username, password=password))
+
+    def verify(self, username: str, password: str) -> Future:
+        return submit_login(self.authenticate, username, password)
+
+    def users(self) -> List[User]:
+        return [self._user(data) for data in self.client.call("users")]
+
+    def exists(self, username: str) -> bool:
+        return self.client.call("user_exists", username=username)
+
+    def add(self, user: User) -> bool:
+        return self.client.call("add_user", user=user.to_dict())
+
+
+class RemoteInventory:
+    # Same calls as Inventory; the service owns inventory.json.
+    def __init__(self, client: ServiceClient):
+        self.client = client
+
+    def reserve(self, order: Order) -> bool:
+        try:
+            return self.client.call("inventory_reserve", order=order.to_dict())
+        except ServiceError as e:
+            print(f"Error: {e}")
+            return False
+
+    def release(self, order_id: str) -> bool:
+        return self.client.call("inventory_release", order_id=order_id)
+
+    def consume(self, order_id: str) -> bool:
+        return self.client.call("inventory_consume", order_id=order_id)
+
+    def sold_out(self) -> FrozenSet[str]:
+        return frozenset(self.client.call("inventory_sold_out"))
+
+    def available(self, item_id: str, quantity: int = 1) -> bool:
+        return self.client.call("inventory_available", item_id=item_id, quantity=quantity)
+
+    def portions(self, item_id: str) -> Optional[int]:
+        return self.client.call("inventory_portions", item_id=item_id)
+
+    def levels(self) -> List[dict]:
+        return self.client.call("inventory_levels")
+
+    def restock(self, ingredient: str, amount: float) -> float:
+        return self.client.call("inventory_restock", ingredient=ingredient, amount=amount)
+
+    def set_recipe(self, item_id: str, recipe: Dict[str, float]) -> None:
+        self.client.call("inventory_set_recipe", item_id=item_id, recipe=recipe)
+
+
+class RemoteSalesRollups:
+    # Same calls as SalesRollups; the service owns rollups.json.
+    def __init__(self, client: ServiceClient):
+        self.client = client
+
+    def record(self, order: Order) -> None:
+        self.client.call("rollups_record", order=order.to_dict())
+
+    def daily(self, start_day: str = None, end_day: str = None) -> List[Tuple[str, dict]]:
+        return [tuple(pair) for pair in self.client.call("rollups_daily", start_day=start_day, end_day=end_day)]
+
+    def hourly(self, start_hour: str = None, end_hour: str = None) -> List[Tuple[str, dict]]:
+        return [tuple(pair) for pair in self.client.call("rollups_hourly", start_hour=start_hour, end_hour=end_hour)]
+
+
+class RemotePendingQueue:
+    # PendingOrderQueue over the service's change log instead of the feed file.
+    def __init__(self, client: ServiceClient):
+        self.client = client
+        self.seq = 0
+        self.pending: Dict[str, Order] = {}
+        self.bootstrap()
+
+    def bootstrap(self) -> None:
+        result = self.client.call("pending_orders")
+        self.seq = result["seq"]
+        self.pending = {data["order_id"]: Order.from_dict(data) for data in result["orders"]}
+
+    def _apply(self, result: dict) -> int:
+        if result["reset"]:
+            self.pending = {}
+        for data in result["orders"]:
+            if data["status"] == Order.PENDING:
+                self.pending[data["order_id"]] = Order.from_dict(data)
+            else:
+                self.pending.pop(data["order_id"], None)
+        self.seq = result["seq"]
+        return len(result["orders"])
+
+    def refresh(self) -> int:
+        return self._apply(self.client.call("changes", since=self.seq))
+
+    def wait(self, timeout: float = 30.0) -> bool:
+        return self._apply(self.client.call("wait_changes", since=self.seq, timeout=timeout)) > 0
+
+    def orders(self) -> List[Order]:
+        return sorted(self.pending.values(), key=lambda order: order.created_at)
+
+    def mark_done(self, order: Order) -> None:
+        self.pending.pop(order.order_id, None)
@@ -0,0 +1,200 @@
+import argparse
+import json
+import sqlite3
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List
+from .repository import OrderRepository, check_version
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS orders (
+    order_id TEXT PRIMARY KEY,
+    customer_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS order_items (
+    order_id TEXT NOT NULL REFERENCES orders(order_id) ON DELETE CASCADE,
+    line_no INTEGER NOT NULL,
+    product_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    price REAL NOT NULL,
+    quantity INTEGER NOT NULL,
+    PRIMARY KEY (order_id, line_no)
+);
+CREATE INDEX IF NOT EXISTS idx_orders_status ON orders(status);
+CREATE INDEX IF NOT EXISTS idx_orders_created_at ON orders(created_at);
+CREATE INDEX IF NOT EXISTS idx_orders_customer_id ON orders(customer_id);
+CREATE INDEX IF NOT EXISTS idx_order_items_product_id ON order_items(product_id);
+"""
+
+
+class SqliteOrderRepository(OrderRepository):
+    mode = "sqlite"
+
+    def __init__(self, db_file: str):
+        self.db_file = db_file
+        self.conn = sqlite3.connect(db_file, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(SCHEMA)
+        columns = [row["name"] for row in self.conn.execute("PRAGMA table_info(orders)")]
+        if "version" not in columns:
+            self.conn.execute("ALTER TABLE orders ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+
+    def _fetch(self, where: str = "", params: Iterable = ()) -> List[dict]:
+        return list(self._iter(where, params))
+
+    def _iter(self, where: str = "", params: Iterable = ()) -> Iterator[dict]:
+        # Orders are read a batch at a time and their items fetched per
+        # batch, so only one batch is ever held in memory.
+        cursor = self.conn.execute(
+            f"SELECT order_id, customer_id, status, created_at, version FROM orders {where} ORDER BY rowid",
+            tuple(params),
+        )
+        while True:
+            rows = cursor.fetchmany(500)
+            if not rows:
+                return
+            orders: Dict[str, dict] = {}
+            for row in rows:
+                orders[row["order_id"]] = {
+                    "order_id": row["order_id"],
+                    "customer_id": row["customer_id"],
+                    "status": row["status"],
+                    "created_at": row["created_at"],
+                    "items": [],
+                    "version": row["version"],
+                }
+
+            # 500 ids per batch also stays under SQLite's bound-parameter cap.
+            placeholders = ",".join("?" * len(orders))
+            for item in self.conn.execute(
+                f"SELECT order_id, product_id, name, price, quantity FROM order_items "
+                f"WHERE order_id IN ({placeholders}) ORDER BY order_id, line_no",
+                list(orders),
+            ):
+                orders[item["order_id"]]["items"].append({
+                    "product_id": item["product_id"],
+                    "name": item["name"],
+                    "price": item["price"],
+                    "quantity": item["quantity"],
+                })
+            yield from orders.values()
+
+    def iter(self, status: str = None, customer_id: str = None, start: datetime = None,
+             end: datetime = None) -> Iterator[dict]:
+        clauses, params = [], []
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(status)
+        if customer_id is not None:
+            clauses.append("customer_id = ?")
+            params.append(customer_id)
+        if start is not None:
+            clauses.append("created_at >= ?")
+            params.append(start.isoformat())
+        if end is not None:
+            clauses.append("created_at < ?")
+            params.append(end.isoformat())
+        return self._iter("WHERE " + " AND ".join(clauses) if clauses else "", params)
+
+    def load_all(self) -> List[dict]:
+        return self._fetch()
+
+    def get(self, order_id: str):
+        orders = self._fetch("WHERE order_id = ?", (order_id,))
+        return orders[0] if orders else None
+
+    def _stored_version(self, order_id: str):
+        row = self.conn.execute("SELECT version FROM orders WHERE order_id = ?", (order_id,)).fetchone()
+        return None if row is None else row["version"]
+
+    def save(self, data: dict) -> None:
+        with self.conn:
+            # BEGIN IMMEDIATE takes the write lock before the version is read.
+            self.conn.execute("BEGIN IMMEDIATE")
+            version = check_version(data, self._stored_version(data["order_id"]))
+            data["version"] = version
+            self._upsert(data)
+
+    def save_many(self, orders: Iterable[dict]) -> int:
+        count = 0
+        with self.conn:
+            for data in orders:
+                self._upsert(data)
+                count += 1
+        return count
+
+    def _upsert(self, data: dict) -> None:
+        self.conn.execute(
+            "INSERT INTO orders (order_id, customer_id, status, created_at, version) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(order_id) DO UPDATE SET customer_id = excluded.customer_id, "
+            "status = excluded.status, created_at = excluded.created_at, version = excluded.version",
+            (data["order_id"], data["customer_id"], data["status"], data["created_at"], data.get("version", 0)),
+        )
+        self.conn.execute("DELETE FROM order_items WHERE order_id = ?", (data["order_id"],))
+        self.conn.executemany(
+            "INSERT INTO order_items (order_id, line_no, product_id, name, price, quantity) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (data["order_id"], i, item["product_id"], item["name"], item["price"], item["quantity"])
+                for i, item in enumerate(data["items"])
+            ],
+        )
+
+    def save_status(self, data: dict) -> None:
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            stored = self._stored_version(data["order_id"])
+            version = check_version(data, stored)
+            data["version"] = version
+            if stored is None:
+                self._upsert(data)
+            else:
+                self.conn.execute(
+                    "UPDATE orders SET status = ?, version = ? WHERE order_id = ?",
+                    (data["status"], version, data["order_id"]),
+                )
+
+    def delete(self, order_id: str) -> None:
+        with self.conn:
+            self.conn.execute("DELETE FROM order_items WHERE order_id = ?", (order_id,))
+            self.conn.execute("DELETE FROM orders WHERE order_id = ?", (order_id,))
+
+    def compact(self) -> int:
+        self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return self.conn.execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+
+    def clear(self) -> None:
+        with self.conn:
+            self.conn.execute("DELETE FROM order_items")
+            self.conn.execute("DELETE FROM orders")
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def migrate_json_to_sqlite(json_file: str, db_file: str) -> int:
+    try:
+        with open(json_file, "r") as f:
+            data = json.load(f)
+    except (json.JSONDecodeError, FileNotFoundError):
+        data = []
+
+    repo = SqliteOrderRepository(db_file)
+    try:
+        return repo.save_many(data)
+    finally:
+        repo.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import an orders.json file into the SQLite order store.")
+    parser.add_argument("json_file", nargs="?", default="data/orders.json")
+    parser.add_argument("db_file", nargs="?", default="data/orders.db")
+    args = parser.parse_args()
+    count = migrate_json_to_sqlite(args.json_file, args.db_file)
+    print(f"Imported {count} orders from {args.json_file} into {args.db_file}.")
@@ -1,6 +1,44 @@
+import hashlib
+import hmac
 import json
+import os
+import secrets
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional
+from . import metrics
+from .fileio import FileLock, atomic_write_json
+
+USERS_FILE = "data/users.json"
+HASH_SCHEME = "pbkdf2_sha256"
+HASH_ITERATIONS = 100_000
+
+
+def hash_password(password, salt=None, iterations=HASH_ITERATIONS):
+    salt = salt or secrets.token_hex(16)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt.encode("ascii"), iterations)
+    return f"{HASH_SCHEME}${iterations}${salt}${digest.hex()}"
+
+
+def is_password_hash(stored):
+    return stored.startswith(HASH_SCHEME + "$")
+
+
+def verify_password(stored, password):
+    # Older users.json files hold plain passwords; those still verify, and
+    # UserDirectory rewrites them as hashes on the next successful login.
+    if not is_password_hash(stored):
+        return hmac.compare_digest(stored.encode("utf-8"), password.encode("utf-8"))
+    try:
+        _, iterations, salt, _ = stored.split("$")
+        return hmac.compare_digest(hash_password(password, salt, int(iterations)), stored)
+    except ValueError:
+        # A hash this code did not write (or a damaged one) never matches.
+        return False
 
 class User: 
+    __slots__ = ("__username", "__password", "__role")
+    
     def __init__(self, username, password, role):
         self.__username = username
         self.__password = password
@@ -16,7 +54,13 @@ class User:
         return self.__role
 
     def login(self, username, password):
-        return self.__username == username and self.__password == password
+        return self.__username == username and verify_password(self.__password, password)
+
+    def set_password(self, password):
+        self.__password = hash_password(password)
+
+    def needs_rehash(self):
+        return not is_password_hash(self.__password)
 
     def to_dict(self):
         return{
@@ -26,14 +70,20 @@ class User:
         }
 
 class Admin(User):
+    __slots__ = ()
+    
     def __init__(self, username, password):
         super().__init__(username, password, "admin")
 
 class Waiter(User):
+    __slots__ = ()
+    
     def __init__(self, username, password):
         super().__init__(username, password, "waiter")
 
 class Chef(User):
+    __slots__ = ()
+    
     def __init__(self, username, password):
         super().__init__(username, password, "chef")
 
@@ -41,27 +91,128 @@ def save_users(users, filename="data/users.json"):
     with open(filename, 'w') as f:
         json.dump([user.to_dict() for user in users], f, indent=4)
 
+@metrics.timed("user.save")
 def save_users(users, filename="data/users.json"):
     user_data = [user.to_dict() for user in users]
     with open(filename, 'w') as f:
         json.dump(user_data, f, indent=4)
 
+def user_from_dict(user_data):
+    role = user_data.get("role")
+    if role == "admin":
+        return Admin(user_data["username"], user_data["password"])
+    elif role == "waiter":
+        return Waiter(user_data["username"], user_data["password"])
+    elif role == "chef":
+        return Chef(user_data["username"], user_data["password"])
+    return User(user_data["username"], user_data["password"], role)
+
+@metrics.timed("user.load")
 def load_users(filename="data/users.json"):
     try:
         with open(filename, 'r') as f:
             data = json.load(f)
-            users = []
-            for user_data in data:
-                role = user_data.get("role")
-                if role == "admin":
-                    user = Admin(user_data["username"], user_data["password"])
-                elif role == "waiter":
-                    user = Waiter(user_data["username"], user_data["password"])
-                elif role == "chef":
-                    user = Chef(user_data["username"], user_data["password"])
-                else:
-                    user = User(user_data["username"], user_data["password"], role)
-                users.append(user)
-            return users
+            return [user_from_dict(user_data) for user_data in data]
     except (FileNotFoundError, json.JSONDecodeError):
-        return []
\ No newline at end of file
+        return []
+
+_login_executor = None
+
+
+def submit_login(authenticate, username, password) -> Future:
+    # Password checks are deliberately slow (PBKDF2) and remote ones wait on
+    # the network, so logins run on a worker thread while the terminal
+    # shows it is still busy.
+    global _login_executor
+    if _login_executor is None:
+        _login_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="login")
+    return _login_executor.submit(authenticate, username, password)
+
+
+class UserDirectory:
+    # Users indexed by username. users.json is re-read only when its mtime
+    # or size changes, so back-to-back logins at a shift change cost one
+    # stat() each. The service calls it from executor threads, so the
+    # cached users are guarded by a lock; the slow PBKDF2 check itself runs
+    # outside it.
+    def __init__(self, filename=None):
+        self.filename = filename or USERS_FILE
+        self._users: Dict[str, User] = {}
+        self._stamp = None
+        self._dummy_hash = None
+        self._lock = threading.RLock()
+
+    def _file_stamp(self):
+        try:
+            st = os.stat(self.filename)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _refresh(self):
+        stamp = self._file_stamp()
+        if stamp == self._stamp:
+            return
+        users = load_users(self.filename)
+        self._users = {user.get_username(): user for user in users}
+        self._stamp = stamp
+
+    def get(self, username) -> Optional[User]:
+        with self._lock:
+            self._refresh()
+            return self._users.get(username)
+
+    def exists(self, username) -> bool:
+        return self.get(username) is not None
+
+    def users(self) -> List[User]:
+        with self._lock:
+            self._refresh()
+            return list(self._users.values())
+
+    def _save(self, users):
+        directory = os.path.dirname(self.filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        atomic_write_json(self.filename, [user.to_dict() for user in users])
+        self._users = {user.get_username(): user for user in users}
+        self._stamp = self._file_stamp()
+
+    def add(self, user) -> bool:
+        # Re-reads under the lock so two terminals adding users at once
+        # cannot drop each other's changes.
+        with self._lock, FileLock(self.filename + ".lock"):
+            self._stamp = None
+            self._refresh()
+            if user.get_username() in self._users:
+                return False
+            self._save(list(self._users.values()) + [user])
+        return True
+
+    def _upgrade_password(self, username, password):
+        with self._lock, FileLock(self.filename + ".lock"):
+            self._stamp = None
+            user = self.get(username)
+            if user is None or not user.needs_rehash():
+                return
+            user.set_password(password)
+            self._save(list(self._users.values()))
+
+    @metrics.timed("user.authenticate")
+    def authenticate(self, username, password) -> Optional[User]:
+        user = self.get(username)
+        if user is None:
+            # Spend the same time on unknown names as on wrong passwords.
+            if self._dummy_hash is None:
+                self._dummy_hash = hash_password(secrets.token_hex(8))
+            verify_password(self._dummy_hash, password)
+            return None
+        if not user.login(username, password):
+            return None
+        if user.needs_rehash():
+            self._upgrade_password(username, password)
+            user = self.get(username)
+        return user
+
+    def verify(self, username, password) -> Future:
+        return submit_login(self.authenticate, username, password)
\ No newline at end of file
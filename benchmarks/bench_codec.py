@@ -0,0 +1,61 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.codec import decode_orders, encode_orders
+from backend.menuitem import load_menu_items
+from backend.order import Order
+
+
+def synthetic_orders(count, seed=7):
+    rng = random.Random(seed)
+    menu = load_menu_items() or []
+    orders = []
+    for i in range(count):
+        order = Order(customer_id=f"T{rng.randint(1, 40)}", order_id=f"ORD-{i:08X}")
+        for item in rng.sample(menu, rng.randint(1, min(6, len(menu)))):
+            order.add_item(item.id, item.name, item.price, rng.randint(1, 4))
+        order.status = rng.choice([Order.PENDING, Order.COMPLETED, Order.COMPLETED, Order.CANCELLED])
+        orders.append(order.to_dict())
+    return orders
+
+
+def best_of(repeat, func):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run(count, repeat):
+    orders = synthetic_orders(count)
+
+    json_encode, json_blob = best_of(repeat, lambda: json.dumps(orders, indent=4).encode("utf-8"))
+    json_decode, json_back = best_of(repeat, lambda: json.loads(json_blob))
+    bin_encode, bin_blob = best_of(repeat, lambda: encode_orders(orders))
+    bin_decode, bin_back = best_of(repeat, lambda: decode_orders(bin_blob))
+
+    assert bin_back == json_back, "binary codec did not round-trip"
+    assert [Order.from_dict(o).to_dict() for o in bin_back] == orders
+
+    print(f"{count:>8} orders   {'size':>12} {'encode':>10} {'decode':>10}")
+    print(f"{'json':>17}   {len(json_blob):>12,} {json_encode * 1000:>8.1f}ms {json_decode * 1000:>8.1f}ms")
+    print(f"{'binary':>17}   {len(bin_blob):>12,} {bin_encode * 1000:>8.1f}ms {bin_decode * 1000:>8.1f}ms")
+    print(f"{'ratio':>17}   {len(json_blob) / len(bin_blob):>11.1f}x "
+          f"{json_encode / bin_encode:>9.1f}x {json_decode / bin_decode:>9.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the JSON and binary order encodings.")
+    parser.add_argument("--orders", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    for count in args.orders:
+        run(count, args.repeat)
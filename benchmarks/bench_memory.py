@@ -0,0 +1,98 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_codec import synthetic_orders
+
+
+def peak_rss_mb():
+    # ru_maxrss is kilobytes on Linux and bytes on macOS. Windows has no
+    # resource module; there the peak of the Python heap traced since
+    # measure() started stands in for it.
+    if resource is None:
+        return tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def write_orders(path, count):
+    chunk = 10000
+    with open(path, "w") as f:
+        for start in range(0, count, chunk):
+            for data in synthetic_orders(min(chunk, count - start), seed=start):
+                data["order_id"] = f"ORD-{start:06X}-{data['order_id'][4:]}"
+                f.write(json.dumps(data) + "\n")
+
+
+def read_orders(path):
+    with open(path) as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def measure(path, kind):
+    # Runs in a fresh interpreter so the peak RSS belongs to one loader only.
+    from backend.order import Order
+    from backend.order_view import OrderTable
+
+    if resource is None:
+        tracemalloc.start()
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    if kind == "objects":
+        orders = [Order.from_dict(data) for data in read_orders(path)]
+        total = sum(order.get_total_cents() for order in orders)
+    else:
+        orders = OrderTable(read_orders(path))
+        total = sum(view.get_total_cents() for view in orders)
+    elapsed = time.perf_counter() - start
+    print(json.dumps({
+        "orders": len(orders),
+        "seconds": elapsed,
+        "rss_mb": peak_rss_mb() - baseline,
+        "total_cents": total,
+    }))
+
+
+def run(scale, workdir):
+    path = os.path.join(workdir, f"orders-{scale}.jsonl")
+    if not os.path.exists(path):
+        write_orders(path, scale)
+    results = {}
+    for kind in ("objects", "table"):
+        out = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--measure", path, kind],
+            check=True, capture_output=True, text=True,
+        )
+        results[kind] = json.loads(out.stdout)
+    assert results["objects"]["total_cents"] == results["table"]["total_cents"]
+
+    print(f"{scale:>9,} orders   {'peak rss':>10} {'per order':>10} {'load':>9}")
+    for kind, result in results.items():
+        per_order = result["rss_mb"] * 1024 * 1024 / scale
+        print(f"{kind:>18}   {result['rss_mb']:>8.1f}MB {per_order:>9.0f}B {result['seconds']:>8.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare memory use of Order objects and the packed OrderTable.")
+    parser.add_argument("--scales", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--measure", nargs=2, metavar=("FILE", "KIND"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.measure:
+        measure(*args.measure)
+    else:
+        with tempfile.TemporaryDirectory() as workdir:
+            for scale in args.scales:
+                run(scale, workdir)
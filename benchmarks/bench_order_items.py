@@ -0,0 +1,70 @@
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.order import Order, OrderItem
+
+
+class ListScanOrder:
+    # The previous Order line handling: linear scans and a re-summed total.
+    def __init__(self):
+        self.items = []
+
+    def add_item(self, product_id, name, price, quantity=1):
+        for item in self.items:
+            if item.product_id == product_id:
+                item.quantity += quantity
+                return True
+        self.items.append(OrderItem(product_id, name, price, quantity))
+        return True
+
+    def remove_item(self, product_id, quantity=None):
+        for i, item in enumerate(self.items):
+            if item.product_id == product_id:
+                if quantity is None or quantity >= item.quantity:
+                    self.items.pop(i)
+                else:
+                    item.quantity -= quantity
+                return True
+        return False
+
+    def get_total(self):
+        return sum(item.subtotal for item in self.items)
+
+
+def build(order, lines):
+    for i in range(lines):
+        order.add_item(f"P{i}", f"Item {i}", 1.25 + i % 7, 2)
+    return order
+
+
+def workload(order, lines):
+    # A banquet order being edited: bump late lines, trim some, re-check the
+    # total after each change as the POS summary does.
+    for i in range(lines - 50, lines):
+        order.add_item(f"P{i}", f"Item {i}", 1.25 + i % 7, 1)
+        order.get_total()
+        order.remove_item(f"P{i}", 1)
+        order.get_total()
+
+
+def run(lines, repeat):
+    results = {}
+    for label, factory in (("list scan", ListScanOrder), ("indexed", lambda: Order("BENCH"))):
+        order = build(factory(), lines)
+        best = min(timeit.repeat(lambda: workload(order, lines), number=1, repeat=repeat))
+        results[label] = best
+        print(f"{lines:>6} lines  {label:<10} {best * 1000:8.3f} ms per 50 edit+total rounds")
+    print(f"{lines:>6} lines  speed-up   {results['list scan'] / results['indexed']:8.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare Order line-item operations before and after indexing.")
+    parser.add_argument("--lines", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    for lines in args.lines:
+        run(lines, args.repeat)
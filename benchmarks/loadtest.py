@@ -0,0 +1,268 @@
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import queue
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import backend.order as order_store
+from backend.order import Order
+from backend.receipt import Receipt
+from benchmarks.workload import Workload
+
+
+def use_workdir(workdir, mode):
+    os.chdir(workdir)
+    order_store.set_storage_mode(mode)
+
+
+def waiter(workdir, mode, worker_id, duration, rate, max_items, seed, start_at):
+    # Open-loop arrivals: orders are due on a Poisson schedule whether or not
+    # the previous save has finished, so a slow store shows up as latency.
+    use_workdir(workdir, mode)
+    rng = random.Random(seed * 1000 + worker_id)
+    workload = Workload(orders=0, max_items=max_items, seed=seed)
+    latencies, submitted, failed = [], {}, 0
+
+    time.sleep(max(0.0, start_at - time.time()))
+    due = time.time()
+    end = due + duration
+    while True:
+        due += rng.expovariate(rate)
+        if due >= end:
+            break
+        time.sleep(max(0.0, due - time.time()))
+        order = workload.make_order(rng, None, datetime.now(), Order.DRAFT)
+        order.customer_id = f"W{worker_id}-T{rng.randint(1, 20)}"
+        order.update_status(Order.PENDING)
+        started = time.perf_counter()
+        ok = order_store.save_order(order)
+        latencies.append(time.perf_counter() - started)
+        if ok:
+            submitted[order.order_id] = time.time()
+        else:
+            failed += 1
+    return {"submit": latencies, "submitted": submitted, "failed": failed}
+
+
+def chef(workdir, mode, worker_id, seed, start_at, waiters_done, waiter_count, drain_timeout):
+    # Polls get_pending_orders like the kitchen display and completes one of
+    # the oldest few orders, so chefs regularly race for the same order.
+    use_workdir(workdir, mode)
+    rng = random.Random(seed * 1000 + 500 + worker_id)
+    poll, complete, receipt = [], [], []
+    completed, conflicts = {}, 0
+
+    time.sleep(max(0.0, start_at - time.time()))
+    drain_deadline = None
+    while True:
+        started = time.perf_counter()
+        pending = order_store.get_pending_orders()
+        poll.append(time.perf_counter() - started)
+
+        if not pending:
+            if waiters_done.value >= waiter_count:
+                drain_deadline = drain_deadline or time.time() + drain_timeout
+                if time.time() >= drain_deadline or not order_store.get_pending_orders():
+                    break
+            time.sleep(0.02)
+            continue
+
+        pending.sort(key=lambda o: o.created_at)
+        order = rng.choice(pending[:3])
+        order.update_status(Order.COMPLETED)
+        started = time.perf_counter()
+        # Lost races are expected here; they are counted, not printed.
+        with contextlib.redirect_stdout(None):
+            ok = order_store.save_order_status(order)
+        complete.append(time.perf_counter() - started)
+        if not ok:
+            conflicts += 1
+            continue
+        completed[order.order_id] = time.time()
+
+        started = time.perf_counter()
+        Receipt(order).get_receipt(Receipt.DETAILED)
+        receipt.append(time.perf_counter() - started)
+    return {"poll": poll, "complete": complete, "receipt": receipt,
+            "completed": completed, "conflicts": conflicts}
+
+
+def _run_waiter(waiters_done, *args):
+    try:
+        return waiter(*args)
+    finally:
+        with waiters_done.get_lock():
+            waiters_done.value += 1
+
+
+def percentiles(samples):
+    if not samples:
+        return {"count": 0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    ordered = sorted(samples)
+
+    def pick(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    return {"count": len(ordered), "p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99), "max": ordered[-1]}
+
+
+def run(args):
+    workdir = tempfile.mkdtemp(prefix="srs-load-")
+    try:
+        use_workdir(workdir, args.mode)
+        order_store.ensure_data_dir()
+        start_at = time.time() + 1.0
+
+        if args.threads:
+            waiters_done = multiprocessing.Value("i", 0, lock=True)
+            pool_results = queue.Queue()
+
+            def spawn(func, *params):
+                def target():
+                    # A worker that dies still reports, so the results below
+                    # never wait on a put that is not coming.
+                    try:
+                        pool_results.put((func, func(*params)))
+                    except BaseException as e:
+                        pool_results.put((func, e))
+
+                thread = threading.Thread(target=target)
+                thread.start()
+                return thread
+
+            # sys.stdout is shared by the threads; the chefs' own redirects
+            # would race and could leave it None, so silence it once here.
+            with contextlib.redirect_stdout(None):
+                workers = [spawn(_run_waiter, waiters_done, workdir, args.mode, w, args.duration, args.rate,
+                                 args.max_items, args.seed, start_at) for w in range(args.waiters)]
+                workers += [spawn(chef, workdir, args.mode, c, args.seed, start_at, waiters_done, args.waiters,
+                                  args.drain_timeout) for c in range(args.chefs)]
+                for thread in workers:
+                    thread.join()
+            results = [pool_results.get() for _ in workers]
+            for func, result in results:
+                if isinstance(result, BaseException):
+                    raise result
+            waiter_results = [r for func, r in results if func is _run_waiter]
+            chef_results = [r for func, r in results if func is chef]
+        else:
+            context = multiprocessing.get_context("spawn")
+            manager = context.Manager()
+            waiters_done = manager.Value("i", 0)
+            lock = manager.Lock()
+            with context.Pool(args.waiters + args.chefs) as pool:
+                chef_jobs = [pool.apply_async(chef, (workdir, args.mode, c, args.seed, start_at,
+                                                     waiters_done, args.waiters, args.drain_timeout))
+                             for c in range(args.chefs)]
+                waiter_jobs = [pool.apply_async(waiter, (workdir, args.mode, w, args.duration, args.rate,
+                                                         args.max_items, args.seed, start_at))
+                               for w in range(args.waiters)]
+                waiter_results = []
+                for job in waiter_jobs:
+                    waiter_results.append(job.get())
+                    with lock:
+                        waiters_done.value += 1
+                chef_results = [job.get() for job in chef_jobs]
+            manager.shutdown()
+        elapsed = time.time() - start_at
+        return report(args, waiter_results, chef_results, elapsed)
+    finally:
+        os.chdir("/")
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def report(args, waiter_results, chef_results, elapsed):
+    submitted = {}
+    for result in waiter_results:
+        submitted.update(result["submitted"])
+    completions = Counter()
+    completed_at = {}
+    for result in chef_results:
+        completions.update(result["completed"].keys())
+        completed_at.update(result["completed"])
+
+    # What actually ended up on disk, live store and archive together.
+    stored = Counter(data["order_id"] for data in order_store.get_order_repository().load_all())
+    stored.update(data["order_id"] for data in order_store.get_order_archive().load_range())
+
+    lost = [order_id for order_id in submitted if order_id not in stored]
+    duplicated = sorted({order_id for order_id, n in stored.items() if n > 1} |
+                        {order_id for order_id, n in completions.items() if n > 1})
+    unfinished = [order_id for order_id in submitted if order_id not in completed_at]
+
+    latencies = {
+        "submit": percentiles([s for r in waiter_results for s in r["submit"]]),
+        "pending_poll": percentiles([s for r in chef_results for s in r["poll"]]),
+        "complete": percentiles([s for r in chef_results for s in r["complete"]]),
+        "receipt": percentiles([s for r in chef_results for s in r["receipt"]]),
+        "end_to_end": percentiles([completed_at[o] - submitted[o] for o in submitted if o in completed_at]),
+    }
+    return {
+        "mode": args.mode,
+        "workers": "threads" if args.threads else "processes",
+        "waiters": args.waiters,
+        "chefs": args.chefs,
+        "rate_per_waiter": args.rate,
+        "duration": args.duration,
+        "elapsed": elapsed,
+        "submitted": len(submitted),
+        "submit_failures": sum(r["failed"] for r in waiter_results),
+        "completed": len(completed_at),
+        "conflicts": sum(r["conflicts"] for r in chef_results),
+        "orders_per_sec": len(submitted) / elapsed if elapsed else 0.0,
+        "completions_per_sec": len(completed_at) / elapsed if elapsed else 0.0,
+        "lost": lost,
+        "duplicated": duplicated,
+        "unfinished": unfinished,
+        "latency": latencies,
+    }
+
+
+def print_report(result):
+    print(f"\n{result['mode']} store, {result['waiters']} waiters + {result['chefs']} chefs "
+          f"({result['workers']}), {result['rate_per_waiter']}/s per waiter for {result['duration']}s")
+    print(f"  submitted {result['submitted']} ({result['orders_per_sec']:.1f}/s), "
+          f"completed {result['completed']} ({result['completions_per_sec']:.1f}/s), "
+          f"{result['conflicts']} chef conflicts, {result['submit_failures']} failed submits")
+    print(f"  lost {len(result['lost'])}, duplicated {len(result['duplicated'])}, "
+          f"unfinished {len(result['unfinished'])}")
+    print(f"  {'operation':<14} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for name, stats in result["latency"].items():
+        print(f"  {name:<14} {stats['count']:>7} {stats['p50'] * 1000:>9.2f} {stats['p95'] * 1000:>9.2f} "
+              f"{stats['p99'] * 1000:>9.2f} {stats['max'] * 1000:>9.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Drive the order paths with simulated waiters and chefs.")
+    parser.add_argument("--mode", default="json", choices=["json", "journal", "sqlite", "binary"])
+    parser.add_argument("--waiters", type=int, default=4)
+    parser.add_argument("--chefs", type=int, default=2)
+    parser.add_argument("--rate", type=float, default=2.0, help="orders per second per waiter")
+    parser.add_argument("--max-items", type=int, default=6, help="largest basket; sizes are uniform from 1")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of order arrivals")
+    parser.add_argument("--drain-timeout", type=float, default=30.0)
+    parser.add_argument("--threads", action="store_true", help="run workers as threads in one process")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", action="store_true", help="print the full report as JSON")
+    args = parser.parse_args()
+    if args.threads and args.mode != "json":
+        parser.error("--threads shares one repository object between workers; only the json store supports that")
+
+    result = run(args)
+    if args.json:
+        print(json.dumps(result, indent=4))
+    else:
+        print_report(result)
+    ok = not result["lost"] and not result["duplicated"]
+    sys.exit(0 if ok else 1)
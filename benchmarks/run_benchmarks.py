@@ -0,0 +1,201 @@
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.workload import Workload
+
+BASELINE_FILE = os.path.join(ROOT, "benchmarks", "baseline.json")
+
+
+def timed(func, repeat, min_time=0.2):
+    # Per-operation microseconds. Like timeit, the number of calls per round
+    # doubles until a round takes at least `min_time`, so cheap and slow
+    # operations are both measured over a comparable stretch of time.
+    ops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(ops):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or ops >= 1 << 20:
+            break
+        ops *= 2
+    rounds = [elapsed / ops * 1e6]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(ops):
+            func()
+        rounds.append((time.perf_counter() - start) / ops * 1e6)
+    return {"ops": ops, "repeat": repeat, "best_us": min(rounds), "median_us": statistics.median(rounds)}
+
+
+def measure(mode, workload, repeat):
+    # Runs inside the workload directory in a fresh interpreter, so the
+    # module-level caches in backend/ start empty for every mode and scale.
+    import main
+    from backend import order as order_module
+    from backend.menuitem import MenuCatalog, load_menu_items
+    from backend.order import get_pending_orders, load_orders, save_order
+    from backend.receipt import Receipt
+    from backend.user import UserDirectory
+
+    order_module.set_storage_mode(mode)
+    results = {}
+
+    results["load_orders"] = timed(load_orders, repeat)
+    results["get_pending_orders"] = timed(get_pending_orders, repeat)
+
+    main.MENU_CATALOG = MenuCatalog(load_menu_items())
+    rng = random.Random(workload.seed)
+    ids = [item.id for item in workload.menu] + ["MISSING"]
+    lookups = itertools.cycle([rng.choice(ids) for _ in range(10000)])
+    results["find_menu_item"] = timed(lambda: main.find_menu_item(next(lookups)), repeat)
+
+    # Prefixes and one-letter typos of menu words, as a waiter would type them.
+    terms = [word.lower() for item in workload.menu for word in item.name.split() if not word.isdigit()]
+    queries = []
+    for _ in range(1000):
+        word = rng.choice(terms)
+        cut = rng.randint(2, len(word))
+        query = word[:cut]
+        if cut > 3 and rng.random() < 0.3:
+            i = rng.randrange(1, cut - 1)
+            query = query[:i] + query[i + 1] + query[i] + query[i + 2:]
+        queries.append(query)
+    searches = itertools.cycle(queries)
+    main.MENU_CATALOG.search(queries[0])  # builds the index
+    results["search_menu"] = timed(lambda: main.MENU_CATALOG.search(next(searches)), repeat)
+
+    orders = itertools.cycle(load_orders()[:200])
+
+    def render_receipt():
+        order = next(orders)
+        receipt = Receipt(order, receipt_id="RCP-BENCH", tip_percent=0.15, issued_at=order.created_at)
+        return receipt.get_receipt(Receipt.DETAILED)
+
+    results["receipt"] = timed(render_receipt, repeat)
+
+    credentials = itertools.cycle([
+        (user.get_username(), user.get_password()) for user in rng.choices(workload.users, k=20)
+    ])
+
+    directory = UserDirectory()
+
+    def check_login():
+        username, password = next(credentials)
+        assert directory.authenticate(username, password) is not None
+
+    results["login"] = timed(check_login, repeat)
+
+    # Saves go last: they grow the store the reads above are timed against.
+    new_orders = workload.new_orders()
+    results["save_order"] = timed(lambda: save_order(next(new_orders)), repeat)
+    return results
+
+
+def run(mode, scale, args):
+    with tempfile.TemporaryDirectory() as workdir:
+        out = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--measure", mode, str(scale),
+             "--menu-items", str(args.menu_items), "--users", str(args.users),
+             "--seed", str(args.seed), "--repeat", str(args.repeat)],
+            cwd=workdir, check=True, capture_output=True, text=True,
+            env=dict(os.environ, PYTHONPATH=ROOT),
+        )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def compare(report, baseline, tolerance):
+    # A case regresses when its best time is more than `tolerance` slower
+    # than the baseline's best time for the same mode, scale and operation.
+    regressions = []
+    print(f"\n{'case':<36} {'baseline':>12} {'current':>12} {'ratio':>7}", file=sys.stderr)
+    for key, result in sorted(report["results"].items()):
+        old = baseline.get("results", {}).get(key)
+        if old is None:
+            print(f"{key:<36} {'-':>12} {result['best_us']:>10.1f}us {'new':>7}", file=sys.stderr)
+            continue
+        ratio = result["best_us"] / old["best_us"] if old["best_us"] else 1.0
+        flag = ""
+        if ratio > 1 + tolerance:
+            regressions.append(key)
+            flag = "  REGRESSION"
+        print(f"{key:<36} {old['best_us']:>10.1f}us {result['best_us']:>10.1f}us {ratio:>6.2f}x{flag}", file=sys.stderr)
+    return regressions
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Time the order, menu, receipt and login hot paths.")
+    parser.add_argument("--modes", nargs="+", default=["json", "journal", "sqlite", "binary"])
+    parser.add_argument("--scales", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--menu-items", type=int, default=50)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", help="Write the JSON report to this file")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5)
+    parser.add_argument("--measure", nargs=2, metavar=("MODE", "SCALE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        mode, scale = args.measure[0], int(args.measure[1])
+        workload = Workload(orders=scale, menu_items=args.menu_items, users=args.users, seed=args.seed)
+        workload.write("data", mode)
+        print(json.dumps(measure(mode, workload, args.repeat)))
+        return 0
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "workload": {
+            key: value for key, value in
+            Workload(orders=0, menu_items=args.menu_items, users=args.users, seed=args.seed).describe().items()
+            if key != "orders"
+        },
+        "modes": args.modes,
+        "scales": args.scales,
+        "results": {},
+    }
+    for mode in args.modes:
+        for scale in args.scales:
+            for op, result in run(mode, scale, args).items():
+                report["results"][f"{mode}/{scale}/{op}"] = result
+                print(f"{mode:>8} {scale:>8} {op:<20} {result['best_us']:>12.1f}us", file=sys.stderr)
+
+    text = json.dumps(report, indent=4)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            f.write(text + "\n")
+        return 0
+    if not os.path.exists(args.baseline):
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(report, baseline, args.tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
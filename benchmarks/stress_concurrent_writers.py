@@ -0,0 +1,100 @@
+import argparse
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import backend.order as order_store
+from backend.order import Order
+
+
+def use_workdir(workdir, mode):
+    os.chdir(workdir)
+    order_store.set_storage_mode(mode)
+
+
+def submit_orders(workdir, mode, worker_id, count):
+    use_workdir(workdir, mode)
+    failures = 0
+    for i in range(count):
+        order = Order(customer_id=f"T{worker_id}")
+        order.add_item("A1", "Burger", 15.0, 1 + i % 3)
+        order.update_status(Order.PENDING)
+        if not order_store.save_order(order):
+            failures += 1
+    return failures
+
+
+def bump_shared_order(workdir, mode, order_id, count):
+    use_workdir(workdir, mode)
+    applied = conflicts = 0
+    while applied < count:
+        order = next(o for o in order_store.load_orders() if o.order_id == order_id)
+        order.add_item("B1", "Soda", 2.5, 1)
+        if order_store.save_order(order):
+            applied += 1
+        else:
+            conflicts += 1
+    return applied, conflicts
+
+
+def run(mode, workers, per_worker):
+    workdir = tempfile.mkdtemp(prefix="srs-stress-")
+    try:
+        use_workdir(workdir, mode)
+        order_store.ensure_data_dir()
+
+        with multiprocessing.get_context("spawn").Pool(workers) as pool:
+            start = time.perf_counter()
+            failures = sum(pool.starmap(
+                submit_orders,
+                [(workdir, mode, w, per_worker) for w in range(workers)],
+            ))
+            elapsed = time.perf_counter() - start
+
+        orders = order_store.load_orders()
+        expected = workers * per_worker
+        ids = {o.order_id for o in orders}
+        print(f"[{mode}] {workers} writers x {per_worker} orders: "
+              f"{len(orders)}/{expected} stored, {len(ids)} unique, {failures} failed saves, "
+              f"{expected / elapsed:.0f} saves/s under contention")
+        ok = len(orders) == expected == len(ids) and failures == 0
+
+        shared = Order(customer_id="SHARED")
+        shared.add_item("A1", "Burger", 15.0, 1)
+        order_store.save_order(shared)
+        with multiprocessing.get_context("spawn").Pool(workers) as pool:
+            results = pool.starmap(
+                bump_shared_order,
+                [(workdir, mode, shared.order_id, 5) for _ in range(workers)],
+            )
+        applied = sum(r[0] for r in results)
+        conflicts = sum(r[1] for r in results)
+        final = next(o for o in order_store.load_orders() if o.order_id == shared.order_id)
+        soda = next(item.quantity for item in final.items if item.product_id == "B1")
+        print(f"[{mode}] shared order: {applied} updates applied, {conflicts} conflicts reported, "
+              f"final version {final.version}, soda quantity {soda}")
+        ok = ok and soda == applied and final.version == applied + 1
+        return ok
+    finally:
+        order_store.set_storage_mode("json")
+        os.chdir(os.path.dirname(workdir))
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run many order writers against one data directory at once.")
+    parser.add_argument("--modes", nargs="+", default=["json", "journal", "sqlite"])
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--orders", type=int, default=50)
+    args = parser.parse_args()
+
+    all_ok = True
+    for mode in args.modes:
+        all_ok = run(mode, args.workers, args.orders) and all_ok
+    print("PASS" if all_ok else "FAIL: orders were lost or updates overwritten")
+    sys.exit(0 if all_ok else 1)
@@ -0,0 +1,160 @@
+import argparse
+import itertools
+import json
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.codec import encode_orders
+from backend.fileio import atomic_write_bytes, atomic_write_json
+from backend.menuitem import MenuItem, save_menu_items
+from backend.order import Order
+from backend.order_archive import OrderArchive
+from backend.sqlite_repository import migrate_json_to_sqlite
+from backend.user import Admin, Chef, Waiter, save_users
+
+CATEGORIES = {
+    "Food": ["Burger", "Pizza", "Pasta", "Salad", "Steak", "Soup", "Tacos", "Curry", "Risotto", "Wrap"],
+    "Drink": ["Cola", "Lemonade", "Coffee", "Tea", "Juice", "Water", "Smoothie", "Beer"],
+    "Dessert": ["Cake", "Ice Cream", "Pie", "Brownie", "Tiramisu"],
+}
+STYLES = ["Classic", "Spicy", "Vegan", "Large", "House", "Double", "Mini", "Special"]
+
+
+class Workload:
+    # A deterministic restaurant: the same seed and sizes always give the
+    # same menu, staff and order history, so timings from different runs
+    # are comparable. Item popularity follows a Zipf-like curve controlled
+    # by `skew`; basket sizes are uniform in [1, max_items].
+    def __init__(self, orders=1000, menu_items=50, users=50, history_orders=0, history_days=30,
+                 pending_share=0.3, max_items=6, skew=1.1, seed=7):
+        self.order_count = orders
+        self.menu_size = menu_items
+        self.user_count = users
+        self.history_count = history_orders
+        self.history_days = history_days
+        self.pending_share = pending_share
+        self.max_items = max_items
+        self.skew = skew
+        self.seed = seed
+        self.start = datetime(2024, 1, 1, 11, 0)
+
+        self.menu = self._make_menu()
+        self.users = self._make_users()
+        self._weights = [1 / (rank + 1) ** skew for rank in range(len(self.menu))]
+
+    def _make_menu(self):
+        rng = random.Random(self.seed)
+        base = [(category, name) for category, names in CATEGORIES.items() for name in names]
+        menu = []
+        for i in range(self.menu_size):
+            category, name = base[i % len(base)]
+            round_no = i // len(base)
+            if round_no:
+                name = f"{STYLES[(round_no - 1) % len(STYLES)]} {name}"
+                if round_no > len(STYLES):
+                    name += f" {round_no}"
+            price = round(rng.uniform(2, 40) * 4) / 4 + rng.choice([0, 0, 0.05, 0.49, 0.99])
+            menu.append(MenuItem(f"{category[0]}{i + 1}", name, category, round(price, 2)))
+        return menu
+
+    def _make_users(self):
+        users = [Admin("admin", "admin123")]
+        for i in range(1, self.user_count):
+            cls = Chef if i % 4 == 0 else Waiter
+            users.append(cls(f"{cls.__name__.lower()}{i:04d}", f"pw-{self.seed}-{i}"))
+        return users
+
+    def make_order(self, rng, order_id, created_at, status):
+        order = Order(customer_id=f"T{rng.randint(1, 40)}", order_id=order_id)
+        for _ in range(rng.randint(1, self.max_items)):
+            item = rng.choices(self.menu, weights=self._weights)[0]
+            order.add_item(item.id, item.name, item.price, rng.randint(1, 3))
+        order.status = status
+        order.created_at = created_at
+        return order
+
+    def live_orders(self):
+        # Today's open orders: pending or in the kitchen.
+        rng = random.Random(self.seed + 1)
+        today = self.start + timedelta(days=self.history_days)
+        for i in range(self.order_count):
+            status = Order.PENDING if rng.random() < self.pending_share else Order.PROCESSING
+            created = today + timedelta(seconds=i * 30 + rng.randint(0, 29))
+            yield self.make_order(rng, f"ORD-L{i:07X}", created, status)
+
+    def history_orders(self):
+        rng = random.Random(self.seed + 2)
+        span = self.history_days * 24 * 3600
+        for i in range(self.history_count):
+            created = self.start + timedelta(seconds=span * i // max(self.history_count, 1) + rng.randint(0, 59))
+            status = Order.CANCELLED if rng.random() < 0.05 else Order.COMPLETED
+            yield self.make_order(rng, f"ORD-H{i:07X}", created, status)
+
+    def new_orders(self, count=None, seed_offset=3):
+        # Orders that are not in the store yet, for timing saves. Endless
+        # when no count is given.
+        rng = random.Random(self.seed + seed_offset)
+        now = self.start + timedelta(days=self.history_days + 1)
+        for i in itertools.count() if count is None else range(count):
+            yield self.make_order(rng, f"ORD-N{seed_offset:02X}{i:05X}", now + timedelta(seconds=i), Order.PENDING)
+
+    def write(self, data_dir="data", mode="json"):
+        # Lays the workload out the way the app stores it, using the same
+        # files and storage formats as backend/order.py.
+        os.makedirs(data_dir, exist_ok=True)
+        save_menu_items(self.menu, os.path.join(data_dir, "menu.json"))
+        save_users(self.users, os.path.join(data_dir, "users.json"))
+
+        orders = [order.to_dict() for order in self.live_orders()]
+        json_file = os.path.join(data_dir, "orders.json")
+        atomic_write_json(json_file, orders if mode in ("json", "journal") else [])
+        if mode == "sqlite":
+            staging = os.path.join(data_dir, "orders.import.json")
+            atomic_write_json(staging, orders)
+            migrate_json_to_sqlite(staging, os.path.join(data_dir, "orders.db"))
+            os.remove(staging)
+        elif mode == "binary":
+            atomic_write_bytes(os.path.join(data_dir, "orders.bin"), encode_orders(orders))
+
+        archive = OrderArchive(os.path.join(data_dir, "archive"))
+        for order in self.history_orders():
+            archive.append(order.to_dict())
+        archive.seal(before=(self.start + timedelta(days=self.history_days)).date().isoformat())
+        return len(orders)
+
+    def describe(self):
+        return {
+            "orders": self.order_count,
+            "menu_items": self.menu_size,
+            "users": self.user_count,
+            "history_orders": self.history_count,
+            "history_days": self.history_days,
+            "pending_share": self.pending_share,
+            "max_items": self.max_items,
+            "skew": self.skew,
+            "seed": self.seed,
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic restaurant workload into a data directory.")
+    parser.add_argument("data_dir", nargs="?", default="data")
+    parser.add_argument("--mode", default="json", choices=["json", "journal", "sqlite", "binary"])
+    parser.add_argument("--orders", type=int, default=1000)
+    parser.add_argument("--menu-items", type=int, default=50)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--history-orders", type=int, default=0)
+    parser.add_argument("--history-days", type=int, default=30)
+    parser.add_argument("--max-items", type=int, default=6)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    workload = Workload(orders=args.orders, menu_items=args.menu_items, users=args.users,
+                        history_orders=args.history_orders, history_days=args.history_days,
+                        max_items=args.max_items, seed=args.seed)
+    count = workload.write(args.data_dir, args.mode)
+    print(json.dumps(dict(workload.describe(), written=count, mode=args.mode)))
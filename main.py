@@ -1,16 +1,72 @@
-from backend.user import save_users, load_users, User, Admin, Waiter, Chef
-from backend.menuitem import MenuItem, save_menu_items, load_menu_items
-from backend.order import Order, OrderItem, save_order, get_pending_orders, clear_all_orders
+from backend.user import User, Admin, Waiter, Chef, UserDirectory, hash_password
+from backend.menuitem import MenuItem, MenuCatalog, save_menu_items, load_menu_items
+from backend.order import Order, save_order, save_order_status
 from backend.receipt import Receipt
+from backend.kitchen_queue import PendingOrderQueue
+from backend.kitchen_scheduler import KitchenScheduler
+from backend.receipt_writer import ReceiptWriter, CompletionTimer
+from backend.receipt_archive import ReceiptArchive, archive_receipt
+from backend.analytics import SalesRollups, load_sales_lines, record_completed_order
+from backend.inventory import Inventory
+from backend import metrics
+from backend import order as order_store
+from backend.service_client import ServiceClient
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from datetime import datetime, timedelta
+import argparse
+import atexit
 import sys
 import os
 
 CURRENT_USER = None
-MENU_ITEMS = []
+MENU_CATALOG = MenuCatalog()
+USER_DIRECTORY = UserDirectory()
+INVENTORY = Inventory()
+ROLLUPS = SalesRollups()
+SERVICE = None  # ServiceClient when started with --service
+SEARCH_RESULTS = 10
+RECEIPT_WRITER = ReceiptWriter(write=archive_receipt)
+atexit.register(RECEIPT_WRITER.shutdown)
 
 def initialize_menu():
-    global MENU_ITEMS
-    MENU_ITEMS = load_menu_items()
+    global MENU_CATALOG
+    MENU_CATALOG = MenuCatalog(SERVICE.menu_items() if SERVICE else load_menu_items())
+
+def connect_service(address=None):
+    global SERVICE, USER_DIRECTORY, INVENTORY, ROLLUPS
+    client = ServiceClient(address)
+    try:
+        status = client.ping()
+    except OSError as e:
+        print(f"ERROR: Could not reach the order service at {address or 'the default address'}: {e}")
+        return False
+    SERVICE = client
+    USER_DIRECTORY = client.users
+    INVENTORY = client.inventory
+    ROLLUPS = client.rollups
+    print(f"Connected to order service ({status['orders']} open orders).")
+    return True
+
+def submit_order(order):
+    # Stock is held before the kitchen sees the order and handed back if
+    # the save fails.
+    if not INVENTORY.reserve(order):
+        return False
+    saved = False
+    try:
+        saved = SERVICE.save_order(order) if SERVICE else save_order(order)
+    finally:
+        if not saved:
+            INVENTORY.release(order.order_id)
+    return saved
+
+def update_order_status(order):
+    saved = SERVICE.save_order_status(order) if SERVICE else save_order_status(order)
+    if saved and order.status == Order.CANCELLED:
+        INVENTORY.release(order.order_id)
+    elif saved and order.status == Order.COMPLETED:
+        INVENTORY.consume(order.order_id)
+    return saved
 
 def main_menu():
     if not os.path.exists("data"):
@@ -58,50 +114,38 @@ def login_user_flow(required_role=None):
         return True
 
     print("\n--- LOGIN REQUIRED ---")
-    users = load_users() 
-    
     username = input("Enter username: ")
     password = input("Enter password: ")
     
-    for user in users:
-        if user.login(username, password):
-            CURRENT_USER = user
-            print(f"\nSUCCESS! Logged in as {CURRENT_USER.get_username()} ({CURRENT_USER.get_role().upper()}).")
-            
-            if required_role and CURRENT_USER.get_role() != required_role:
-                print(f"ERROR: Access denied. This section requires {required_role} privileges.")
-                CURRENT_USER = None # Reset if role doesn't match
-                return False
-            return True
+    print("Checking credentials", end="", flush=True)
+    login = USER_DIRECTORY.verify(username, password)
+    while True:
+        try:
+            user = login.result(timeout=0.2)
+            break
+        except FuturesTimeoutError:
+            print(".", end="", flush=True)
+    print()
+    if user:
+        CURRENT_USER = user
+        print(f"\nSUCCESS! Logged in as {CURRENT_USER.get_username()} ({CURRENT_USER.get_role().upper()}).")
+        
+        if required_role and CURRENT_USER.get_role() != required_role:
+            print(f"ERROR: Access denied. This section requires {required_role} privileges.")
+            CURRENT_USER = None # Reset if role doesn't match
+            return False
+        return True
             
     print("\nLOGIN FAILED. Invalid username or password.")
     CURRENT_USER = None
     return False
 
 def display_menu():
-    print("\n" + "=" * 60)
-    print("AVAILABLE MENU ITEMS")
-    print("=" * 60)
-    
-    categories = {}
-    for item in MENU_ITEMS:
-        if item.category not in categories:
-            categories[item.category] = []
-        categories[item.category].append(item)
-    
-    for category in sorted(categories.keys()):
-        print(f"\n{category.upper()}:")
-        print("-" * 60)
-        for item in categories[category]:
-            print(f"  {item.id:5} | {item.name:20} | ${item.price:6.2f}")
-    
-    print("=" * 60)
+    MENU_CATALOG.set_sold_out(INVENTORY.sold_out())
+    print(MENU_CATALOG.render())
 
 def find_menu_item(item_id):
-    for item in MENU_ITEMS:
-        if item.id == item_id:
-            return item
-    return None
+    return MENU_CATALOG.get(item_id)
 
 def add_item_to_order(order):
     display_menu()
@@ -115,14 +159,51 @@ def add_item_to_order(order):
     if not menu_item:
         print(f"ERROR: Item ID '{item_id}' not found.")
         return
+    add_menu_item_to_order(order, menu_item)
+
+def search_and_add_item(order):
+    query = input("\nSearch menu by name, ID or category (or Enter to return): ").strip()
+    if not query:
+        return
+    
+    results = MENU_CATALOG.search(query, limit=SEARCH_RESULTS)
+    if not results:
+        print(f"No menu items match '{query}'.")
+        return
+    
+    MENU_CATALOG.set_sold_out(INVENTORY.sold_out())
+    print("\nMATCHES:")
+    print("-" * 60)
+    for i, item in enumerate(results, 1):
+        sold_out = " | SOLD OUT" if MENU_CATALOG.is_sold_out(item.id) else ""
+        print(f"  {i:2}. {item.id:5} | {item.name:20} | {item.category:10} | ${item.price:6.2f}{sold_out}")
+    
+    pick = input("\nEnter match number to add (or Enter to return): ").strip()
+    if not pick:
+        return
+    if not pick.isdigit() or not 1 <= int(pick) <= len(results):
+        print("ERROR: Invalid match number.")
+        return
+    add_menu_item_to_order(order, results[int(pick) - 1])
+
+def add_menu_item_to_order(order, menu_item):
+    if not INVENTORY.available(menu_item.id):
+        print(f"ERROR: {menu_item.name} is sold out.")
+        return
     
     try:
         quantity = int(input(f"Enter quantity for {menu_item.name}: "))
         if quantity <= 0:
             print("ERROR: Quantity must be greater than 0.")
             return
+        if not INVENTORY.available(menu_item.id, order.quantity_of(menu_item.id) + quantity):
+            print(f"ERROR: Only {INVENTORY.portions(menu_item.id)} {menu_item.name} left "
+                  f"({order.quantity_of(menu_item.id)} already on this order).")
+            return
         
-        if order.add_item(menu_item.id, menu_item.name, menu_item.price, quantity):
+        with metrics.timer("pos.add_item"):
+            added = order.add_item(menu_item.id, menu_item.name, menu_item.price, quantity)
+        if added:
             print(f"✓ Added {quantity}x {menu_item.name} @ ${menu_item.price:.2f} each")
         else:
             print("ERROR: Failed to add item to order.")
@@ -150,13 +231,17 @@ def remove_item_from_order(order):
             remove_qty = input(f"Remove all {item_to_remove.quantity}x {item_to_remove.name}? (yes/no): ").strip().lower()
             
             if remove_qty == 'yes':
-                if order.remove_item(item_to_remove.product_id):
+                with metrics.timer("pos.remove_item"):
+                    removed = order.remove_item(item_to_remove.product_id)
+                if removed:
                     print(f"✓ Removed {item_to_remove.name} from order.")
             else:
                 qty_input = input("Enter quantity to remove: ")
                 qty = int(qty_input)
                 if qty > 0:
-                    if order.remove_item(item_to_remove.product_id, qty):
+                    with metrics.timer("pos.remove_item"):
+                        removed = order.remove_item(item_to_remove.product_id, qty)
+                    if removed:
                         print(f"✓ Removed {qty}x {item_to_remove.name} from order.")
         else:
             print("ERROR: Invalid item number.")
@@ -206,8 +291,9 @@ def run_pos_cli():
         print("5. Cancel Order")
         print("6. Back to Main Menu (Keep Logged In)")
         print("7. Logout")
+        print("8. Search & Add Item")
         
-        choice = input("Enter your choice (1-7): ").strip()
+        choice = input("Enter your choice (1-8): ").strip()
         
         if choice == '1':
             add_item_to_order(current_order)
@@ -219,8 +305,15 @@ def run_pos_cli():
             if not current_order.items:
                 print("ERROR: Cannot submit empty order.")
             else:
-                current_order.update_status(Order.PENDING)
-                save_order(current_order)
+                with metrics.timer("pos.submit"):
+                    current_order.update_status(Order.PENDING)
+                    submitted = submit_order(current_order)
+                if not submitted:
+                    metrics.count("pos.submit_failed")
+                    current_order.update_status(Order.DRAFT)
+                    print("ERROR: Order could not be sent to the kitchen. Please try again.")
+                    continue
+                metrics.count("pos.orders_submitted")
                 print("\n" + "="*40)
                 print(f"✓ Order {current_order.order_id} sent to KITCHEN successfully!")
                 print("="*40)
@@ -240,9 +333,82 @@ def run_pos_cli():
             print(f"Logging out {CURRENT_USER.get_username()}...")
             CURRENT_USER = None
             break
+        elif choice == '8':
+            search_and_add_item(current_order)
         else:
             print("Invalid choice. Please try again.")
 
+def menu_category(product_id):
+    item = find_menu_item(product_id)
+    return item.category if item else None
+
+def complete_order(order, queue, scheduler):
+    with CompletionTimer(RECEIPT_WRITER) as timer, metrics.timer("kitchen.complete"):
+        previous_status, previous_update = order.status, order.updated_at
+        if not order.update_status(Order.COMPLETED):
+            timer.cancel()
+            print(f"ERROR: Order {order.order_id} is already {order.status} and cannot be completed.")
+            return False
+        if not update_order_status(order):
+            # Storage still has the old status; so must the queue's copy.
+            order.status, order.updated_at = previous_status, previous_update
+            timer.cancel()
+            metrics.count("kitchen.complete_conflict")
+            print("ERROR: Another terminal already changed this order. Refreshing list...")
+            return False
+        queue.mark_done(order)
+        scheduler.finish_order(order.order_id)
+        metrics.count("kitchen.orders_completed")
+        record_completed_order(order, ROLLUPS)
+        
+        receipt = Receipt(order)
+        queued = RECEIPT_WRITER.submit(receipt)
+        if not queued:
+            print("WARNING: Receipt queue is full, saving receipt directly...")
+            archive_receipt(receipt)
+    
+    print(f"\n>>> Order {order.order_id} marked COMPLETED! ({timer.elapsed * 1000:.1f} ms) <<<")
+    print(f">>> Receipt {receipt.receipt_id} {'queued for' if queued else 'added to'} the receipt archive")
+    print("-" * 40)
+    print(receipt.generate_simple_receipt())
+    print("-" * 40)
+    input("\nPress Enter to continue...")
+    return True
+
+def cancel_order(order, queue, scheduler):
+    confirm = input(f"Cancel order {order.order_id} and return its stock? (yes/no): ").strip().lower()
+    if confirm != 'yes':
+        return
+    previous_status, previous_update = order.status, order.updated_at
+    if not order.update_status(Order.CANCELLED):
+        print(f"ERROR: Order {order.order_id} is already {order.status} and cannot be cancelled.")
+        return
+    if not update_order_status(order):
+        order.status, order.updated_at = previous_status, previous_update
+        metrics.count("kitchen.cancel_conflict")
+        print("ERROR: Another terminal already changed this order. Refreshing list...")
+        return
+    queue.mark_done(order)
+    scheduler.finish_order(order.order_id)
+    metrics.count("kitchen.orders_cancelled")
+    print(f"✓ Order {order.order_id} cancelled.")
+
+def show_station_stats(scheduler):
+    print("\nSTATIONS")
+    print("-" * 72)
+    print(f"{'Station':<12} {'Queued':>7} {'Oldest':>8} {'Done':>6} {'Avg wait':>9} {'Max wait':>9} {'Last hr':>8}")
+    for row in scheduler.stats():
+        print(f"{row['station']:<12} {row['queued']:>7} {row['oldest_wait'] / 60:>7.1f}m {row['completed']:>6} "
+              f"{row['avg_wait'] / 60:>8.1f}m {row['max_wait'] / 60:>8.1f}m {row['per_hour']:>8}")
+    
+    print("\nRECEIPT WRITER")
+    print("-" * 40)
+    for name, value in RECEIPT_WRITER.stats().items():
+        if isinstance(value, float):
+            print(f"  {name:<20} {value:10.2f}")
+        else:
+            print(f"  {name:<20} {value:10}")
+
 def run_kitchen_cli():
     global CURRENT_USER
     if not login_user_flow(required_role="chef"):
@@ -250,25 +416,47 @@ def run_kitchen_cli():
     
     print(f"\n--- Kitchen Display System (Chef: {CURRENT_USER.get_username()}) ---")
     
+    queue = SERVICE.pending_queue() if SERVICE else PendingOrderQueue()
+    scheduler = KitchenScheduler(queue, menu_category)
+    station = None  # None shows every station
+    
     while True:
-        pending_orders = get_pending_orders()
+        for receipt_id, error in RECEIPT_WRITER.pop_errors():
+            print(f"ERROR: Receipt {receipt_id} could not be saved: {error}")
+        
+        with metrics.timer("kitchen.refresh"):
+            scheduler.refresh()
         
         print("\n" + "="*60)
-        print(f"PENDING ORDERS QUEUE ({len(pending_orders)})")
+        print(f"KITCHEN TICKETS ({station or 'All stations'})")
         print("="*60)
         
-        if not pending_orders:
-            print("No pending orders. Waiting for waiters...")
-        else:
-            for i, order in enumerate(pending_orders, 1):
-                items_str = ", ".join([f"{item.quantity}x {item.name}" for item in order.items])
-                print(f"{i}. [#{order.order_id}] Table: {order.customer_id}")
-                print(f"   Time: {order.created_at.strftime('%H:%M')} | Items: {items_str}")
-                print("-" * 60)
+        tickets = []
+        for name in ([station] if station else scheduler.stations()):
+            station_tickets = scheduler.queue(name)
+            if not station_tickets:
+                continue
+            print(f"\n[{name.upper()}] {len(station_tickets)} ticket(s)")
+            print("-" * 60)
+            for ticket in station_tickets:
+                tickets.append(ticket)
+                order = ticket.order
+                items_str = ", ".join([f"{item.quantity}x {item.name}" for item in ticket.items])
+                rush = " | RUSH" if ticket.rush else ""
+                print(f"{len(tickets)}. [#{order.order_id}] Table: {order.customer_id}{rush}")
+                print(f"   Time: {order.created_at.strftime('%H:%M')} ({ticket.age() / 60:.0f} min) | Items: {items_str}")
+        
+        if not tickets:
+            print("No open tickets. Waiting for waiters...")
 
         print("\nOPTIONS:")
         print(" [R] Refresh List")
-        print(" [Number] Complete Order (e.g., 1)")
+        print(" [W] Wait for New Orders")
+        print(" [T] Choose Station")
+        print(" [S] Show Station Stats")
+        print(" [Number] Complete Ticket (e.g., 1)")
+        print(" [!Number] Toggle Rush on Ticket's Order (e.g., !1)")
+        print(" [XNumber] Cancel Ticket's Order (e.g., X1)")
         print(" [B] Back to Main Menu (Keep Logged In)")
         print(" [L] Logout")
         
@@ -282,30 +470,53 @@ def run_kitchen_cli():
             break
         elif choice == 'R':
             continue
+        elif choice == 'W':
+            print("Waiting for new orders...")
+            if not queue.wait(timeout=60):
+                print("No new orders in the last minute.")
+        elif choice == 'T':
+            names = scheduler.stations()
+            for i, name in enumerate(names, 1):
+                print(f"  {i}. {name}")
+            pick = input("Station number (Enter for all): ").strip()
+            if pick.isdigit() and 1 <= int(pick) <= len(names):
+                station = names[int(pick) - 1]
+            else:
+                station = None
+        elif choice == 'S':
+            show_station_stats(scheduler)
+        elif choice.startswith('!') and choice[1:].isdigit():
+            idx = int(choice[1:]) - 1
+            if 0 <= idx < len(tickets):
+                ticket = tickets[idx]
+                scheduler.set_rush(ticket.order.order_id, not ticket.rush)
+                print(f"✓ Order {ticket.order.order_id} {'is no longer' if ticket.rush else 'marked as'} RUSH.")
+            else:
+                print("ERROR: Invalid ticket number.")
+        elif choice.startswith('X') and choice[1:].isdigit():
+            idx = int(choice[1:]) - 1
+            if 0 <= idx < len(tickets):
+                cancel_order(tickets[idx].order, queue, scheduler)
+            else:
+                print("ERROR: Invalid ticket number.")
         elif choice.isdigit():
             idx = int(choice) - 1
-            if 0 <= idx < len(pending_orders):
-                order_to_complete = pending_orders[idx]
-                
-                order_to_complete.update_status(Order.COMPLETED)
-                save_order(order_to_complete)
-                
-                receipt = Receipt(order_to_complete)
-                file_path = receipt.save_to_file()
-                
-                print(f"\n>>> Order {order_to_complete.order_id} marked COMPLETED! <<<")
-                print(f">>> Receipt generated automatically at: {file_path}")
-                print("-" * 40)
-                print(receipt.generate_simple_receipt())
-                print("-" * 40)
-                input("\nPress Enter to continue...")
+            if 0 <= idx < len(tickets):
+                ticket = tickets[idx]
+                with metrics.timer("kitchen.ticket"):
+                    finished = scheduler.complete_ticket(ticket)
+                if not finished:
+                    waiting = ", ".join(scheduler.remaining(ticket.order.order_id))
+                    print(f"✓ {ticket.station} ticket for {ticket.order.order_id} done. Waiting on: {waiting}")
+                elif not complete_order(ticket.order, queue, scheduler):
+                    scheduler.reopen_ticket(ticket)
             else:
-                print("ERROR: Invalid order number.")
+                print("ERROR: Invalid ticket number.")
         else:
             print("Invalid option.")
 
 def view_users():
-    users = load_users()
+    users = USER_DIRECTORY.users()
     print("\n" + "=" * 40)
     print("SYSTEM USERS")
     print("=" * 40)
@@ -318,7 +529,6 @@ def view_users():
     print("=" * 40)
 
 def add_user():
-    users = load_users()
     print("\n--- ADD NEW USER ---")
     
     username = input("Enter new username: ").strip()
@@ -326,10 +536,9 @@ def add_user():
         print("ERROR: Username cannot be empty.")
         return
         
-    for user in users:
-        if user.get_username() == username:
-            print(f"ERROR: User '{username}' already exists.")
-            return
+    if USER_DIRECTORY.exists(username):
+        print(f"ERROR: User '{username}' already exists.")
+        return
 
     password = input("Enter password: ").strip()
     if not password:
@@ -341,17 +550,19 @@ def add_user():
         print("ERROR: Invalid role. Must be 'admin', 'waiter', or 'chef'.")
         return
 
+    password_hash = hash_password(password)
     if role == "admin":
-        new_user = Admin(username, password)
+        new_user = Admin(username, password_hash)
     elif role == "waiter":
-        new_user = Waiter(username, password)
+        new_user = Waiter(username, password_hash)
     elif role == "chef":
-        new_user = Chef(username, password)
+        new_user = Chef(username, password_hash)
     else:
-        new_user = User(username, password, role)
+        new_user = User(username, password_hash, role)
     
-    users.append(new_user)
-    save_users(users)
+    if not USER_DIRECTORY.add(new_user):
+        print(f"ERROR: User '{username}' already exists.")
+        return
     print(f"✓ Successfully added new user: {username} ({role.upper()})")
 
 def add_menu_item_manager():
@@ -372,8 +583,15 @@ def add_menu_item_manager():
         return
         
     new_item = MenuItem(item_id, name, category, price)
-    MENU_ITEMS.append(new_item)
-    if save_menu_items(MENU_ITEMS):
+    if SERVICE:
+        if not SERVICE.add_menu_item(new_item):
+            print("ERROR: Item ID already exists.")
+            return
+        MENU_CATALOG.add(new_item)
+        print(f"✓ Added {name} to menu.")
+        return
+    MENU_CATALOG.add(new_item)
+    if save_menu_items(MENU_CATALOG.items()):
         print(f"✓ Added {name} to menu.")
     else:
         print("ERROR: Could not save menu.")
@@ -384,19 +602,165 @@ def remove_menu_item_manager():
     
     item_id = input("\nEnter ID of item to remove: ").strip().upper()
     
-    for i, item in enumerate(MENU_ITEMS):
-        if item.id == item_id:
-            confirm = input(f"Are you sure you want to delete {item.name}? (yes/no): ").lower()
-            if confirm == 'yes':
-                MENU_ITEMS.pop(i)
-                save_menu_items(MENU_ITEMS)
-                print(f"✓ Removed item {item_id}.")
-                return
-            else:
-                print("Deletion cancelled.")
-                return
+    item = find_menu_item(item_id)
+    if not item:
+        print("ERROR: Item ID not found.")
+        return
+    
+    confirm = input(f"Are you sure you want to delete {item.name}? (yes/no): ").lower()
+    if confirm == 'yes':
+        MENU_CATALOG.remove(item_id)
+        if SERVICE:
+            SERVICE.remove_menu_item(item_id)
+        else:
+            save_menu_items(MENU_CATALOG.items())
+        print(f"✓ Removed item {item_id}.")
+    else:
+        print("Deletion cancelled.")
+
+def manage_inventory():
+    while True:
+        levels = INVENTORY.levels()
+        print("\n" + "=" * 50)
+        print("INVENTORY")
+        print("=" * 50)
+        if not levels:
+            print("No stock tracked. Every item is available.")
+        else:
+            print(f"{'Ingredient':<24} {'On hand':>10} {'Reserved':>10}")
+            print("-" * 50)
+            for row in levels:
+                print(f"{row['ingredient']:<24} {row['on_hand']:>10g} {row['reserved']:>10g}")
+        sold_out = [MENU_CATALOG.get(item_id).name for item_id in sorted(INVENTORY.sold_out())
+                    if MENU_CATALOG.get(item_id)]
+        if sold_out:
+            print(f"\nSold out: {', '.join(sold_out)}")
+        
+        print("\n1. Restock / Adjust")
+        print("2. Set Recipe for Menu Item")
+        print("3. Back")
+        choice = input("Enter your choice (1-3): ").strip()
+        
+        if choice == '1':
+            ingredient = input("Ingredient or Item ID: ").strip()
+            if not ingredient:
+                print("ERROR: Ingredient cannot be empty.")
+                continue
+            try:
+                amount = float(input("Amount to add (negative to write off): "))
+            except ValueError:
+                print("ERROR: Invalid amount.")
+                continue
+            total = INVENTORY.restock(ingredient, amount)
+            print(f"✓ {ingredient} now at {total:g}.")
+        elif choice == '2':
+            item_id = input("Menu Item ID: ").strip().upper()
+            item = find_menu_item(item_id)
+            if not item:
+                print("ERROR: Item ID not found.")
+                continue
+            line = input("Ingredients per portion, e.g. 'bun=1, patty=1' (blank to count the item itself): ").strip()
+            recipe = {}
+            try:
+                for part in filter(None, (p.strip() for p in line.split(","))):
+                    ingredient, _, amount = part.partition("=")
+                    if not ingredient.strip():
+                        raise ValueError(part)
+                    recipe[ingredient.strip()] = float(amount) if amount.strip() else 1.0
+            except ValueError:
+                print("ERROR: Invalid recipe. Use ingredient=amount pairs.")
+                continue
+            INVENTORY.set_recipe(item_id, recipe)
+            print(f"✓ Recipe for {item.name} saved.")
+        elif choice == '3':
+            break
+        else:
+            print("Invalid choice. Please try again.")
+
+def reprint_receipt_manager():
+    print("\n--- REPRINT RECEIPT ---")
+    lookup = input("Enter Receipt ID (RCP-...) or Order ID (ORD-...): ").strip().upper()
+    if not lookup:
+        print("ERROR: ID cannot be empty.")
+        return
     
-    print("ERROR: Item ID not found.")
+    RECEIPT_WRITER.flush()
+    archive = ReceiptArchive()
+    if lookup.startswith("ORD-"):
+        text = archive.reprint(order_id=lookup)
+    else:
+        text = archive.reprint(receipt_id=lookup)
+    
+    if text is None:
+        print(f"ERROR: No archived receipt found for '{lookup}'.")
+        return
+    print("\n" + text)
+
+def print_report_table(title, rows, label_width=20):
+    print(f"\n{title}")
+    print("-" * 40)
+    if not rows:
+        print("  No sales yet.")
+    for label, cents in rows:
+        print(f"  {str(label):<{label_width}} ${cents / 100:>12.2f}")
+
+def view_reports():
+    today = datetime.now()
+    
+    print("\n" + "=" * 40)
+    print("SALES REPORTS")
+    print("=" * 40)
+    
+    week_start = (today - timedelta(days=6)).strftime("%Y-%m-%d")
+    daily = [(day, bucket["revenue_cents"]) for day, bucket in ROLLUPS.daily(week_start)]
+    print_report_table("LAST 7 DAYS", daily)
+    
+    today_prefix = today.strftime("%Y-%m-%d")
+    hourly = [(hour[-2:] + ":00", bucket["revenue_cents"])
+              for hour, bucket in ROLLUPS.hourly(today_prefix + "T00", today_prefix + "T23")]
+    print_report_table("TODAY BY HOUR", hourly)
+    
+    detail = input("\nRun full history breakdown (item/category/hour/table)? (yes/no): ").strip().lower()
+    if detail != 'yes':
+        return
+    
+    lines = load_sales_lines()
+    print(f"\nTOTAL REVENUE: ${lines.total_revenue_cents() / 100:.2f} over {lines.size} order lines")
+    print_report_table("REVENUE BY CATEGORY", lines.revenue_by_category())
+    print_report_table("TOP 10 ITEMS", lines.revenue_by_item()[:10])
+    print_report_table("REVENUE BY HOUR OF DAY", [(f"{h:02d}:00", c) for h, c in lines.revenue_by_hour()])
+    print_report_table("TOP 10 TABLES", lines.revenue_by_table()[:10])
+
+def view_metrics():
+    print("\n" + "=" * 72)
+    print("PERFORMANCE METRICS")
+    print("=" * 72)
+    
+    if not metrics.enabled():
+        print("Metrics are off (start with SRS_METRICS=1 to collect from startup).")
+        if input("Turn them on for this session? (yes/no): ").strip().lower() == 'yes':
+            metrics.enable()
+            print("✓ Metrics enabled.")
+        return
+    
+    operations, counters = metrics.summary()
+    if not operations and not counters:
+        print("Nothing recorded yet.")
+        return
+    
+    print(f"{'Operation':<24} {'Calls':>8} {'Mean ms':>10} {'p95 ms':>10} {'Max ms':>10}")
+    print("-" * 72)
+    for name, calls, mean, p95, worst in operations:
+        print(f"{name:<24} {calls:>8} {mean * 1000:>10.2f} {p95 * 1000:>10.2f} {worst * 1000:>10.2f}")
+    
+    if counters:
+        print("\nEVENTS")
+        print("-" * 40)
+        for name, value in counters:
+            print(f"  {name:<28} {value:>8}")
+    
+    metrics.dump()
+    print(f"\nWritten to {metrics.dump_file()}")
 
 def run_manager_cli():
     global CURRENT_USER
@@ -413,9 +777,13 @@ def run_manager_cli():
         print("4. Remove Menu Item")
         print("5. Back to Main Menu (Keep Logged In)")
         print("6. Logout")
+        print("7. Reprint Receipt")
+        print("8. Reports")
+        print("9. Performance Metrics")
+        print("10. Inventory")
         print("-" * 30)
         
-        choice = input("Enter your choice (1-6): ").strip()
+        choice = input("Enter your choice (1-10): ").strip()
         
         if choice == '1':
             view_users()
@@ -432,8 +800,27 @@ def run_manager_cli():
             print(f"Logging out {CURRENT_USER.get_username()}...")
             CURRENT_USER = None
             break
+        elif choice == '7':
+            reprint_receipt_manager()
+        elif choice == '8':
+            view_reports()
+        elif choice == '9':
+            view_metrics()
+        elif choice == '10':
+            manage_inventory()
         else:
             print("Invalid choice. Please try again.")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Restaurant management system CLI.")
+    parser.add_argument("--service", nargs="?", const="", metavar="HOST:PORT",
+                        help="Use the order service instead of the data files directly")
+    parser.add_argument("--storage-mode", default=os.environ.get("SRS_STORAGE_MODE", order_store.STORAGE_MODE),
+                        help=f"Order storage: {', '.join(order_store.STORAGE_MODES)} (default: $SRS_STORAGE_MODE or json)")
+    args = parser.parse_args()
+    if args.storage_mode not in order_store.STORAGE_MODES:
+        parser.error(f"unknown storage mode '{args.storage_mode}' (choose from {', '.join(order_store.STORAGE_MODES)})")
+    order_store.set_storage_mode(args.storage_mode)
+    if args.service is not None and not connect_service(args.service or None):
+        sys.exit(1)
     main_menu()
\ No newline at end of file
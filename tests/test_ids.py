@@ -0,0 +1,24 @@
+import os
+
+import pytest
+
+from backend import ids
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+def test_forked_child_gets_its_own_node(monkeypatch):
+    monkeypatch.setenv("SRS_NODE_ID", "7")
+    monkeypatch.setattr(ids, "_generator", ids.IdGenerator())
+    assert ids._generator.node == 7
+
+    read_end, write_end = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.write(write_end, str(ids._generator.node).encode())
+        os._exit(0)
+    os.close(write_end)
+    os.waitpid(pid, 0)
+    with os.fdopen(read_end) as f:
+        child_node = int(f.read())
+    assert child_node != 7
+    assert ids._generator.node == 7
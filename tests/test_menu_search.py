@@ -0,0 +1,36 @@
+from backend.menu_search import MenuSearchIndex
+from backend.menuitem import MenuItem
+
+
+def make_index():
+    return MenuSearchIndex([
+        MenuItem("B1", "Classic Burger", "Mains", 8.99),
+        MenuItem("B2", "Cheese Burger", "Mains", 9.49),
+        MenuItem("D1", "Cola", "Drinks", 1.99),
+        MenuItem("S1", "Caesar Salad", "Sides", 7.25),
+    ])
+
+
+def ids(items):
+    return [item.id for item in items]
+
+
+def test_prefixes_of_every_term_must_match():
+    index = make_index()
+    assert ids(index.search("bur")) == ["B2", "B1"]
+    assert ids(index.search("ch bur")) == ["B2"]
+    assert ids(index.search("drinks")) == ["D1"]
+
+
+def test_typos_find_the_closest_words():
+    index = make_index()
+    assert index.similar("burgr") == ["burger"]
+    assert ids(index.search("chese burger")) == ["B2"]
+
+
+def test_swapped_letters_in_short_words_are_found():
+    # "brugr" shares no trigram with "burger"; the edit-distance scan of
+    # words starting with "b" or "r" still finds it.
+    index = make_index()
+    assert index.similar("brugr") == ["burger"]
+    assert ids(index.search("brugr")) == ["B2", "B1"]
@@ -0,0 +1,29 @@
+from backend.order import Order
+from backend.receipt import Receipt
+
+
+def make_receipt(price, quantity=1, tax_rate=0.08, tip_percent=0.0):
+    order = Order("C1")
+    order.add_item("P1", "Burger", price, quantity)
+    return Receipt(order, "R1", tax_rate, tip_percent)
+
+
+def test_amounts_round_like_the_float_receipts():
+    # 253.95 * 0.10 is 25.394999... as a float, which always printed 25.39.
+    receipt = make_receipt(253.95, tax_rate=0.10)
+    assert receipt.calculate_amounts_cents() == {
+        "subtotal": 25395, "tax": 2539, "tip": 0, "total": 27934,
+    }
+
+
+def test_amounts_follow_the_float_formulas():
+    for price in (0.5, 3.99, 12.35, 19.99, 253.95):
+        for quantity in (1, 3, 7):
+            for tax_rate, tip_percent in ((0.08, 0.0), (0.07, 0.18), (0.0825, 0.15)):
+                receipt = make_receipt(price, quantity, tax_rate, tip_percent)
+                subtotal = price * quantity
+                tax = subtotal * tax_rate
+                tip = subtotal * tip_percent
+                assert f"{receipt.calculate_tax():.2f}" == f"{tax:.2f}"
+                assert f"{receipt.calculate_tip():.2f}" == f"{tip:.2f}"
+                assert f"{receipt.calculate_total():.2f}" == f"{subtotal + tax + tip:.2f}"
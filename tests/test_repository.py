@@ -0,0 +1,37 @@
+import json
+
+from backend.order import Order
+from backend.repository import JsonOrderRepository
+
+
+def saved_orders(repo, count):
+    orders = []
+    for i in range(count):
+        order = Order(f"T{i}")
+        order.add_item("B1", "Burger", 9.99, i + 1)
+        data = order.to_dict()
+        repo.save(data)
+        orders.append(data)
+    return orders
+
+
+def test_json_store_keeps_its_layout_and_indexes_every_save(tmp_path):
+    repo = JsonOrderRepository(str(tmp_path / "orders.json"))
+    orders = saved_orders(repo, 20)
+    repo.delete(orders[3]["order_id"])
+
+    with open(repo.data_file) as f:
+        assert f.read() == json.dumps(repo.load_all(), indent=4)
+    for data in orders[4:]:
+        assert repo._get_indexed(data["order_id"]) == (True, data)
+    assert repo._get_indexed(orders[3]["order_id"]) == (True, None)
+
+
+def test_json_store_falls_back_when_the_index_is_stale(tmp_path):
+    repo = JsonOrderRepository(str(tmp_path / "orders.json"))
+    orders = saved_orders(repo, 5)
+    with open(repo.data_file, "w") as f:
+        json.dump(orders[::-1], f, indent=4)
+
+    assert repo._get_indexed(orders[0]["order_id"]) == (False, None)
+    assert repo.get(orders[0]["order_id"]) == orders[0]
@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+
+from backend import order as order_store
+from backend.order import Order, get_order
+from backend.service import OrderService
+
+
+@pytest.fixture(params=order_store.STORAGE_MODES)
+def storage_mode(request, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(order_store, "STORAGE_MODE", request.param)
+    monkeypatch.setattr(order_store, "_archive", None)
+    return request.param
+
+
+def new_order():
+    order = Order("T1")
+    order.add_item("B1", "Burger", 9.99, 2)
+    order.update_status(Order.PENDING)
+    return order
+
+
+def test_save_round_trips_in_every_storage_mode(storage_mode):
+    async def run():
+        service = OrderService()
+        await service.start()
+        loop = asyncio.get_running_loop()
+        try:
+            order = new_order()
+            version = await service.op_save_order(order.to_dict())
+            await service.flush()
+            stored = await loop.run_in_executor(service.storage, get_order, order.order_id)
+            assert stored is not None and stored.status == Order.PENDING
+
+            await service.op_save_order_status(order.order_id, Order.COMPLETED, version)
+            await service.flush()
+            stored = await loop.run_in_executor(service.storage, get_order, order.order_id)
+            assert stored.status == Order.COMPLETED
+            assert service.flush_failures == 0 and not service.dirty
+        finally:
+            await service.stop()
+
+    asyncio.run(run())
+
+
+def test_resent_request_is_answered_once(storage_mode):
+    async def run():
+        service = OrderService()
+        await service.start()
+        try:
+            order = new_order()
+            request = {"client": "c1", "id": 1, "op": "save_order", "args": {"order": order.to_dict()}}
+            first = await service.respond(request)
+            again = await service.respond(request)
+            assert first == again and first["ok"]
+            assert service.orders[order.order_id]["version"] == first["result"]
+        finally:
+            await service.stop()
+
+    asyncio.run(run())